@@ -1,18 +1,39 @@
 import asyncio
 import gc
 import os
-from collections import defaultdict
 from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING
 
 import httpx
-import pandas as pd
+import numpy as np
 from fastapi import HTTPException
-from sqlmodel import Session, desc, select
+from sqlmodel import desc, insert, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from app.blizzard_api import fetch_blizzard_api
-from app.dependencies import engine
+from app.blizzard_api import blizzard_api_url, fetch_blizzard_api
+from app.dependencies import get_async_engine
 from app.logger import get_logger
+from app.metrics import INGEST_PHASE_SECONDS, INGEST_RUNS
 from app.models import Item, PriceHistory
+from app.services.forecast_services import update_forecast_models
+from app.services.liquidity_services import update_liquidity
+from app.services.market_services import (
+    AuctionArrays,
+    aggregate_market,
+    auctions_to_arrays,
+    is_market_tracking_enabled,
+    save_market_snapshot,
+    update_market_indices,
+)
+from app.services.notification_archive_services import (
+    archive_cutoff_date,
+    archive_read_notifications,
+)
+from app.services.stats_services import update_rolling_stats
+from app.services.supply_services import supply_tracker
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 logger = get_logger(__name__)
 
@@ -23,7 +44,7 @@ async def get_data(httpx_client: httpx.AsyncClient):
     try:
         logger.info("Fetching data from Blizzard API.")
         data = await fetch_blizzard_api(
-            "https://us.api.blizzard.com/data/wow/auctions/commodities",
+            blizzard_api_url("/data/wow/auctions/commodities"),
             httpx_client,
             params={"namespace": "dynamic-us", "locale": "pt_BR"},
         )
@@ -59,11 +80,15 @@ async def notify_server(httpx_client: httpx.AsyncClient) -> None:
 
 
 async def process_data(
-    json_result, db_session: Session, current_timestamp: datetime
-) -> pd.DataFrame | None:
+    arrays: AuctionArrays, db_session: AsyncSession, current_timestamp: datetime
+) -> "pd.DataFrame | None":
+    import pandas as pd
+
     logger.info("Processing the new data")
-    db_items = db_session.exec(
-        select(Item.id, Item.quantity_threshold).where(Item.is_active)
+    db_items = (
+        await db_session.exec(
+            select(Item.id, Item.quantity_threshold).where(Item.is_active)
+        )
     ).all()
 
     logger.info(f"Found {len(db_items)} active items in the database for processing.")
@@ -71,57 +96,125 @@ async def process_data(
     threshold_map = {int(item[0]): int(item[1]) for item in db_items}
     items_ids = set(threshold_map.keys())
 
-    logger.info("Iterating over auctions in chunks and aggregating manually")
-
-    price_quantity = defaultdict(lambda: defaultdict(int))
-    for chunk_start in range(0, len(json_result["auctions"]), 5000):
-        chunk = json_result["auctions"][chunk_start : chunk_start + 5000]
-        for auction in chunk:
-            item_id = auction["item"]["id"]
-            if item_id not in items_ids:
-                continue
-            price = auction["unit_price"]
-            price_quantity[item_id][price] += auction["quantity"]
-
-    filtered: list[dict[str, int]] = []
-    for item_id, prices in price_quantity.items():
-        threshold = threshold_map[item_id]
-        for price, qty in prices.items():
-            if qty >= threshold:
-                filtered.append({"item_id": item_id, "price": price, "quantity": qty})
-
-    if filtered:
-        df = pd.DataFrame(filtered)
-        logger.info(
-            "Chunk aggregated data ready, proceeding with final grouping and timestamp addition."
-        )
-        df = (
-            df.groupby("item_id")
-            .agg(price=("price", "min"), quantity=("quantity", "sum"))
-            .reset_index()
+    logger.info("Aggregating auctions of the active items")
+
+    watched = np.isin(arrays.item_ids, list(items_ids))
+    price_levels = (
+        pd.DataFrame(
+            {
+                "item_id": arrays.item_ids[watched],
+                "price": arrays.prices[watched],
+                "quantity": arrays.quantities[watched],
+            }
         )
-        df["timestamp"] = current_timestamp.strftime("%Y-%m-%d %H:%M:%S")
+        .groupby(["item_id", "price"], as_index=False)["quantity"]
+        .sum()
+    )
+    # Só considera faixas de preço com quantidade suficiente
+    price_levels = price_levels[
+        price_levels["quantity"] >= price_levels["item_id"].map(threshold_map)
+    ]
 
-        logger.info("Returning the processed data")
-        return df
-    else:
+    if price_levels.empty:
         logger.info("No data was persisted after processing.")
         return None
 
+    df = (
+        price_levels.groupby("item_id")
+        .agg(price=("price", "min"), quantity=("quantity", "sum"))
+        .reset_index()
+    )
+    df["timestamp"] = current_timestamp.astimezone(timezone.utc).replace(
+        tzinfo=None, microsecond=0
+    )
+
+    logger.info("Returning the processed data")
+    return df
 
-def save_data(processed_data: pd.DataFrame, db_session: Session) -> None:
+
+async def save_data(processed_data: "pd.DataFrame", db_session: AsyncSession) -> None:
     logger.info("Saving the new data to the DB")
 
-    processed_data.to_sql(
-        "price_history",
-        con=db_session.connection(),
-        if_exists="append",
-        index=False,
-    )
+    # O asyncpg não aceita tipos do NumPy, então convertemos para tipos nativos
+    rows = [
+        {
+            "item_id": int(item_id),
+            "price": int(price),
+            "quantity": int(quantity),
+            "timestamp": timestamp.to_pydatetime(),
+        }
+        for item_id, price, quantity, timestamp in processed_data[
+            ["item_id", "price", "quantity", "timestamp"]
+        ].itertuples(index=False)
+    ]
+    await db_session.execute(insert(PriceHistory), rows)
 
     logger.info("Data saved to the database, committing the transaction.")
 
-    db_session.commit()
+    await db_session.commit()
+
+
+async def fetch_commodities(client: httpx.AsyncClient) -> dict | None:
+    with INGEST_PHASE_SECONDS.labels("fetch").time():
+        data = await get_data(client)
+    if not data:
+        INGEST_RUNS.labels("no_data").inc()
+        logger.warning("No data fetched from the API.")
+        return None
+    return data
+
+
+async def ingest_data(
+    db_session: AsyncSession, client: httpx.AsyncClient, data: dict
+) -> None:
+    """Runs every ingestion phase over a fetched commodities dump."""
+    now_utc = datetime.now(timezone.utc)
+    with INGEST_PHASE_SECONDS.labels("arrays").time():
+        arrays = auctions_to_arrays(data["auctions"])
+    # Isolado: uma falha no mercado não pode impedir o histórico de ser salvo
+    try:
+        if await is_market_tracking_enabled(db_session):
+            with INGEST_PHASE_SECONDS.labels("aggregate_market").time():
+                market = aggregate_market(
+                    arrays.item_ids, arrays.prices, arrays.quantities
+                )
+            with INGEST_PHASE_SECONDS.labels("save_market").time():
+                await save_market_snapshot(db_session, market, now_utc)
+                await update_market_indices(db_session, market, now_utc)
+    except Exception as e:
+        await db_session.rollback()
+        logger.error(f"Failed to update the market snapshot: {e}", exc_info=True)
+    with INGEST_PHASE_SECONDS.labels("aggregate").time():
+        processed_data = await process_data(arrays, db_session, now_utc)
+    if processed_data is None:
+        INGEST_RUNS.labels("no_items").inc()
+        logger.info("No processed data to save.")
+        return
+
+    with INGEST_PHASE_SECONDS.labels("save").time():
+        await save_data(processed_data, db_session)
+    with INGEST_PHASE_SECONDS.labels("liquidity").time():
+        await update_liquidity(db_session, arrays, processed_data)
+    with INGEST_PHASE_SECONDS.labels("supply").time():
+        await supply_tracker.update(db_session, arrays, processed_data)
+    with INGEST_PHASE_SECONDS.labels("stats").time():
+        await update_rolling_stats(db_session, processed_data)
+    with INGEST_PHASE_SECONDS.labels("forecast").time():
+        await update_forecast_models(db_session, processed_data)
+    await notify_server(client)
+    INGEST_RUNS.labels("ok").inc()
+
+
+async def run_ingestion(db_session: AsyncSession, client: httpx.AsyncClient) -> bool:
+    """
+    One ingestion cycle: fetches the commodities and runs every phase over
+    them. Returns False when the API returned no data.
+    """
+    data = await fetch_commodities(client)
+    if data is None:
+        return False
+    await ingest_data(db_session, client, data)
+    return True
 
 
 async def run_periodic_data_fetch() -> None:
@@ -136,11 +229,13 @@ async def run_periodic_data_fetch() -> None:
             await asyncio.sleep(sleep_duration)
             sleep_duration = 0
         try:
-            with Session(engine) as db_session:
-                res = db_session.exec(
-                    select(PriceHistory.timestamp)
-                    .order_by(desc(PriceHistory.timestamp))
-                    .limit(1)
+            async with AsyncSession(get_async_engine()) as db_session:
+                res = (
+                    await db_session.exec(
+                        select(PriceHistory.timestamp)
+                        .order_by(desc(PriceHistory.timestamp))
+                        .limit(1)
+                    )
                 ).one_or_none()
 
                 last_timestamp_utc = res.replace(tzinfo=timezone.utc) if res else None
@@ -156,28 +251,50 @@ async def run_periodic_data_fetch() -> None:
                 # 1 hour or more has passed, or no data found, fetch new data
                 logger.info("Fetching new data.")
                 async with httpx.AsyncClient(timeout=30) as client:
-                    data = await get_data(client)
-                    now_utc = datetime.now(timezone.utc)
-                    if data:
+                    data = await fetch_commodities(client)
+                    if data is not None:
+                        # Definido antes de processar: se alguma fase falhar, o
+                        # dump não é baixado de novo até a próxima hora
                         sleep_duration = (
                             FETCH_INTERVAL.total_seconds()
                         )  # Sleep for 1 hour
-                        processed_data = await process_data(data, db_session, now_utc)
-                        if processed_data is not None:
-                            save_data(processed_data, db_session)
-                            await notify_server(client)
-                        else:
-                            logger.info("No processed data to save.")
+                        await ingest_data(db_session, client, data)
                     else:
                         sleep_duration = 1 * 60  # Sleep for 1 minute
-                        logger.warning("No data fetched from the API.")
 
                 del data
                 gc.collect()
         except Exception as e:
+            INGEST_RUNS.labels("error").inc()
             logger.error(
                 f"An error occurred in the periodic task loop: {e}", exc_info=True
             )
+            # Falha antes da busca (ex.: banco fora do ar): espera antes de tentar
+            if sleep_duration == 0:
+                sleep_duration = 1 * 60
+
+
+async def run_periodic_notification_archive() -> None:
+    logger.info("Initializing periodic notification archive.")
+
+    ARCHIVE_INTERVAL = timedelta(hours=6)
+
+    while True:
+        try:
+            async with AsyncSession(get_async_engine()) as db_session:
+                cutoff = await archive_cutoff_date(db_session)
+                if cutoff is None:
+                    logger.info("Notification archive disabled, skipping.")
+                else:
+                    archived = await archive_read_notifications(db_session, cutoff)
+                    logger.info(f"Archived {archived} read notifications.")
+        except Exception as e:
+            logger.error(
+                f"An error occurred in the notification archive loop: {e}",
+                exc_info=True,
+            )
+
+        await asyncio.sleep(ARCHIVE_INTERVAL.total_seconds())
 
 
 if __name__ == "__main__":
@@ -1,3 +1,4 @@
+import asyncio
 import json
 import os
 
@@ -7,14 +8,56 @@ from fastapi import HTTPException, status
 from requests.auth import HTTPBasicAuth
 
 from app.logger import get_logger
+from app.metrics import (
+    BLIZZARD_PARSE_SECONDS,
+    BLIZZARD_REQUEST_SECONDS,
+    BLIZZARD_RESPONSE_BYTES,
+    BLIZZARD_RESPONSES,
+    BLIZZARD_RETRIES,
+    endpoint_label,
+)
 from exceptions import EnvNotSetError
 
 logger = get_logger(__name__)
 
 
+class RateLimiter:
+    """Spaces out calls so at most `rate` start per second."""
+
+    def __init__(self, rate: float):
+        self.interval = 1 / rate
+        self.next_slot = 0.0
+
+    async def wait(self):
+        now = asyncio.get_running_loop().time()
+        slot = max(self.next_slot, now)
+        self.next_slot = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+# A API da Blizzard aceita 100 requisições por segundo
+blizzard_rate_limiter = RateLimiter(float(os.getenv("BLIZZARD_RATE_LIMIT", "100")))
+
+DEFAULT_BLIZZARD_API_URL = "https://us.api.blizzard.com"
+DEFAULT_BLIZZARD_OAUTH_URL = "https://oauth.battle.net"
+
+
+def blizzard_api_url(path: str) -> str:
+    """
+    URL of a Blizzard API path. BLIZZARD_API_URL (and BLIZZARD_OAUTH_URL for
+    the token) point the app at another server, like the load-test stand-in.
+    """
+    return os.getenv("BLIZZARD_API_URL", DEFAULT_BLIZZARD_API_URL).rstrip("/") + path
+
+
+def get_token_file() -> str:
+    return os.getenv("BLIZZARD_TOKEN_FILE", "token.json")
+
+
 def get_auth_token():
     try:
-        with open("token.json", "r", encoding="utf-8") as file:
+        with open(get_token_file(), "r", encoding="utf-8") as file:
             return json.load(file)["access_token"]
     except FileNotFoundError:
         logger.info("Nenhum arquivo com token salvo, gerando novo token.")
@@ -39,16 +82,18 @@ def generate_new_token():
             raise EnvNotSetError(variables)
 
         res = requests.post(
-            "https://oauth.battle.net/token",
+            os.getenv("BLIZZARD_OAUTH_URL", DEFAULT_BLIZZARD_OAUTH_URL).rstrip("/")
+            + "/token",
             data={"grant_type": "client_credentials"},
             auth=HTTPBasicAuth(client_id, client_secret),
+            timeout=30,
         )
 
         res.raise_for_status()
 
         token_data = res.json()
 
-        with open("token.json", "w", encoding="utf-8") as file:
+        with open(get_token_file(), "w", encoding="utf-8") as file:
             json.dump(token_data, file)
 
     except requests.exceptions.RequestException as e:
@@ -60,20 +105,56 @@ def generate_new_token():
         logger.error(f"An unexpected error occurred: {e}", exc_info=True)
 
 
+# Token em memória; a leitura do arquivo e a renovação (requests e I/O de
+# disco) rodam numa thread, com o lock garantindo uma renovação por vez
+access_token: str | None = None
+access_token_lock = asyncio.Lock()
+
+
+async def get_access_token() -> str:
+    global access_token
+    if access_token is None:
+        async with access_token_lock:
+            if access_token is None:
+                access_token = await asyncio.to_thread(get_auth_token)
+    return access_token
+
+
+async def renew_access_token(expired_token: str) -> str:
+    """
+    Generates a new token unless another request already replaced the
+    expired one while this one waited for the lock.
+    """
+    global access_token
+    async with access_token_lock:
+        if access_token in (None, expired_token):
+            await asyncio.to_thread(generate_new_token)
+            access_token = await asyncio.to_thread(get_auth_token)
+    return access_token
+
+
 async def fetch_blizzard_api(
     url: str,
     client: httpx.AsyncClient,
     params: dict | None = None,
     resource_name: str = "Recurso",
 ):
-    headers = {"Authorization": f"Bearer {get_auth_token()}"}
-    response = await client.get(url, headers=headers, params=params)
+    endpoint = endpoint_label(url)
+    token = await get_access_token()
+    headers = {"Authorization": f"Bearer {token}"}
+    await blizzard_rate_limiter.wait()
+    with BLIZZARD_REQUEST_SECONDS.labels(endpoint).time():
+        response = await client.get(url, headers=headers, params=params)
+    BLIZZARD_RESPONSES.labels(endpoint, response.status_code).inc()
 
     if response.status_code == 401:
         logger.info("Token expirado, gerando novo token.")
-        generate_new_token()
-        headers["Authorization"] = f"Bearer {get_auth_token()}"
-        response = await client.get(url, headers=headers, params=params)
+        BLIZZARD_RETRIES.labels("token_expired").inc()
+        headers["Authorization"] = f"Bearer {await renew_access_token(token)}"
+        await blizzard_rate_limiter.wait()
+        with BLIZZARD_REQUEST_SECONDS.labels(endpoint).time():
+            response = await client.get(url, headers=headers, params=params)
+        BLIZZARD_RESPONSES.labels(endpoint, response.status_code).inc()
 
     if response.status_code == 404:
         logger.error(f"{resource_name} não encontrado na API da Blizzard.")
@@ -84,4 +165,6 @@ async def fetch_blizzard_api(
 
     response.raise_for_status()
 
-    return response.json()
+    BLIZZARD_RESPONSE_BYTES.labels(endpoint).observe(len(response.content))
+    with BLIZZARD_PARSE_SECONDS.labels(endpoint).time():
+        return response.json()
@@ -0,0 +1,213 @@
+import asyncio
+import json
+import os
+from contextlib import closing
+from typing import Awaitable, Callable
+
+from app.logger import get_logger
+
+logger = get_logger(__name__)
+
+CHANNEL_NAME = "websocket_broadcast"
+# O NOTIFY do PostgreSQL aceita payloads de até 8000 bytes
+MAX_NOTIFY_PAYLOAD_BYTES = 7900
+# Espera entre tentativas de reconectar o LISTEN, dobrando até o máximo
+RECONNECT_DELAY_SECONDS = 1
+MAX_RECONNECT_DELAY_SECONDS = 30
+
+DeliverCallback = Callable[[dict], Awaitable[None]]
+
+
+class InMemoryBroadcastBackend:
+    """Delivers envelopes straight to the local sockets (single process and tests)."""
+
+    distributed = False
+
+    def __init__(self):
+        self.deliver: DeliverCallback | None = None
+
+    async def start(self, deliver: DeliverCallback):
+        self.deliver = deliver
+
+    async def stop(self):
+        self.deliver = None
+
+    async def publish(self, envelope: dict):
+        if self.deliver is not None:
+            await self.deliver(envelope)
+
+
+class PostgresBroadcastBackend:
+    """
+    Publishes envelopes with NOTIFY and relays every notification received on
+    the channel to the local sockets, so all workers reach all their clients.
+    Envelopes too large for NOTIFY are stored in `websocket_messages` and only
+    their id is sent.
+    """
+
+    distributed = True
+
+    def __init__(self, database_url: str):
+        self.database_url = database_url
+        self.deliver: DeliverCallback | None = None
+        self.listen_connection = None
+        self.listen_fd: int | None = None
+        self.publish_connection = None
+        self.publish_lock = asyncio.Lock()
+        self.reconnect_task: asyncio.Task | None = None
+        # Notificações recebidas, entregues em ordem por uma única tarefa
+        self.notify_queue: asyncio.Queue[str] = asyncio.Queue()
+        self.relay_task: asyncio.Task | None = None
+
+    def _connect(self):
+        import psycopg2
+
+        connection = psycopg2.connect(self.database_url)
+        connection.autocommit = True
+        return connection
+
+    async def start(self, deliver: DeliverCallback):
+        self.deliver = deliver
+        self.relay_task = asyncio.create_task(self._relay())
+        await self._listen()
+        logger.info(f"Listening for WebSocket broadcasts on '{CHANNEL_NAME}'.")
+
+    async def stop(self):
+        self.deliver = None
+        if self.reconnect_task is not None:
+            self.reconnect_task.cancel()
+            self.reconnect_task = None
+        self._close_listener()
+        if self.relay_task is not None:
+            self.relay_task.cancel()
+            await asyncio.gather(self.relay_task, return_exceptions=True)
+            self.relay_task = None
+        if self.publish_connection is not None:
+            self.publish_connection.close()
+            self.publish_connection = None
+
+    async def _listen(self):
+        connection = await asyncio.to_thread(self._connect)
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(f"LISTEN {CHANNEL_NAME};")
+        except Exception:
+            connection.close()
+            raise
+        self.listen_connection = connection
+        self.listen_fd = connection.fileno()
+        asyncio.get_running_loop().add_reader(self.listen_fd, self._on_notify)
+
+    def _close_listener(self):
+        connection = self.listen_connection
+        if connection is None:
+            return
+        self.listen_connection = None
+        # fileno() falha numa conexão já perdida, por isso o descritor guardado
+        if self.listen_fd is not None:
+            asyncio.get_running_loop().remove_reader(self.listen_fd)
+            self.listen_fd = None
+        connection.close()
+
+    async def _reconnect(self):
+        delay = RECONNECT_DELAY_SECONDS
+        while self.deliver is not None:
+            await asyncio.sleep(delay)
+            try:
+                await self._listen()
+            except Exception as e:
+                logger.warning(f"Reconnecting the broadcast listener failed: {e}")
+                delay = min(delay * 2, MAX_RECONNECT_DELAY_SECONDS)
+                continue
+            logger.info(
+                f"Listening again for WebSocket broadcasts on '{CHANNEL_NAME}'."
+            )
+            break
+        self.reconnect_task = None
+
+    def _on_notify(self):
+        from psycopg2 import InterfaceError, OperationalError
+
+        connection = self.listen_connection
+        if connection is None:
+            return
+        try:
+            connection.poll()
+        except (OperationalError, InterfaceError) as e:
+            # Conexão perdida (ex.: banco reiniciado): sem isso o worker para de
+            # receber as mensagens dos outros em silêncio
+            logger.error(f"Broadcast listener connection lost: {e}")
+            self._close_listener()
+            if self.reconnect_task is None:
+                self.reconnect_task = asyncio.create_task(self._reconnect())
+            return
+        while connection.notifies:
+            self.notify_queue.put_nowait(connection.notifies.pop(0).payload)
+
+    async def _relay(self):
+        """
+        Delivers the notifications one at a time, in the order they arrived: an
+        envelope loaded from `websocket_messages` can't be overtaken by a
+        smaller one published after it.
+        """
+        while True:
+            raw_payload = await self.notify_queue.get()
+            await self._handle_notify(raw_payload)
+
+    async def _handle_notify(self, raw_payload: str):
+        try:
+            envelope = json.loads(raw_payload)
+            if "ref" in envelope:
+                envelope = await asyncio.to_thread(self._load_stored, envelope["ref"])
+                if envelope is None:
+                    return
+            if self.deliver is not None:
+                await self.deliver(envelope)
+        except Exception as e:
+            logger.error(f"Failed to relay WebSocket broadcast: {e}", exc_info=True)
+
+    def _load_stored(self, message_id: int) -> dict | None:
+        # O "with" da conexão do psycopg2 só encerra a transação, não a fecha
+        with closing(self._connect()) as connection, connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT payload FROM websocket_messages WHERE id = %s;", (message_id,)
+            )
+            row = cursor.fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _notify(self, raw_envelope: str):
+        if self.publish_connection is None or self.publish_connection.closed:
+            self.publish_connection = self._connect()
+
+        with self.publish_connection.cursor() as cursor:
+            if len(raw_envelope.encode("utf-8")) > MAX_NOTIFY_PAYLOAD_BYTES:
+                cursor.execute(
+                    """
+                    WITH cleanup AS (
+                        DELETE FROM websocket_messages
+                        WHERE created_at < now() - interval '10 minutes'
+                    )
+                    INSERT INTO websocket_messages (payload) VALUES (%s) RETURNING id;
+                    """,
+                    (raw_envelope,),
+                )
+                message_id = cursor.fetchone()[0]  # type: ignore
+                raw_envelope = json.dumps({"ref": message_id})
+            cursor.execute("SELECT pg_notify(%s, %s);", (CHANNEL_NAME, raw_envelope))
+
+    async def publish(self, envelope: dict):
+        raw_envelope = json.dumps(envelope, separators=(",", ":"), ensure_ascii=False)
+        async with self.publish_lock:
+            await asyncio.to_thread(self._notify, raw_envelope)
+
+
+def create_broadcast_backend() -> InMemoryBroadcastBackend | PostgresBroadcastBackend:
+    backend_name = os.getenv("WEBSOCKET_BROADCAST_BACKEND", "memory").lower()
+
+    if backend_name == "postgres":
+        database_url = os.getenv("DATABASE_URL")
+        if database_url:
+            return PostgresBroadcastBackend(database_url)
+        logger.warning("DATABASE_URL not set, falling back to in-memory broadcast.")
+
+    return InMemoryBroadcastBackend()
@@ -1,22 +1,79 @@
 import os
+from functools import cache
 
 import httpx
 from dotenv import load_dotenv
+from sqlalchemy import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
 from sqlmodel import Session, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
 
+from app import profiling
+from app.metrics import instrument_engine
 from exceptions import EnvNotSetError
 
 load_dotenv()
 
-database_url = os.getenv("DATABASE_URL")
-if not database_url:
-    raise EnvNotSetError("DATABASE_URL")
 
-engine = create_engine(database_url)
+def get_database_url() -> str:
+    database_url = os.getenv("DATABASE_URL")
+    if not database_url:
+        raise EnvNotSetError("DATABASE_URL")
+    return database_url
+
+
+def get_pool_options() -> dict:
+    return {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "5")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+        "pool_timeout": int(os.getenv("DB_POOL_TIMEOUT", "30")),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        "pool_pre_ping": True,
+    }
+
+
+@cache
+def get_engine() -> Engine:
+    """Engine síncrona, criada no primeiro uso (o import do driver é lento)."""
+    engine = create_engine(get_database_url(), **get_pool_options())
+    instrument_engine(engine)
+    profiling.instrument_engine(engine)
+    return engine
+
+
+def get_async_database_url(url: str) -> str:
+    """Troca o driver da DATABASE_URL para o asyncpg."""
+    async_url = make_url(url).set(drivername="postgresql+asyncpg")
+    # O asyncpg usa "ssl" no lugar do "sslmode" do libpq
+    if "sslmode" in async_url.query:
+        query = dict(async_url.query)
+        query["ssl"] = query.pop("sslmode")
+        async_url = async_url.set(query=query)
+    return async_url.render_as_string(hide_password=False)
+
+
+@cache
+def get_async_engine() -> AsyncEngine:
+    async_engine = create_async_engine(
+        get_async_database_url(get_database_url()),
+        # Poolers em modo transação (ex.: Supabase na porta 6543) exigem 0 aqui
+        connect_args={
+            "statement_cache_size": int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100"))
+        },
+        **get_pool_options(),
+    )
+    instrument_engine(async_engine.sync_engine)
+    profiling.instrument_engine(async_engine.sync_engine)
+    return async_engine
 
 
 def get_db():
-    with Session(engine) as session:
+    with Session(get_engine()) as session:
+        yield session
+
+
+async def get_async_db():
+    async with AsyncSession(get_async_engine(), expire_on_commit=False) as session:
         yield session
 
 
@@ -0,0 +1,66 @@
+"""
+Eleição de líder entre os workers do uvicorn/gunicorn: só quem segura o
+advisory lock roda as tarefas periódicas (ingestão, arquivamento, verificação
+das imagens). Os outros tentam de novo de tempos em tempos e assumem se o
+líder cair, já que o lock some junto com a conexão dele.
+
+O lock é de sessão, então a DATABASE_URL precisa apontar para o banco ou para
+um pooler em modo sessão (no Supabase, a porta 5432, não a 6543).
+"""
+
+import asyncio
+from typing import Awaitable, Callable
+
+from sqlmodel import text
+
+from app.dependencies import get_async_engine
+from app.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Chave arbitrária, só precisa ser a mesma em todos os workers
+BACKGROUND_TASKS_LOCK_ID = 7_215_839_021
+# Intervalo entre tentativas de pegar o lock e entre checagens da conexão
+LEADER_CHECK_SECONDS = 30
+
+TaskFactory = Callable[[], Awaitable[None]]
+
+
+async def hold_leadership(connection, task_factories: list[TaskFactory]):
+    """Runs the tasks until the connection holding the lock stops answering."""
+    logger.info("Este worker assumiu as tarefas em segundo plano.")
+    tasks = [asyncio.create_task(factory()) for factory in task_factories]
+    try:
+        while True:
+            await asyncio.sleep(LEADER_CHECK_SECONDS)
+            await connection.execute(text("SELECT 1"))
+            await connection.commit()
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def run_as_leader(task_factories: list[TaskFactory]) -> None:
+    while True:
+        try:
+            async with get_async_engine().connect() as connection:
+                acquired = (
+                    await connection.execute(
+                        text("SELECT pg_try_advisory_lock(:lock_id)"),
+                        {"lock_id": BACKGROUND_TASKS_LOCK_ID},
+                    )
+                ).scalar()
+                await connection.commit()
+                if acquired:
+                    try:
+                        await hold_leadership(connection, task_factories)
+                    finally:
+                        # Fecha em vez de devolver ao pool, liberando o lock
+                        await connection.invalidate()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Leader election failed: {e}", exc_info=True)
+
+        await asyncio.sleep(LEADER_CHECK_SECONDS)
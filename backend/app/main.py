@@ -3,35 +3,86 @@ import os
 from contextlib import asynccontextmanager
 
 from dotenv import load_dotenv
-from fastapi import FastAPI
+from fastapi import FastAPI, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 
 from app import websocket
-from app.background_tasks import run_periodic_data_fetch
+from app.background_tasks import (
+    run_periodic_data_fetch,
+    run_periodic_notification_archive,
+)
+from app.dependencies import get_async_engine, get_database_url
+from app.leader import run_as_leader
 from app.logger import get_logger
+from app.metrics import (
+    CONTENT_TYPE,
+    MetricsMiddleware,
+    get_metrics_token,
+    is_metrics_request_authorized,
+    render_metrics,
+)
+from app.profiling import ProfilingMiddleware, profiling_enabled
+from app.services.backtest_services import shutdown_backtest_executor
+from app.services.icon_services import close_icon_http_client
+from app.services.quality_services import close_quality_http_client
 from app.startup_tasks import verify_images_on_startup
+from app.utils import get_supabase_credentials
 
 load_dotenv()
 
 logger = get_logger(__name__)
 
-from .routers import internal, items, notifications, settings  # noqa: E402
+from .routers import (  # noqa: E402
+    backtest,
+    icons,
+    internal,
+    items,
+    market,
+    notifications,
+    settings,
+)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    # Os clientes são criados no primeiro uso, mas a configuração é validada aqui
+    # para o servidor não subir sem ela
+    get_database_url()
+    get_supabase_credentials()
+    internal.get_internal_webhook_secret()
+
     logger.info("Servidor iniciando: Iniciando a tarefa de busca de dados periódica.")
-    asyncio.create_task(run_periodic_data_fetch())
-    asyncio.create_task(verify_images_on_startup())
+    await websocket.connection_manager.start()
+    # Com vários workers, só um deles roda as tarefas
+    leader_task = asyncio.create_task(
+        run_as_leader(
+            [
+                run_periodic_data_fetch,
+                verify_images_on_startup,
+                run_periodic_notification_archive,
+            ]
+        )
+    )
     yield
     logger.info("Servidor desligando.")
+    leader_task.cancel()
+    await asyncio.gather(leader_task, return_exceptions=True)
+    await websocket.connection_manager.stop()
+    shutdown_backtest_executor()
+    await close_icon_http_client()
+    await close_quality_http_client()
+    await get_async_engine().dispose()
 
 
 app = FastAPI(lifespan=lifespan)
 app.include_router(items.router)
+app.include_router(market.router)
 app.include_router(notifications.router)
 app.include_router(settings.router)
 app.include_router(internal.router)
+app.include_router(backtest.router)
+app.include_router(icons.router)
 app.include_router(websocket.router)
 
 
@@ -40,6 +91,16 @@ def health_check():
     return {"status": "ok"}
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics(authorization: str | None = Header(default=None)):
+    # Só existe com METRICS_TOKEN definido
+    if get_metrics_token() is None:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not is_metrics_request_authorized(authorization):
+        raise HTTPException(status_code=403, detail="Acesso não autorizado")
+    return PlainTextResponse(render_metrics(), media_type=CONTENT_TYPE)
+
+
 origins = os.getenv("ALLOWED_ORIGINS", "http://localhost:5173").split(",")
 
 app.add_middleware(
@@ -49,3 +110,7 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
+# Só com PROFILING_TOKEN definido; por fora para o total incluir os outros middlewares
+if profiling_enabled():
+    app.add_middleware(ProfilingMiddleware)
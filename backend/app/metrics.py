@@ -0,0 +1,350 @@
+"""
+Minimal in-process metrics in the Prometheus text format, so /metrics needs
+no client library or outside service. Each worker process reports its own
+values. Updates are plain dict/list operations; rendering iterates over
+copies, since sync endpoints record DB metrics from the threadpool.
+
+The endpoint is off unless METRICS_TOKEN is set, and then expects
+`Authorization: Bearer <METRICS_TOKEN>` (Prometheus' `authorization` option).
+"""
+
+import bisect
+import hmac
+import os
+import re
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+from sqlalchemy import Engine, event
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Em segundos; o ciclo horário chega a dezenas de segundos
+DEFAULT_BUCKETS = (
+    0.001,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+    30,
+    60,
+)
+BYTES_BUCKETS = tuple(float(2**power) for power in range(10, 31, 2))
+
+
+def get_metrics_token() -> str | None:
+    return os.getenv("METRICS_TOKEN") or None
+
+
+def is_metrics_request_authorized(authorization: str | None) -> bool:
+    token = get_metrics_token()
+    if token is None:
+        return False
+    return hmac.compare_digest(authorization or "", f"Bearer {token}")
+
+
+def escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(names: tuple[str, ...], values: tuple[str, ...]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(
+        f'{name}="{escape_label(value)}"' for name, value in zip(names, values)
+    )
+    return "{" + pairs + "}"
+
+
+def format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.children: dict[tuple[str, ...], object] = {}
+        registry.append(self)
+
+    def labels(self, *values: object):
+        key = tuple(str(value) for value in values)
+        child = self.children.get(key)
+        if child is None:
+            child = self.children[key] = self.new_child()
+        return child
+
+    def new_child(self):
+        raise NotImplementedError
+
+    def samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+            *self.samples(),
+        ]
+        return "\n".join(lines)
+
+
+class CounterValue:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+
+class Counter(Metric):
+    type_name = "counter"
+
+    def new_child(self):
+        return CounterValue()
+
+    def samples(self):
+        for key, child in list(self.children.items()):
+            yield (
+                f"{self.name}_total{format_labels(self.labelnames, key)} "
+                f"{format_value(child.value)}"  # type: ignore
+            )
+
+
+class GaugeValue:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def set(self, value: float):
+        self.value = value
+
+
+class Gauge(Metric):
+    """Gauge set directly, or read from `function` at scrape time."""
+
+    type_name = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        function: Callable[[], float] | None = None,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.function = function
+
+    def new_child(self):
+        return GaugeValue()
+
+    def samples(self):
+        if self.function is not None:
+            yield f"{self.name} {format_value(self.function())}"
+            return
+        for key, child in list(self.children.items()):
+            yield (
+                f"{self.name}{format_labels(self.labelnames, key)} "
+                f"{format_value(child.value)}"  # type: ignore
+            )
+
+
+class HistogramValue:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    @contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+
+class Histogram(Metric):
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = buckets
+
+    def new_child(self):
+        return HistogramValue(self.buckets)
+
+    def samples(self):
+        for key, child in list(self.children.items()):
+            child: HistogramValue  # type: ignore
+            cumulative = 0
+            for upper, count in zip((*self.buckets, float("inf")), child.counts):
+                cumulative += count
+                labels = format_labels(
+                    (*self.labelnames, "le"), (*key, format_value(upper))
+                )
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = format_labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {format_value(child.sum)}"
+            yield f"{self.name}_count{labels} {child.count}"
+
+
+registry: list[Metric] = []
+
+
+def render_metrics() -> str:
+    return "\n".join(metric.render() for metric in list(registry)) + "\n"
+
+
+# Ingestão horária
+INGEST_PHASE_SECONDS = Histogram(
+    "ingest_phase_seconds",
+    "Time spent in each phase of the hourly ingestion.",
+    ("phase",),
+)
+INGEST_RUNS = Counter("ingest_runs", "Hourly ingestion runs by result.", ("result",))
+
+# HTTP
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_seconds",
+    "HTTP request latency by route template.",
+    ("method", "route", "status"),
+)
+
+# Banco de dados
+DB_QUERY_SECONDS = Histogram(
+    "db_query_seconds",
+    "Database statement execution time by statement type.",
+    ("operation",),
+)
+
+# API da Blizzard
+BLIZZARD_RESPONSES = Counter(
+    "blizzard_responses",
+    "Blizzard API responses by endpoint and status code.",
+    ("endpoint", "status"),
+)
+BLIZZARD_RETRIES = Counter(
+    "blizzard_retries", "Blizzard API requests retried.", ("reason",)
+)
+BLIZZARD_REQUEST_SECONDS = Histogram(
+    "blizzard_request_seconds",
+    "Blizzard API request time until the body is read.",
+    ("endpoint",),
+)
+BLIZZARD_PARSE_SECONDS = Histogram(
+    "blizzard_parse_seconds", "Blizzard API JSON decode time.", ("endpoint",)
+)
+BLIZZARD_RESPONSE_BYTES = Histogram(
+    "blizzard_response_bytes",
+    "Blizzard API response body size.",
+    ("endpoint",),
+    buckets=BYTES_BUCKETS,
+)
+
+# WebSocket
+WEBSOCKET_FANOUT_SECONDS = Histogram(
+    "websocket_fanout_seconds",
+    "Time to enqueue a broadcast for the local clients.",
+    ("target",),
+)
+WEBSOCKET_SEND_SECONDS = Histogram(
+    "websocket_send_seconds", "Time to send one message to a client."
+)
+WEBSOCKET_MESSAGES = Counter(
+    "websocket_messages", "WebSocket messages by result.", ("result",)
+)
+
+NUMERIC_SEGMENT = re.compile(r"/\d+")
+
+
+def endpoint_label(url: str) -> str:
+    """Path with numeric ids replaced, to keep the label set small."""
+    path = url.split("://", 1)[-1].split("?", 1)[0]
+    path = path[path.find("/") :] if "/" in path else "/"
+    return NUMERIC_SEGMENT.sub("/:id", path)
+
+
+def instrument_engine(engine: Engine):
+    """Times every statement run through the (sync or async's sync) engine."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(
+        conn, cursor, statement, parameters, context, executemany
+    ):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        start = conn.info["query_start"].pop()
+        operation = statement.lstrip().split(None, 1)[0].upper() if statement else ""
+        DB_QUERY_SECONDS.labels(operation).observe(time.perf_counter() - start)
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(context):
+        if context.connection is not None:
+            starts = context.connection.info.get("query_start")
+            if starts:
+                starts.pop()
+
+
+class MetricsMiddleware:
+    """Records the latency of each HTTP request labeled by its route template."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            HTTP_REQUEST_SECONDS.labels(
+                scope["method"],
+                getattr(route, "path", "unmatched"),
+                status,
+            ).observe(time.perf_counter() - start)
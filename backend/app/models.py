@@ -1,5 +1,6 @@
 import datetime
 
+from sqlalchemy import ARRAY, BigInteger, Enum, Float, Integer
 from sqlmodel import Field, SQLModel
 
 from app.schemas import Intent, NotificationType, Quality, Rarity
@@ -26,7 +27,9 @@ class Notification(SQLModel, table=True):
     __tablename__: str = "notifications"  #  type: ignore
 
     id: int | None = Field(default=None, primary_key=True)
-    type: NotificationType
+    type: NotificationType = Field(
+        sa_type=Enum(NotificationType, name="notification_type")  # type: ignore
+    )
     price_diff: int = Field(default=0)
     current_price: int
     price_threshold: int | None = None
@@ -50,6 +53,27 @@ class PriceHistory(SQLModel, table=True):
     )
 
 
+class PriceLiquidity(SQLModel, table=True):
+    __tablename__: str = "price_liquidity"  #  type: ignore
+
+    item_id: int = Field(primary_key=True, foreign_key="items.id")
+    timestamp: datetime.datetime = Field(primary_key=True)
+    target_quantity: int = Field(primary_key=True)
+    filled_quantity: int = Field(sa_type=BigInteger)  # type: ignore
+    total_cost: int = Field(sa_type=BigInteger)  # type: ignore
+
+
+class ItemSupply(SQLModel, table=True):
+    __tablename__: str = "item_supply"  #  type: ignore
+
+    item_id: int = Field(primary_key=True, foreign_key="items.id")
+    timestamp: datetime.datetime = Field(primary_key=True)
+    interval_hours: float
+    listed: int = Field(sa_type=BigInteger)  # type: ignore
+    removed: int = Field(sa_type=BigInteger)  # type: ignore
+    remaining: int = Field(sa_type=BigInteger)  # type: ignore
+
+
 class ItemCache(SQLModel, table=True):
     __tablename__: str = "item_cache"  #  type: ignore
 
@@ -67,3 +91,89 @@ class Settings(SQLModel, table=True):
     value: str
     label: str
     description: str
+
+
+class NotificationArchive(SQLModel, table=True):
+    __tablename__: str = "notifications_archive"  #  type: ignore
+
+    id: int = Field(primary_key=True)
+    type: NotificationType = Field(
+        sa_type=Enum(NotificationType, name="notification_type")  # type: ignore
+    )
+    price_diff: int = Field(default=0)
+    current_price: int
+    price_threshold: int | None = None
+    item_id: int = Field(foreign_key="items.id")
+    created_at: datetime.datetime = Field(nullable=False)
+    archived_at: datetime.datetime = Field(
+        default_factory=lambda: datetime.datetime.now(datetime.timezone.utc),
+        nullable=False,
+    )
+
+
+class ItemRollingStats(SQLModel, table=True):
+    __tablename__: str = "item_rolling_stats"  #  type: ignore
+
+    item_id: int = Field(primary_key=True, foreign_key="items.id")
+    half_life_hours: int = Field(primary_key=True)
+    price_mean: float
+    price_var: float = Field(default=0)
+    price_zscore: float = Field(default=0)
+    quantity_mean: float
+    quantity_var: float = Field(default=0)
+    quantity_zscore: float = Field(default=0)
+    return_mean: float = Field(default=0)
+    return_var: float = Field(default=0)
+    return_zscore: float = Field(default=0)
+    last_price: int
+    last_quantity: int
+    samples: int = Field(default=1)
+    last_timestamp: datetime.datetime = Field(nullable=False)
+
+
+class ItemForecastModel(SQLModel, table=True):
+    __tablename__: str = "item_forecast_models"  #  type: ignore
+
+    item_id: int = Field(primary_key=True, foreign_key="items.id")
+    sums: list[float] = Field(sa_type=ARRAY(Float))  # type: ignore
+    last_price: int
+    last_timestamp: datetime.datetime = Field(nullable=False)
+
+
+class MarketSnapshot(SQLModel, table=True):
+    __tablename__: str = "market_snapshots"  #  type: ignore
+
+    # Uma linha por snapshot, com colunas paralelas ordenadas por item_id
+    timestamp: datetime.datetime = Field(primary_key=True)
+    item_ids: list[int] = Field(sa_type=ARRAY(Integer))  # type: ignore
+    min_prices: list[int] = Field(sa_type=ARRAY(BigInteger))  # type: ignore
+    volumes: list[int] = Field(sa_type=ARRAY(BigInteger))  # type: ignore
+
+
+class MarketBasket(SQLModel, table=True):
+    __tablename__: str = "market_baskets"  #  type: ignore
+
+    id: int | None = Field(default=None, primary_key=True)
+    name: str
+    # None representa o mercado inteiro
+    item_ids: list[int] | None = Field(default=None, sa_type=ARRAY(Integer))  # type: ignore
+
+
+class MarketIndex(SQLModel, table=True):
+    __tablename__: str = "market_indices"  #  type: ignore
+
+    basket_id: int = Field(primary_key=True, foreign_key="market_baskets.id")
+    timestamp: datetime.datetime = Field(primary_key=True)
+    value: float
+    change: float = Field(default=0)
+    items: int = Field(default=0)
+    volume: int = Field(default=0, sa_type=BigInteger)  # type: ignore
+
+
+class VerifiedImage(SQLModel, table=True):
+    __tablename__: str = "verified_images"  #  type: ignore
+
+    # Imagem do item confirmada no Storage; refeita se o image_path mudar
+    item_id: int = Field(primary_key=True, foreign_key="items.id")
+    image_path: str
+    verified_at: datetime.datetime
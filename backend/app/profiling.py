@@ -0,0 +1,214 @@
+"""
+Opt-in profiling of a single request. With PROFILING_TOKEN set, a request
+carrying the token (header X-Profile-Token or query ?profile_token=) runs
+under cProfile and gets a Server-Timing header splitting DB, serialization
+and handler time. The .prof file is saved in PROFILE_DIR (open it with
+pstats or snakeviz) and named in the X-Profile-Id header.
+
+Without PROFILING_TOKEN neither the middleware nor the engine listeners are
+installed, so normal requests don't pay anything.
+"""
+
+import asyncio
+import cProfile
+import hmac
+import io
+import os
+import pstats
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from pathlib import Path
+from urllib.parse import parse_qsl
+
+from sqlalchemy import Engine, event
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.logger import get_logger
+
+logger = get_logger(__name__)
+
+PROFILE_HEADER = b"x-profile-token"
+PROFILE_QUERY_PARAM = "profile_token"
+PROFILE_DIR = Path(os.getenv("PROFILE_DIR", "profiles"))
+# Perfis mais antigos que isso são apagados ao salvar um novo
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "50"))
+SUMMARY_LINES = 15
+
+# Funções cujo tempo acumulado conta como serialização da resposta
+SERIALIZATION_FUNCTIONS = {
+    ("routing.py", "serialize_response"),
+    ("responses.py", "render"),
+}
+
+
+def get_profiling_token() -> str | None:
+    return os.getenv("PROFILING_TOKEN") or None
+
+
+def profiling_enabled() -> bool:
+    return get_profiling_token() is not None
+
+
+@dataclass
+class RequestTimings:
+    db: float = 0.0
+    queries: int = 0
+
+
+current_timings: ContextVar[RequestTimings | None] = ContextVar(
+    "current_timings", default=None
+)
+
+
+def instrument_engine(engine: Engine):
+    """
+    Adds the statement time to the profiled request running it. The context
+    reaches both the async engine's greenlets and the threadpool of sync
+    endpoints.
+    """
+    if not profiling_enabled():
+        return
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(
+        conn, cursor, statement, parameters, context, executemany
+    ):
+        if current_timings.get() is not None:
+            conn.info.setdefault("profile_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        timings = current_timings.get()
+        starts = conn.info.get("profile_query_start")
+        if timings is not None and starts:
+            timings.db += time.perf_counter() - starts.pop()
+            timings.queries += 1
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(context):
+        if context.connection is not None:
+            starts = context.connection.info.get("profile_query_start")
+            if starts:
+                starts.pop()
+
+
+def request_token(scope: Scope) -> str | None:
+    for name, value in scope["headers"]:
+        if name == PROFILE_HEADER:
+            return value.decode("latin-1")
+    query_string = scope.get("query_string", b"")
+    if PROFILE_QUERY_PARAM.encode() in query_string:
+        return dict(parse_qsl(query_string.decode("latin-1"))).get(PROFILE_QUERY_PARAM)
+    return None
+
+
+def serialization_seconds(stats: pstats.Stats) -> float:
+    total = 0.0
+    for (filename, _, function), entry in stats.stats.items():  # type: ignore
+        if (Path(filename).name, function) in SERIALIZATION_FUNCTIONS:
+            total += entry[3]
+    return total
+
+
+def server_timing(total: float, db: float, serialize: float | None) -> str:
+    parts = [f"db;dur={db * 1000:.1f}"]
+    handler = total - db
+    if serialize is not None:
+        parts.append(f"serialize;dur={serialize * 1000:.1f}")
+        handler -= serialize
+    parts.append(f"handler;dur={max(handler, 0) * 1000:.1f}")
+    parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
+
+
+def new_profile_id(scope: Scope) -> str:
+    route = getattr(scope.get("route"), "path", scope["path"])
+    slug = "".join(c if c.isalnum() else "_" for c in route).strip("_") or "root"
+    return f"{time.strftime('%Y%m%d-%H%M%S')}-{time.time_ns() % 10**6:06d}-{slug}"
+
+
+def save_profile(profiler: cProfile.Profile, profile_id: str):
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    profiler.dump_stats(PROFILE_DIR / f"{profile_id}.prof")
+
+    saved = sorted(PROFILE_DIR.glob("*.prof"), key=lambda path: path.stat().st_mtime)
+    for old in saved[: max(len(saved) - PROFILE_KEEP, 0)]:
+        old.unlink(missing_ok=True)
+
+
+def log_summary(stats: pstats.Stats, profile_id: str):
+    output = io.StringIO()
+    stats.stream = output  # type: ignore
+    stats.sort_stats("cumulative").print_stats(SUMMARY_LINES)
+    logger.info(f"Profile {profile_id}:\n{output.getvalue()}")
+
+
+class ProfilingMiddleware:
+    """
+    Profiles the requests carrying PROFILING_TOKEN. cProfile sees every
+    thread, so other requests running at the same time show up in the
+    profile too; only one request is profiled at a time, the others get
+    just the Server-Timing header.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.token = get_profiling_token() or ""
+        self.active = False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = request_token(scope)
+        if token is None or not hmac.compare_digest(token, self.token):
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        reset = current_timings.set(timings)
+        profiler = None
+        if not self.active:
+            self.active = True
+            profiler = cProfile.Profile()
+        profile_id = ""
+        start = time.perf_counter()
+
+        async def send_wrapper(message: Message):
+            nonlocal profile_id
+            # Corpo comum: o handler e a serialização já terminaram aqui
+            if message["type"] == "http.response.start":
+                total = time.perf_counter() - start
+                headers = MutableHeaders(scope=message)
+                serialize = None
+                if profiler is not None:
+                    profiler.disable()
+                    serialize = serialization_seconds(pstats.Stats(profiler))
+                    profiler.enable()
+                    profile_id = new_profile_id(scope)
+                    headers.append("X-Profile-Id", profile_id)
+                headers.append(
+                    "Server-Timing", server_timing(total, timings.db, serialize)
+                )
+            await send(message)
+
+        try:
+            if profiler is not None:
+                profiler.enable()
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                self.active = False
+            current_timings.reset(reset)
+
+        logger.info(
+            f"Profiled {scope['method']} {scope['path']}: {timings.queries} "
+            f"queries, db {timings.db * 1000:.1f}ms"
+        )
+        if profiler is not None:
+            profile_id = profile_id or new_profile_id(scope)
+            await asyncio.to_thread(save_profile, profiler, profile_id)
+            log_summary(pstats.Stats(profiler), profile_id)
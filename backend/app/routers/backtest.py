@@ -0,0 +1,86 @@
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+)
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.dependencies import get_async_db
+from app.schemas import BacktestRequest, BacktestResult, PriceDiff, Sign
+from app.services.backtest_engine import STRATEGY_PARAMS, param_value_error
+from app.services.backtest_services import run_backtests
+from app.utils import gold_and_silver_to_price, price_to_gold_and_silver
+
+router = APIRouter(
+    prefix="/backtest",
+    tags=["backtest"],
+)
+
+MAX_ITEMS = 200
+MAX_COMBINATIONS = 5000
+
+
+@router.post("/", response_model=list[BacktestResult])
+async def backtest(
+    backtest_request: BacktestRequest,
+    db_session: AsyncSession = Depends(get_async_db),
+):
+    strategy = backtest_request.strategy.value
+    unknown_params = set(backtest_request.params) - set(STRATEGY_PARAMS[strategy])
+    if unknown_params:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Parâmetros inválidos para a estratégia: {', '.join(sorted(unknown_params))}",
+        )
+    invalid_values = [
+        error
+        for name, values in backtest_request.params.items()
+        for value in values
+        if (error := param_value_error(name, value)) is not None
+    ]
+    if invalid_values:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Valores inválidos: {'; '.join(dict.fromkeys(invalid_values))}",
+        )
+    if not backtest_request.item_ids or len(backtest_request.item_ids) > MAX_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Informe entre 1 e {MAX_ITEMS} itens",
+        )
+    combinations = 1
+    for values in backtest_request.params.values():
+        combinations *= max(len(values), 1)
+    if combinations > MAX_COMBINATIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Muitas combinações de parâmetros (máximo {MAX_COMBINATIONS})",
+        )
+
+    results = await run_backtests(
+        db_session,
+        backtest_request.item_ids,
+        strategy,
+        {name: values for name, values in backtest_request.params.items() if values},
+        backtest_request.ah_cut,
+        gold_and_silver_to_price(backtest_request.deposit),
+        backtest_request.days,
+    )
+    results.sort(key=lambda result: result["profit"], reverse=True)
+
+    return [
+        BacktestResult(
+            item_id=result["item_id"],
+            params=result["params"],
+            profit=PriceDiff(
+                sign=Sign.POSITIVE if result["profit"] >= 0 else Sign.NEGATIVE,
+                **price_to_gold_and_silver(abs(result["profit"])).model_dump(),
+            ),
+            trades=result["trades"],
+            win_rate=result["win_rate"],
+            max_drawdown=price_to_gold_and_silver(result["max_drawdown"]),
+            invested=price_to_gold_and_silver(result["invested"]),
+            open_position=result["open_position"],
+        )
+        for result in results[: backtest_request.top]
+    ]
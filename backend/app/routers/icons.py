@@ -0,0 +1,88 @@
+import httpx
+from fastapi import (
+    APIRouter,
+    Depends,
+    Header,
+    HTTPException,
+    Path,
+    Query,
+    Response,
+)
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.dependencies import get_async_db
+from app.services.icon_services import (
+    ICON_CACHE_CONTROL,
+    ICON_SIZES,
+    IMMUTABLE_ICON_CACHE_CONTROL,
+    get_icon_by_digest,
+    get_item_icon,
+    icon_media_type,
+    icon_resizing_available,
+)
+
+router = APIRouter(
+    prefix="/icons",
+    tags=["icons"],
+)
+
+
+def validate_icon_size(
+    size: int | None = Query(
+        None,
+        description=f"Lado da miniatura em pixels: {', '.join(map(str, ICON_SIZES))}",
+    ),
+) -> int | None:
+    if size is not None and size not in ICON_SIZES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Tamanho inválido. Use um de: {', '.join(map(str, ICON_SIZES))}",
+        )
+    if size is not None and not icon_resizing_available():
+        # Sem o Pillow não há miniatura; servir o original com o ETag dela mentiria
+        raise HTTPException(
+            status_code=501, detail="Redimensionamento de ícones indisponível"
+        )
+    return size
+
+
+# Registrada antes de /{digest}: ids numéricos são itens, o resto é digest
+@router.get("/{item_id:int}")
+async def get_icon(
+    item_id: int,
+    size: int | None = Depends(validate_icon_size),
+    if_none_match: str | None = Header(None),
+    db_session: AsyncSession = Depends(get_async_db),
+):
+    try:
+        icon = await get_item_icon(db_session, item_id, size)
+    except httpx.HTTPError:
+        raise HTTPException(status_code=502, detail="Erro ao baixar o ícone do item")
+    if icon is None:
+        raise HTTPException(status_code=404, detail="Ícone não encontrado")
+
+    digest, content = icon
+    etag = f'"{digest[:32]}-{size or "full"}"'
+    headers = {"Cache-Control": ICON_CACHE_CONTROL, "ETag": etag}
+    if if_none_match == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content, media_type=icon_media_type(content), headers=headers)
+
+
+@router.get("/{digest}")
+async def get_icon_by_content(
+    digest: str = Path(pattern="^[0-9a-f]{64}$"),
+    size: int | None = Depends(validate_icon_size),
+):
+    """
+    Icon by the sha256 of its content, as returned in the items' `image`. The
+    content of a URL never changes, so it's cached as immutable.
+    """
+    content = await get_icon_by_digest(digest, size)
+    if content is None:
+        raise HTTPException(status_code=404, detail="Ícone não encontrado")
+    return Response(
+        content,
+        media_type=icon_media_type(content),
+        headers={"Cache-Control": IMMUTABLE_ICON_CACHE_CONTROL},
+    )
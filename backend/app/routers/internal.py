@@ -7,16 +7,18 @@ from fastapi import (
     Security,
 )
 from fastapi.security import APIKeyHeader
-from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from app.dependencies import get_db
+from app.dependencies import get_async_db
 from app.services.notification_services import notify_after_update
 from exceptions import EnvNotSetError
 
-INTERNAL_WEBHOOK_SECRET = os.getenv("INTERNAL_WEBHOOK_SECRET")
 
-if not INTERNAL_WEBHOOK_SECRET:
-    raise EnvNotSetError("INTERNAL_WEBHOOK_SECRET")
+def get_internal_webhook_secret() -> str:
+    internal_webhook_secret = os.getenv("INTERNAL_WEBHOOK_SECRET")
+    if not internal_webhook_secret:
+        raise EnvNotSetError("INTERNAL_WEBHOOK_SECRET")
+    return internal_webhook_secret
 
 
 API_KEY_HEADER = APIKeyHeader(name="X-Internal-Secret")
@@ -30,9 +32,9 @@ router = APIRouter(
 @router.post("/new-data")
 async def trigger_data_update_function(
     secret: str = Security(API_KEY_HEADER),
-    db_session: Session = Depends(get_db),
+    db_session: AsyncSession = Depends(get_async_db),
 ):
-    if secret != INTERNAL_WEBHOOK_SECRET:
+    if secret != get_internal_webhook_secret():
         raise HTTPException(status_code=403, detail="Acesso não autorizado")
 
     await notify_after_update(db_session)
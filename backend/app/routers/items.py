@@ -1,24 +1,36 @@
 import datetime
 import itertools
+from typing import Annotated, Literal
 
 import httpx
 from fastapi import (
     APIRouter,
     Depends,
     HTTPException,
+    Query,
     status,
 )
+from fastapi.responses import StreamingResponse
 from sqlmodel import Session, select, text
+from sqlmodel.ext.asyncio.session import AsyncSession
 from unidecode import unidecode
 
-from app.blizzard_api import fetch_blizzard_api
-from app.dependencies import get_db, get_http_client
+from app.blizzard_api import blizzard_api_url, fetch_blizzard_api
+from app.dependencies import get_async_db, get_db, get_http_client
+from app.logger import get_logger
 from app.models import Item, ItemCache
 from app.schemas import (
+    BulkItemsRequest,
     BuyingSellingData,
+    CorrelationMatrix,
     CreateItemOptions,
     EditItem,
     Intent,
+    ItemForecast,
+    ItemSearchResult,
+    ItemStats,
+    ItemSupplyResponse,
+    LiquidityLevel,
     PriceDiff,
     PriceGoldSilver,
     Rarity,
@@ -29,20 +41,48 @@ from app.schemas import (
     TodayResponse,
     WeekResponse,
 )
+from app.services.correlation_services import get_correlation_matrix
+from app.services.forecast_services import (
+    expected_profits_today,
+    get_items_forecast,
+)
+from app.services.history_services import (
+    count_history,
+    stream_history_json,
+    to_utc_naive,
+)
+from app.services.icon_services import forget_item_icons, item_icon_path
+from app.services.market_services import backfill_item_history
+from app.services.onboarding_services import (
+    ItemMetadata,
+    find_existing_and_cached,
+    resolve_item_metadata,
+    stream_bulk_add,
+    upload_item_image,
+)
+from app.services.quality_services import get_item_quality
+from app.services.search_services import item_search_index, search_items
+from app.services.stats_services import get_items_stats
+from app.services.supply_services import get_item_supply
 from app.utils import (
     best_price_window_start_date,
-    download_image_and_upload_to_supabase,
-    get_item_quality,
+    best_price_window_start_date_async,
     get_plotly_heatmap_data,
     gold_and_silver_to_price,
     price_to_gold_and_silver,
 )
 
+logger = get_logger(__name__)
+
 router = APIRouter(
     prefix="/items",
     tags=["items"],
 )
 
+MAX_CORRELATION_ITEMS = 200
+MAX_BULK_ITEMS = 500
+MAX_SEARCH_RESULTS = 50
+
 
 @router.get("/week", response_model=list[WeekResponse])
 def get_week_items(db_session: Session = Depends(get_db)):
@@ -124,7 +164,7 @@ def get_week_items(db_session: Session = Depends(get_db)):
                             },
                             "quality": item[2],
                             "rarity": item[4],
-                            "image": item[3],
+                            "image": item_icon_path(item[0]),
                         }
                         for item in items
                     ],
@@ -137,14 +177,20 @@ def get_week_items(db_session: Session = Depends(get_db)):
 
 
 @router.get("/today", response_model=list[TodayResponse])
-def get_today_items(db_session: Session = Depends(get_db)):
+async def get_today_items(
+    rank_by: Annotated[
+        Literal["expected_profit"] | None,
+        Query(description="Ordena os itens de cada hora pelo lucro esperado"),
+    ] = None,
+    db_session: AsyncSession = Depends(get_async_db),
+):
     today_weekday = (
         datetime.datetime.now().weekday() + 1
     ) % 7  # Deixando weekday igual ao do SQL
 
-    window_start = best_price_window_start_date(db_session)
+    window_start = await best_price_window_start_date_async(db_session)
 
-    results = db_session.execute(
+    result = await db_session.execute(
         text("""
         WITH AggregatedHistory AS (
             SELECT
@@ -155,7 +201,7 @@ def get_today_items(db_session: Session = Depends(get_db)):
             FROM
                 price_history
             WHERE
-                (:window_start IS NULL OR "timestamp" >= :window_start)
+                (CAST(:window_start AS timestamp) IS NULL OR "timestamp" >= :window_start)
             GROUP BY
                 item_id,
                 weekday_num,
@@ -207,27 +253,57 @@ def get_today_items(db_session: Session = Depends(get_db)):
     """),
         {"today_weekday": today_weekday, "window_start": window_start},
     )
+    results = result.fetchall()
 
-    return [
-        {
-            "hour": f"{str(hour).zfill(2)}:00",
-            "items": [
+    expected_profits = {}
+    if rank_by == "expected_profit":
+        expected_profits = await expected_profits_today(
+            db_session, [int(item[0]) for item in results]
+        )
+
+    today_items = []
+    for hour, items in itertools.groupby(results, key=lambda x: x[9]):
+        hour_items = []
+        for item in items:
+            profit = (
+                float(expected_profits[item[0]][hour])
+                if item[0] in expected_profits
+                else None
+            )
+            hour_items.append(
                 {
                     "id": item[0],
                     "name": item[1],
                     "price": {"gold": int(item[10]), "silver": int(item[11])},
                     "quality": item[2],
                     "rarity": item[4],
-                    "image": item[3],
+                    "image": item_icon_path(item[0]),
                     "intent": item[5],
                     "notify_sell": bool(item[7]),
                     "notify_buy": bool(item[6]),
+                    "expected_profit": None
+                    if profit is None
+                    else PriceDiff(
+                        sign=Sign.POSITIVE if profit >= 0 else Sign.NEGATIVE,
+                        **price_to_gold_and_silver(abs(profit)).model_dump(),
+                    ),
                 }
-                for item in items
-            ],
-        }
-        for hour, items in itertools.groupby(results, key=lambda x: x[9])
-    ]
+            )
+
+        if rank_by == "expected_profit":
+            # Maior lucro esperado primeiro, itens sem previsão no final
+            hour_items.sort(
+                key=lambda item: (
+                    expected_profits[item["id"]][hour]
+                    if item["id"] in expected_profits
+                    else float("-inf")
+                ),
+                reverse=True,
+            )
+
+        today_items.append({"hour": f"{str(hour).zfill(2)}:00", "items": hour_items})
+
+    return today_items
 
 
 @router.get("/", response_model=list[TodayItem])
@@ -305,7 +381,7 @@ def get_items(
                 "silver": int((item[9] / 10000 - int(item[9] / 10000)) * 100),
             },
             "quality": item[3],
-            "image": item[2],
+            "image": item_icon_path(item[0]),
             "rarity": item[7],
             "intent": item[4],
             "notify_sell": bool(item[5]),
@@ -316,76 +392,118 @@ def get_items(
     ]
 
 
+@router.get("/stats", response_model=list[ItemStats])
+async def get_items_rolling_stats(
+    item_ids: Annotated[list[int] | None, Query()] = None,
+    db_session: AsyncSession = Depends(get_async_db),
+):
+    return await get_items_stats(db_session, item_ids)
+
+
+@router.get("/correlation", response_model=CorrelationMatrix)
+async def get_items_correlation(
+    item_ids: Annotated[list[int] | None, Query()] = None,
+    days: Annotated[int, Query(ge=1, le=365)] = 30,
+    db_session: AsyncSession = Depends(get_async_db),
+):
+    if item_ids and len(set(item_ids)) > MAX_CORRELATION_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Informe no máximo {MAX_CORRELATION_ITEMS} itens",
+        )
+    return await get_correlation_matrix(db_session, item_ids, days)
+
+
+@router.get("/forecast", response_model=list[ItemForecast])
+async def get_items_price_forecast(
+    hours: Annotated[int, Query(ge=1, le=168)] = 24,
+    item_ids: Annotated[list[int] | None, Query()] = None,
+    db_session: AsyncSession = Depends(get_async_db),
+):
+    return await get_items_forecast(db_session, hours, item_ids)
+
+
+@router.get("/search", response_model=list[ItemSearchResult])
+async def search_item_names(
+    q: Annotated[str, Query(min_length=2, max_length=100)],
+    limit: Annotated[int, Query(ge=1, le=MAX_SEARCH_RESULTS)] = 10,
+    db_session: AsyncSession = Depends(get_async_db),
+):
+    """Typeahead over the cached item names, ignoring case and accents."""
+    return await search_items(db_session, q, limit)
+
+
+@router.post("/bulk")
+async def add_items_bulk(
+    bulk_request: BulkItemsRequest,
+    db_session: AsyncSession = Depends(get_async_db),
+):
+    """
+    Adds many items at once. Returns NDJSON with one BulkItemResult per id,
+    streamed as each item is resolved and saved.
+    """
+    item_ids = list(dict.fromkeys(bulk_request.item_ids))
+    if not item_ids:
+        raise HTTPException(status_code=400, detail="Nenhum item informado")
+    if len(item_ids) > MAX_BULK_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Máximo de {MAX_BULK_ITEMS} itens por requisição",
+        )
+
+    existing, cached = await find_existing_and_cached(db_session, item_ids)
+    return StreamingResponse(
+        stream_bulk_add(item_ids, existing, cached, bulk_request.options),
+        media_type="application/x-ndjson",
+    )
+
+
 @router.post("/{item_id}", status_code=201, response_model=Item)
 async def add_item(
     item_id: int,
     item_optionals: CreateItemOptions,
-    db_session: Session = Depends(get_db),
+    db_session: AsyncSession = Depends(get_async_db),
     httpx_client: httpx.AsyncClient = Depends(get_http_client),
 ):
-    result = db_session.exec(select(1).where(Item.id == item_id)).first()
+    result = (await db_session.exec(select(1).where(Item.id == item_id))).first()
     if result is not None:
         raise HTTPException(status_code=409, detail="Item já adicionado")
     try:
-        cached_item = db_session.exec(
-            select(ItemCache).where(ItemCache.item_id == item_id)
+        cached_item = (
+            await db_session.exec(select(ItemCache).where(ItemCache.item_id == item_id))
         ).first()
 
         if cached_item:
-            item_name = cached_item.name
-            img_url = cached_item.blizzard_image_url
-            item_quality = cached_item.quality
-            item_rarity = cached_item.rarity
-
-        else:
-            item_response = await fetch_blizzard_api(
-                f"https://us.api.blizzard.com/data/wow/item/{item_id}",
-                httpx_client,
-                {"namespace": "static-us", "locale": "pt_BR"},
-                "Item",
+            metadata = ItemMetadata(
+                name=cached_item.name,
+                blizzard_image_url=cached_item.blizzard_image_url,
+                quality=cached_item.quality,
+                rarity=cached_item.rarity,
             )
 
-            item_name = item_response["name"]
-            item_rarity = item_response["quality"]["type"]
-
-            img_response = await fetch_blizzard_api(
-                item_response["media"]["key"]["href"],
-                httpx_client,
-            )
-            img_url = img_response["assets"][0]["value"]
-            item_quality = await get_item_quality(item_id, httpx_client)
+        else:
+            metadata = await resolve_item_metadata(httpx_client, item_id)
 
             item_cache = ItemCache(
                 item_id=item_id,
-                name=item_name,
-                blizzard_image_url=img_url,
-                quality=item_quality,
-                rarity=item_rarity,
+                name=metadata.name,
+                blizzard_image_url=metadata.blizzard_image_url,
+                quality=metadata.quality,
+                rarity=metadata.rarity,
             )
             db_session.add(item_cache)
-            db_session.commit()
-
-        img_path = img_url.split("/")[-1]
-
-        tries = 0
-        uploaded_image_url = None
-        while tries < 3 and not uploaded_image_url:
-            tries += 1
-            uploaded_image_url = await download_image_and_upload_to_supabase(
-                httpx_client, img_url, img_path
-            )
+            await db_session.commit()
 
-        if not uploaded_image_url:
-            uploaded_image_url = (
-                img_url  # Fallback para a URL original se o upload falhar 3 vezes
-            )
+        uploaded_image_url = await upload_item_image(
+            httpx_client, metadata.blizzard_image_url
+        )
 
         item = Item(
             id=item_id,
-            name=item_name,
+            name=metadata.name,
             image_path=uploaded_image_url,
-            quality=item_quality,
-            rarity=item_rarity,
+            quality=metadata.quality,
+            rarity=metadata.rarity,
             quantity_threshold=item_optionals.quantity_threshold,
             intent=item_optionals.intent,
             above_alert=gold_and_silver_to_price(item_optionals.above_alert),
@@ -395,8 +513,18 @@ async def add_item(
         )
 
         db_session.add(item)
-        db_session.commit()
-        db_session.refresh(item)
+        await db_session.commit()
+        await db_session.refresh(item)
+        item_search_index.invalidate()
+        forget_item_icons([item_id])
+
+        # Itens acompanhados pelo mercado completo já chegam com histórico; o
+        # item já foi criado, então uma falha aqui não derruba a requisição
+        try:
+            await backfill_item_history(db_session, item_id)
+        except Exception as e:
+            await db_session.rollback()
+            logger.warning(f"History backfill failed for item {item_id}: {e}")
 
         return item
 
@@ -416,28 +544,28 @@ async def add_item(
 async def get_item_blizzard(
     item_id: int,
     httpx_client: httpx.AsyncClient = Depends(get_http_client),
-    db_session: Session = Depends(get_db),
+    db_session: AsyncSession = Depends(get_async_db),
 ) -> SearchItem:
-    result = db_session.exec(select(1).where(Item.id == item_id)).first()
+    result = (await db_session.exec(select(1).where(Item.id == item_id))).first()
     if result is not None:
         raise HTTPException(status_code=409, detail="Item já adicionado")
 
-    cached_item = db_session.exec(
-        select(ItemCache).where(ItemCache.item_id == item_id)
+    cached_item = (
+        await db_session.exec(select(ItemCache).where(ItemCache.item_id == item_id))
     ).first()
 
     if cached_item:
         return SearchItem(
             id=item_id,
             name=cached_item.name,
-            image=cached_item.blizzard_image_url,
+            image=item_icon_path(item_id),
             quality=cached_item.quality,
             rarity=cached_item.rarity,
         )
 
     try:
         item_response = await fetch_blizzard_api(
-            f"https://us.api.blizzard.com/data/wow/item/{item_id}",
+            blizzard_api_url(f"/data/wow/item/{item_id}"),
             httpx_client,
             {"namespace": "static-us", "locale": "pt_BR"},
             "Item",
@@ -448,7 +576,7 @@ async def get_item_blizzard(
             httpx_client,
         )
         img_url = img_response["assets"][0]["value"]
-        item_quality = await get_item_quality(item_id, httpx_client)
+        item_quality = await get_item_quality(item_id)
 
         db_session.add(
             ItemCache(
@@ -459,12 +587,13 @@ async def get_item_blizzard(
                 rarity=item_response["quality"]["type"],
             )
         )
-        db_session.commit()
+        await db_session.commit()
+        item_search_index.invalidate()
 
         return SearchItem(
             id=item_id,
             name=item_response["name"],
-            image=img_url,
+            image=item_icon_path(item_id),
             quality=item_quality,
             rarity=Rarity(item_response["quality"]["type"]),
         )
@@ -582,6 +711,78 @@ def get_item_plot_data(item_id: int, db_session: Session = Depends(get_db)):
     }
 
 
+@router.get("/{item_id}/history")
+async def get_item_history(
+    item_id: int,
+    from_date: Annotated[datetime.datetime | None, Query(alias="from")] = None,
+    to_date: Annotated[datetime.datetime | None, Query(alias="to")] = None,
+    max_points: Annotated[int, Query(ge=3, le=5000)] = 500,
+    method: Annotated[Literal["lttb", "minmax"], Query()] = "lttb",
+    db_session: AsyncSession = Depends(get_async_db),
+):
+    """
+    Histórico de preço e quantidade em qualquer intervalo (padrão: últimos 7
+    dias), reduzido para no máximo `max_points` pontos.
+    """
+    result = (await db_session.exec(select(1).where(Item.id == item_id))).first()
+    if result is None:
+        raise HTTPException(status_code=404, detail="Item não encontrado")
+
+    end = (
+        to_utc_naive(to_date)
+        if to_date
+        else datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+    )
+    start = to_utc_naive(from_date) if from_date else end - datetime.timedelta(days=7)
+    if start > end:
+        raise HTTPException(
+            status_code=400, detail="A data inicial deve ser anterior à data final"
+        )
+
+    total = await count_history(item_id, start, end)
+    return StreamingResponse(
+        stream_history_json(item_id, start, end, total, max_points, method),
+        media_type="application/json",
+    )
+
+
+@router.get("/{item_id}/stats", response_model=ItemStats)
+async def get_item_rolling_stats(
+    item_id: int,
+    db_session: AsyncSession = Depends(get_async_db),
+):
+    items_stats = await get_items_stats(db_session, [item_id])
+    if not items_stats:
+        raise HTTPException(status_code=404, detail="Estatísticas não encontradas")
+    return items_stats[0]
+
+
+@router.get("/{item_id}/forecast", response_model=ItemForecast)
+async def get_item_price_forecast(
+    item_id: int,
+    hours: Annotated[int, Query(ge=1, le=168)] = 24,
+    db_session: AsyncSession = Depends(get_async_db),
+):
+    items_forecast = await get_items_forecast(db_session, hours, [item_id])
+    if not items_forecast:
+        raise HTTPException(status_code=404, detail="Previsão não encontrada")
+    return items_forecast[0]
+
+
+@router.get("/{item_id}/supply", response_model=ItemSupplyResponse)
+async def get_item_supply_velocity(
+    item_id: int,
+    days: Annotated[int, Query(ge=1, le=90)] = 7,
+    db_session: AsyncSession = Depends(get_async_db),
+):
+    item_supply = await get_item_supply(db_session, item_id, days)
+    if item_supply is None:
+        raise HTTPException(
+            status_code=404, detail="Dados de oferta não encontrados para o item"
+        )
+    return item_supply
+
+
 @router.get("/{item_id}", response_model=ReturnItem)
 def get_item(
     item_id: int,
@@ -591,7 +792,6 @@ def get_item(
         text("""
             SELECT
                 i.name,
-                i.image_path,
                 i.quality,
                 i.rarity,
                 i.intent,
@@ -622,7 +822,6 @@ def get_item(
 
     (
         name,
-        image_path,
         quality,
         rarity,
         intent,
@@ -721,6 +920,25 @@ def get_item(
         buying_diff_obj = price_to_gold_and_silver(buying_diff)
         buying_best_avg_obj = price_to_gold_and_silver(buying_best_avg_price)
 
+    liquidity_data = db_session.execute(
+        text("""
+            SELECT
+                target_quantity,
+                filled_quantity,
+                total_cost
+            FROM
+                price_liquidity
+            WHERE
+                item_id = :item_id
+                AND "timestamp" = (
+                    SELECT MAX("timestamp") FROM price_liquidity WHERE item_id = :item_id
+                )
+            ORDER BY
+                target_quantity;
+        """),
+        {"item_id": item_id},
+    ).fetchall()
+
     price_obj = price_to_gold_and_silver(price)
     above_obj = price_to_gold_and_silver(above_alert)
     below_obj = price_to_gold_and_silver(below_alert)
@@ -730,7 +948,7 @@ def get_item(
         name=name,
         quality=quality,
         rarity=rarity,
-        image=image_path,
+        image=item_icon_path(item_id),
         intent=Intent(intent),
         quantity_threshold=quantity_threshold,
         notify_sell=bool(notify_sell),
@@ -765,6 +983,17 @@ def get_item(
         if intent == "buy" or intent == "both"
         else None,
         is_active=bool(is_active),
+        liquidity=[
+            LiquidityLevel(
+                quantity=target_quantity,
+                filled_quantity=filled_quantity,
+                total_cost=price_to_gold_and_silver(total_cost),
+                vwap=price_to_gold_and_silver(
+                    total_cost / filled_quantity if filled_quantity else 0
+                ),
+            )
+            for target_quantity, filled_quantity, total_cost in liquidity_data
+        ],
     )
 
 
@@ -0,0 +1,173 @@
+import datetime
+import itertools
+from typing import Annotated
+from zoneinfo import ZoneInfo
+
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    Query,
+)
+from sqlmodel import col, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.dependencies import get_async_db
+from app.models import MarketBasket, MarketIndex
+from app.schemas import MarketBasketBody, MarketIndexPoint, MarketIndexSeries
+
+router = APIRouter(
+    prefix="/market",
+    tags=["market"],
+)
+
+
+def to_local_label(timestamp: datetime.datetime) -> str:
+    return (
+        timestamp.replace(tzinfo=datetime.timezone.utc)
+        .astimezone(ZoneInfo("America/Sao_Paulo"))
+        .strftime("%Y-%m-%d %H:%M:%S")
+    )
+
+
+async def get_indices_series(
+    db_session: AsyncSession, days: int, basket_ids: list[int] | None = None
+) -> list[MarketIndexSeries]:
+    baskets_query = select(MarketBasket).order_by(col(MarketBasket.id))
+    if basket_ids:
+        baskets_query = baskets_query.where(col(MarketBasket.id).in_(basket_ids))
+    baskets = (await db_session.exec(baskets_query)).all()
+    if not baskets:
+        return []
+
+    start = datetime.datetime.now(datetime.timezone.utc).replace(
+        tzinfo=None
+    ) - datetime.timedelta(days=days)
+    points = (
+        await db_session.exec(
+            select(MarketIndex)
+            .where(
+                col(MarketIndex.basket_id).in_([basket.id for basket in baskets]),
+                col(MarketIndex.timestamp) >= start,
+            )
+            .order_by(col(MarketIndex.basket_id), col(MarketIndex.timestamp))
+        )
+    ).all()
+    points_by_basket = {
+        basket_id: list(group)
+        for basket_id, group in itertools.groupby(points, lambda point: point.basket_id)
+    }
+
+    return [
+        MarketIndexSeries(
+            basket_id=basket.id,  # type: ignore
+            name=basket.name,
+            points=[
+                MarketIndexPoint(
+                    timestamp=to_local_label(point.timestamp),
+                    value=point.value,
+                    change=point.change,
+                )
+                for point in points_by_basket.get(basket.id, [])  # type: ignore
+            ],
+        )
+        for basket in baskets
+    ]
+
+
+@router.get("/baskets", response_model=list[MarketBasket])
+async def get_baskets(db_session: AsyncSession = Depends(get_async_db)):
+    return (
+        await db_session.exec(select(MarketBasket).order_by(col(MarketBasket.id)))
+    ).all()
+
+
+@router.post("/baskets", status_code=201, response_model=MarketBasket)
+async def create_basket(
+    basket_body: MarketBasketBody, db_session: AsyncSession = Depends(get_async_db)
+):
+    if not basket_body.item_ids:
+        raise HTTPException(
+            status_code=400, detail="A cesta precisa ter pelo menos um item"
+        )
+
+    basket = MarketBasket(
+        name=basket_body.name, item_ids=sorted(set(basket_body.item_ids))
+    )
+    db_session.add(basket)
+    await db_session.commit()
+    await db_session.refresh(basket)
+    return basket
+
+
+@router.put("/baskets/{basket_id}", response_model=MarketBasket)
+async def update_basket(
+    basket_id: int,
+    basket_body: MarketBasketBody,
+    db_session: AsyncSession = Depends(get_async_db),
+):
+    basket = await db_session.get(MarketBasket, basket_id)
+    if not basket:
+        raise HTTPException(status_code=404, detail="Cesta não encontrada")
+    if basket.item_ids is None:
+        raise HTTPException(
+            status_code=400, detail="O índice do mercado inteiro não pode ser alterado"
+        )
+    if not basket_body.item_ids:
+        raise HTTPException(
+            status_code=400, detail="A cesta precisa ter pelo menos um item"
+        )
+
+    basket.name = basket_body.name
+    basket.item_ids = sorted(set(basket_body.item_ids))
+    db_session.add(basket)
+    await db_session.commit()
+    await db_session.refresh(basket)
+    return basket
+
+
+@router.delete("/baskets/{basket_id}")
+async def delete_basket(
+    basket_id: int, db_session: AsyncSession = Depends(get_async_db)
+):
+    basket = await db_session.get(MarketBasket, basket_id)
+    if not basket:
+        raise HTTPException(status_code=404, detail="Cesta não encontrada")
+    if basket.item_ids is None:
+        raise HTTPException(
+            status_code=400, detail="O índice do mercado inteiro não pode ser removido"
+        )
+
+    await db_session.delete(basket)
+    await db_session.commit()
+    return {"message": "Cesta removida com sucesso"}
+
+
+@router.get("/indices", response_model=list[MarketIndexSeries])
+async def get_indices(
+    days: Annotated[int, Query(ge=1, le=365)] = 30,
+    basket_ids: Annotated[list[int] | None, Query()] = None,
+    db_session: AsyncSession = Depends(get_async_db),
+):
+    """
+    Série de cada cesta nos últimos `days` dias. Os índices só são calculados
+    com a configuração track_all_commodities ligada: desligada, nenhum ponto
+    novo é gravado e as séries param no último snapshot.
+    """
+    return await get_indices_series(db_session, days, basket_ids)
+
+
+@router.get("/indices/{basket_id}", response_model=MarketIndexSeries)
+async def get_index(
+    basket_id: int,
+    days: Annotated[int, Query(ge=1, le=365)] = 30,
+    db_session: AsyncSession = Depends(get_async_db),
+):
+    """
+    Série de uma cesta; como em /indices, só recebe pontos novos com
+    track_all_commodities ligada.
+    """
+    series = await get_indices_series(db_session, days, [basket_id])
+    if not series:
+        raise HTTPException(status_code=404, detail="Cesta não encontrada")
+    return series[0]
@@ -8,11 +8,14 @@ from fastapi import (
     status,
 )
 from fastapi.responses import JSONResponse
-from sqlmodel import Session, and_, col, desc, func, not_, select, text
+from sqlmodel import and_, col, desc, func, not_, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from app.dependencies import get_db
+from app.dependencies import get_async_db
 from app.models import Item, Notification
 from app.schemas import ErrorResponse
+from app.services.icon_services import item_icon_path
+from app.services.notification_archive_services import mark_all_as_read_in_batches
 from app.utils import price_to_gold_and_silver
 
 router = APIRouter(
@@ -26,17 +29,15 @@ router = APIRouter(
     status_code=status.HTTP_200_OK,
     responses={500: {"model": ErrorResponse}},
 )
-async def mark_all_notifications_as_read(db_session: Session = Depends(get_db)):
+async def mark_all_notifications_as_read(
+    db_session: AsyncSession = Depends(get_async_db),
+):
     """Marca todas as notificações como lidas."""
     try:
-        result = db_session.execute(
-            text("UPDATE notifications SET read = true WHERE read = false;")
-        )
-
-        db_session.commit()
+        updated = await mark_all_as_read_in_batches(db_session)
 
         return {
-            "message": f"{result.rowcount} notificações foram marcadas como lidas.",  # type: ignore
+            "message": f"{updated} notificações foram marcadas como lidas.",
         }
 
     except Exception as e:
@@ -50,10 +51,12 @@ async def mark_all_notifications_as_read(db_session: Session = Depends(get_db)):
 
 @router.post("/{notification_id}/mark-read")
 async def mark_notification_as_read(
-    notification_id: int, db_session: Session = Depends(get_db)
+    notification_id: int, db_session: AsyncSession = Depends(get_async_db)
 ):
-    existing_notification = db_session.exec(
-        select(Notification).where(Notification.id == notification_id)
+    existing_notification = (
+        await db_session.exec(
+            select(Notification).where(Notification.id == notification_id)
+        )
     ).first()
 
     if not existing_notification:
@@ -63,7 +66,7 @@ async def mark_notification_as_read(
 
     existing_notification.read = True
     db_session.add(existing_notification)
-    db_session.commit()
+    await db_session.commit()
 
     return {
         "notification": existing_notification.model_dump_json(),
@@ -76,34 +79,42 @@ async def get_notifications(
     limit: int = 10,
     page: int = 1,
     ignore_read: bool = False,
-    db_session: Session = Depends(get_db),
+    db_session: AsyncSession = Depends(get_async_db),
 ):
     page = max(page, 1)
     limit = max(limit, 10)
 
     if ignore_read:
-        notifications = db_session.exec(
-            select(Notification, Item)
-            .where(and_(not_(Notification.read), Notification.item_id == Item.id))
-            .offset((page - 1) * limit)
-            .limit(limit)
-            .order_by(desc(Notification.created_at))
+        notifications = (
+            await db_session.exec(
+                select(Notification, Item)
+                .where(and_(not_(Notification.read), Notification.item_id == Item.id))
+                .offset((page - 1) * limit)
+                .limit(limit)
+                .order_by(desc(Notification.created_at))
+            )
         ).fetchall()
-        total = db_session.exec(
-            select(func.count(col(Notification.id))).where(not_(Notification.read))
+        total = (
+            await db_session.exec(
+                select(func.count(col(Notification.id))).where(not_(Notification.read))
+            )
         ).one()
     else:
-        notifications = db_session.exec(
-            select(Notification, Item)
-            .where(Notification.item_id == Item.id)
-            .offset((page - 1) * limit)
-            .limit(limit)
-            .order_by(desc(Notification.created_at))
+        notifications = (
+            await db_session.exec(
+                select(Notification, Item)
+                .where(Notification.item_id == Item.id)
+                .offset((page - 1) * limit)
+                .limit(limit)
+                .order_by(desc(Notification.created_at))
+            )
         ).fetchall()
-        total = db_session.exec(select(func.count(col(Notification.id)))).one()
+        total = (await db_session.exec(select(func.count(col(Notification.id))))).one()
 
-    total_unread = db_session.exec(
-        select(func.count(col(Notification.id))).where(not_(Notification.read))
+    total_unread = (
+        await db_session.exec(
+            select(func.count(col(Notification.id))).where(not_(Notification.read))
+        )
     ).one()
 
     return {
@@ -126,7 +137,7 @@ async def get_notifications(
                 "item": {
                     "id": item.id,
                     "name": item.name,
-                    "image": item.image_path,
+                    "image": item_icon_path(item.id),
                     "quality": item.quality,
                     "rarity": item.rarity,
                 },
@@ -1,6 +1,6 @@
 from enum import Enum
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class Quality(Enum):
@@ -35,6 +35,8 @@ class NotificationType(Enum):
     price_below_alert = "price_below_alert"
     price_above_best_avg_alert = "price_above_best_avg_alert"
     price_below_best_avg_alert = "price_below_best_avg_alert"
+    price_above_anomaly_alert = "price_above_anomaly_alert"
+    price_below_anomaly_alert = "price_below_anomaly_alert"
 
 
 class Rarity(Enum):
@@ -53,6 +55,13 @@ class Sign(Enum):
     NEGATIVE = "negative"
 
 
+class BacktestStrategy(Enum):
+    window = "window"
+    best_window = "best_window"
+    threshold = "threshold"
+    zscore = "zscore"
+
+
 class PriceGoldSilver(BaseModel):
     gold: int
     silver: int
@@ -104,6 +113,13 @@ class BuyingSellingData(BaseModel):
     price_diff: PriceDiff
 
 
+class LiquidityLevel(BaseModel):
+    quantity: int
+    filled_quantity: int
+    total_cost: PriceGoldSilver
+    vwap: PriceGoldSilver
+
+
 class ReturnItem(BaseModel):
     id: int
     name: str
@@ -122,6 +138,7 @@ class ReturnItem(BaseModel):
     selling: BuyingSellingData | None
     buying: BuyingSellingData | None
     is_active: bool
+    liquidity: list[LiquidityLevel] = []
 
 
 class SimpleItem(BaseModel):
@@ -147,6 +164,7 @@ class TodayItem(SimpleItem):
     intent: Intent
     notify_sell: bool
     notify_buy: bool
+    expected_profit: PriceDiff | None = None
 
 
 class TodayResponse(BaseModel):
@@ -165,3 +183,122 @@ class SearchItem(BaseModel):
     image: str
     quality: Quality
     rarity: Rarity
+
+
+class ItemSearchResult(SearchItem):
+    # Se o item já está na tabela items
+    added: bool
+
+
+class RollingStats(BaseModel):
+    half_life_hours: int
+    price_mean: float
+    price_std: float
+    price_zscore: float
+    quantity_mean: float
+    quantity_std: float
+    quantity_zscore: float
+    return_std: float
+    return_zscore: float
+
+
+class ItemStats(BaseModel):
+    item_id: int
+    last_price: PriceGoldSilver
+    last_quantity: int
+    last_timestamp: str
+    samples: int
+    windows: list[RollingStats]
+
+
+class SupplyPoint(BaseModel):
+    timestamp: str
+    interval_hours: float
+    listed: int
+    removed: int
+    remaining: int
+
+
+class ItemSupplyResponse(BaseModel):
+    item_id: int
+    listed_per_hour: float
+    removed_per_hour: float
+    points: list[SupplyPoint]
+
+
+class CorrelationMatrix(BaseModel):
+    item_ids: list[int]
+    # Número de retornos (intervalos entre snapshots) na janela
+    observations: int
+    # Linhas e colunas na ordem de item_ids; None sem dados suficientes
+    matrix: list[list[float | None]]
+
+
+class ForecastPoint(BaseModel):
+    timestamp: str
+    price: float
+
+
+class ItemForecast(BaseModel):
+    item_id: int
+    last_price: PriceGoldSilver
+    points: list[ForecastPoint]
+
+
+class MarketBasketBody(BaseModel):
+    name: str
+    item_ids: list[int]
+
+
+class MarketIndexPoint(BaseModel):
+    timestamp: str
+    value: float
+    change: float
+
+
+class MarketIndexSeries(BaseModel):
+    basket_id: int
+    name: str
+    points: list[MarketIndexPoint]
+
+
+class BacktestRequest(BaseModel):
+    item_ids: list[int]
+    strategy: BacktestStrategy
+    # Listas de valores por parâmetro; todas as combinações são testadas
+    params: dict[str, list[float]] = {}
+    # Fração da venda retida pela casa de leilões; 1 zeraria toda venda
+    ah_cut: float = Field(default=0.05, ge=0, lt=1)
+    deposit: PriceGoldSilver = PriceGoldSilver(gold=0, silver=0)
+    days: int | None = Field(default=None, ge=1)
+    top: int = Field(default=50, ge=1, le=1000)
+
+
+class BacktestResult(BaseModel):
+    item_id: int
+    params: dict[str, float]
+    profit: PriceDiff
+    trades: int
+    win_rate: float
+    max_drawdown: PriceGoldSilver
+    invested: PriceGoldSilver
+    open_position: bool
+
+
+class BulkItemsRequest(BaseModel):
+    item_ids: list[int]
+    # Mesmas opções para todos os itens
+    options: CreateItemOptions = CreateItemOptions()
+
+
+class BulkItemStatus(Enum):
+    created = "created"
+    exists = "exists"
+    error = "error"
+
+
+class BulkItemResult(BaseModel):
+    item_id: int
+    status: BulkItemStatus
+    name: str | None = None
+    detail: str | None = None
@@ -0,0 +1,193 @@
+"""
+Pure numpy backtesting engine. Kept free of database and app imports so the
+worker processes of the backtest pool start fast.
+"""
+
+import itertools
+import math
+from typing import NamedTuple
+
+import numpy as np
+
+SLOTS = 7 * 24
+
+STRATEGY_PARAMS: dict[str, dict[str, float]] = {
+    # Compra e vende em horários fixos (dia da semana: domingo = 0)
+    "window": {"buy_weekday": 0, "buy_hour": 0, "sell_weekday": 0, "sell_hour": 12},
+    # Escolhe os horários mais barato e mais caro na parte inicial do histórico
+    # (como o /items/week) e negocia no restante
+    "best_window": {"train_fraction": 0.5},
+    # Preços em ouro
+    "threshold": {"buy_price": 0, "sell_price": 0},
+    "zscore": {"half_life_hours": 168, "entry": 2, "exit": 0},
+}
+
+
+class ParamRange(NamedTuple):
+    minimum: float | None = None
+    maximum: float | None = None
+    # Com False, os extremos ficam de fora do intervalo
+    inclusive: bool = True
+    integer: bool = False
+
+
+WEEKDAY_RANGE = ParamRange(0, 6, integer=True)
+HOUR_RANGE = ParamRange(0, 23, integer=True)
+PARAM_RANGES: dict[str, ParamRange] = {
+    "buy_weekday": WEEKDAY_RANGE,
+    "buy_hour": HOUR_RANGE,
+    "sell_weekday": WEEKDAY_RANGE,
+    "sell_hour": HOUR_RANGE,
+    # 0 ou 1 deixariam o treino ou a negociação sem nenhum snapshot
+    "train_fraction": ParamRange(0, 1, inclusive=False),
+    "buy_price": ParamRange(0),
+    "sell_price": ParamRange(0),
+    # O ewm do pandas exige meia-vida positiva
+    "half_life_hours": ParamRange(0, inclusive=False),
+    "entry": ParamRange(0),
+    "exit": ParamRange(),
+}
+
+
+def param_value_error(name: str, value: float) -> str | None:
+    """Why `value` is out of the parameter's range, or None if it's valid."""
+    allowed = PARAM_RANGES[name]
+    if not math.isfinite(value):
+        return f"{name} deve ser um número finito"
+    if allowed.integer and not float(value).is_integer():
+        return f"{name} deve ser inteiro"
+    if allowed.minimum is not None and (
+        value < allowed.minimum or (not allowed.inclusive and value == allowed.minimum)
+    ):
+        comparison = ">=" if allowed.inclusive else ">"
+        return f"{name} deve ser {comparison} {allowed.minimum:g}"
+    if allowed.maximum is not None and (
+        value > allowed.maximum or (not allowed.inclusive and value == allowed.maximum)
+    ):
+        comparison = "<=" if allowed.inclusive else "<"
+        return f"{name} deve ser {comparison} {allowed.maximum:g}"
+    return None
+
+
+def parameter_combinations(
+    strategy: str, grid: dict[str, list[float]]
+) -> list[dict[str, float]]:
+    defaults = STRATEGY_PARAMS[strategy]
+    names = list(defaults.keys())
+    values = [grid.get(name, [defaults[name]]) for name in names]
+    return [dict(zip(names, combination)) for combination in itertools.product(*values)]
+
+
+def strategy_signals(
+    strategy: str,
+    params: dict[str, float],
+    prices: np.ndarray,
+    slots: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Boolean (entries, exits) arrays for one parameter combination."""
+    if strategy == "window":
+        buy_slot = int(params["buy_weekday"]) * 24 + int(params["buy_hour"])
+        sell_slot = int(params["sell_weekday"]) * 24 + int(params["sell_hour"])
+        return slots == buy_slot, slots == sell_slot
+
+    if strategy == "best_window":
+        train_size = int(len(prices) * params["train_fraction"])
+        counts = np.bincount(slots[:train_size], minlength=SLOTS)
+        sums = np.bincount(
+            slots[:train_size], weights=prices[:train_size], minlength=SLOTS
+        )
+        means = np.divide(sums, counts, out=np.full(SLOTS, np.nan), where=counts > 0)
+        trading = np.arange(len(prices)) >= train_size
+        if np.isnan(means).all():
+            no_signal = np.zeros(len(prices), dtype=bool)
+            return no_signal, no_signal
+        buy_slot = np.nanargmin(means)
+        sell_slot = np.nanargmax(means)
+        return trading & (slots == buy_slot), trading & (slots == sell_slot)
+
+    if strategy == "threshold":
+        return (
+            prices <= params["buy_price"] * 10000,
+            prices >= params["sell_price"] * 10000,
+        )
+
+    if strategy == "zscore":
+        import pandas as pd
+
+        series = pd.Series(prices)
+        ewm = series.ewm(halflife=params["half_life_hours"])
+        # Compara com a média até o snapshot anterior
+        means = ewm.mean().shift(1).to_numpy()
+        stds = ewm.std().shift(1).to_numpy()
+        zscores = np.divide(
+            prices - means,
+            stds,
+            out=np.zeros(len(prices)),
+            where=np.nan_to_num(stds) > 0,
+        )
+        return zscores <= -params["entry"], zscores >= params["exit"]
+
+    raise ValueError(f"Unknown strategy: {strategy}")
+
+
+def simulate(
+    prices: np.ndarray,
+    entries: np.ndarray,
+    exits: np.ndarray,
+    ah_cut: float,
+    deposit: int,
+) -> dict:
+    """
+    Holds at most one unit: buys on an entry while flat and sells on the next
+    exit. The position is the last signal forward filled, so no Python loop
+    is needed. Selling pays the auction house cut and the deposit.
+    """
+    signal = np.where(exits, 0.0, np.where(entries, 1.0, np.nan))
+    last_signal = np.maximum.accumulate(
+        np.where(np.isnan(signal), -1, np.arange(len(signal)))
+    )
+    position = np.where(last_signal >= 0, signal[last_signal], 0.0)
+    changes = np.diff(position, prepend=0)
+
+    buy_prices = prices[changes > 0]
+    sell_prices = prices[changes < 0]
+    # Uma compra no final sem venda fica em aberto
+    open_position = len(buy_prices) > len(sell_prices)
+    buy_prices = buy_prices[: len(sell_prices)]
+
+    trade_profits = sell_prices * (1 - ah_cut) - deposit - buy_prices
+    equity = np.cumsum(trade_profits)
+    peaks = np.maximum.accumulate(np.concatenate(([0.0], equity)))[1:]
+    max_drawdown = float((peaks - equity).max()) if len(equity) else 0.0
+
+    return {
+        "profit": float(equity[-1]) if len(equity) else 0.0,
+        "trades": int(len(trade_profits)),
+        "win_rate": float((trade_profits > 0).mean()) if len(trade_profits) else 0.0,
+        "max_drawdown": max_drawdown,
+        "invested": float(buy_prices.sum()),
+        "open_position": bool(open_position),
+    }
+
+
+def run_item_backtests(
+    item_id: int,
+    prices: np.ndarray,
+    slots: np.ndarray,
+    strategy: str,
+    combinations: list[dict[str, float]],
+    ah_cut: float,
+    deposit: int,
+) -> list[dict]:
+    """Runs every parameter combination over one item's history."""
+    results = []
+    for params in combinations:
+        entries, exits = strategy_signals(strategy, params, prices, slots)
+        results.append(
+            {
+                "item_id": item_id,
+                "params": params,
+                **simulate(prices, entries, exits, ah_cut, deposit),
+            }
+        )
+    return results
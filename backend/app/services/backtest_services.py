@@ -0,0 +1,108 @@
+import asyncio
+import datetime
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from sqlmodel import text
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.logger import get_logger
+from app.services.backtest_engine import parameter_combinations, run_item_backtests
+from app.services.forecast_services import slot_indexes
+
+logger = get_logger(__name__)
+
+_executor: ProcessPoolExecutor | None = None
+
+
+def get_backtest_executor() -> ProcessPoolExecutor:
+    """Pool criado sob demanda; usa spawn para não herdar o event loop."""
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=int(os.getenv("BACKTEST_WORKERS", str(os.cpu_count() or 1))),
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _executor
+
+
+def shutdown_backtest_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(cancel_futures=True)
+        _executor = None
+
+
+async def load_histories(
+    db_session: AsyncSession, item_ids: list[int], days: int | None
+) -> dict[int, tuple[np.ndarray, np.ndarray]]:
+    """Loads the price history of all items in one query as (prices, slots)."""
+    import pandas as pd
+
+    start = (
+        datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+        - datetime.timedelta(days=days)
+        if days
+        else None
+    )
+    result = await db_session.execute(
+        text("""
+            SELECT item_id, "timestamp", price
+            FROM price_history
+            WHERE
+                item_id = ANY(:item_ids)
+                AND (CAST(:start AS timestamp) IS NULL OR "timestamp" >= :start)
+            ORDER BY item_id, "timestamp";
+        """),
+        {"item_ids": item_ids, "start": start},
+    )
+    history = pd.DataFrame(result.fetchall(), columns=["item_id", "timestamp", "price"])
+    if history.empty:
+        return {}
+
+    history["slot"] = slot_indexes(history["timestamp"])
+    return {
+        int(item_id): (
+            group["price"].to_numpy(dtype=float),
+            group["slot"].to_numpy(dtype=np.int64),
+        )
+        for item_id, group in history.groupby("item_id", sort=False)
+    }
+
+
+async def run_backtests(
+    db_session: AsyncSession,
+    item_ids: list[int],
+    strategy: str,
+    grid: dict[str, list[float]],
+    ah_cut: float,
+    deposit: int,
+    days: int | None = None,
+) -> list[dict]:
+    """
+    Runs the parameter sweep for every item. Each item is a job in the
+    process pool; a single item runs inline to skip the pool overhead.
+    """
+    histories = await load_histories(db_session, item_ids, days)
+    combinations = parameter_combinations(strategy, grid)
+
+    jobs = [
+        (item_id, prices, slots, strategy, combinations, ah_cut, deposit)
+        for item_id, (prices, slots) in histories.items()
+    ]
+    if len(jobs) <= 1:
+        results = [run_item_backtests(*job) for job in jobs]
+    else:
+        loop = asyncio.get_running_loop()
+        executor = get_backtest_executor()
+        results = await asyncio.gather(
+            *(loop.run_in_executor(executor, run_item_backtests, *job) for job in jobs)
+        )
+
+    logger.info(
+        f"Backtest '{strategy}' ran {len(combinations)} combinations "
+        f"over {len(jobs)} items."
+    )
+    return [result for item_results in results for result in item_results]
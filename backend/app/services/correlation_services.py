@@ -0,0 +1,150 @@
+import datetime
+from collections import OrderedDict
+
+import numpy as np
+from sqlmodel import col, desc, select, text
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.models import Item, PriceHistory
+from app.schemas import CorrelationMatrix
+
+# Retornos em comum necessários para reportar a correlação de um par
+MIN_OBSERVATIONS = 24
+CACHE_SIZE = 32
+
+
+def aligned_log_returns(
+    item_ids: np.ndarray,
+    timestamps: np.ndarray,
+    prices: np.ndarray,
+    columns: np.ndarray,
+) -> np.ndarray:
+    """
+    Builds one (snapshots x items) price matrix aligned on the snapshot
+    timestamps, NaN where an item has no price, and returns its log returns.
+    `columns` must be sorted.
+    """
+    _, rows = np.unique(timestamps, return_inverse=True)
+    matrix = np.full((rows.max() + 1, len(columns)), np.nan)
+    matrix[rows, np.searchsorted(columns, item_ids)] = prices
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.diff(np.log(np.where(matrix > 0, matrix, np.nan)), axis=0)
+
+
+def pairwise_correlation(
+    returns: np.ndarray, min_observations: int = MIN_OBSERVATIONS
+) -> np.ndarray:
+    """
+    Pearson correlation of every pair of columns over the rows where both
+    have a value, using a handful of matrix products instead of a pair loop.
+    """
+    mask = ~np.isnan(returns)
+    values = np.where(mask, returns, 0.0)
+    weights = mask.astype(float)
+
+    counts = weights.T @ weights
+    sums = values.T @ weights  # soma de x nas linhas em que y existe
+    squares = (values**2).T @ weights
+    products = values.T @ values
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        covariance = products - sums * sums.T / counts
+        variance_x = squares - sums**2 / counts
+        variance_y = variance_x.T
+        correlation = covariance / np.sqrt(variance_x * variance_y)
+
+    correlation[(counts < min_observations) | ~np.isfinite(correlation)] = np.nan
+    np.fill_diagonal(
+        correlation, np.where(np.diag(counts) >= min_observations, 1.0, np.nan)
+    )
+    return np.clip(correlation, -1.0, 1.0)
+
+
+class CorrelationCache:
+    """Matrices already computed for the current data version (latest snapshot)."""
+
+    def __init__(self, max_size: int = CACHE_SIZE):
+        self.max_size = max_size
+        self.version: datetime.datetime | None = None
+        self.entries: OrderedDict[tuple, CorrelationMatrix] = OrderedDict()
+
+    def get(self, version: datetime.datetime | None, key: tuple):
+        if version != self.version:
+            self.version = version
+            self.entries.clear()
+            return None
+        matrix = self.entries.get(key)
+        if matrix is not None:
+            self.entries.move_to_end(key)
+        return matrix
+
+    def set(self, key: tuple, matrix: CorrelationMatrix):
+        self.entries[key] = matrix
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+
+correlation_cache = CorrelationCache()
+
+
+async def get_correlation_matrix(
+    db_session: AsyncSession, item_ids: list[int] | None, days: int
+) -> CorrelationMatrix:
+    version = (
+        await db_session.exec(
+            select(PriceHistory.timestamp)
+            .order_by(desc(PriceHistory.timestamp))
+            .limit(1)
+        )
+    ).one_or_none()
+
+    if not item_ids:
+        item_ids = list(
+            (
+                await db_session.exec(
+                    select(Item.id).where(Item.is_active).order_by(col(Item.id))
+                )
+            ).all()
+        )
+    columns = np.unique(np.asarray(item_ids, dtype=np.int64))
+
+    key = (tuple(columns.tolist()), days)
+    cached = correlation_cache.get(version, key)
+    if cached is not None:
+        return cached
+
+    start = (version or datetime.datetime.now()) - datetime.timedelta(days=days)
+    result = await db_session.execute(
+        text("""
+            SELECT item_id, "timestamp", price
+            FROM price_history
+            WHERE item_id = ANY(:item_ids) AND "timestamp" >= :start;
+        """),
+        {"item_ids": columns.tolist(), "start": start},
+    )
+    rows = result.fetchall()
+
+    if rows:
+        history_ids, timestamps, prices = zip(*rows)
+        returns = aligned_log_returns(
+            np.asarray(history_ids, dtype=np.int64),
+            np.asarray(timestamps, dtype="datetime64[us]"),
+            np.asarray(prices, dtype=float),
+            columns,
+        )
+        correlation = pairwise_correlation(returns)
+        observations = len(returns)
+    else:
+        correlation = np.full((len(columns), len(columns)), np.nan)
+        observations = 0
+
+    matrix = CorrelationMatrix(
+        item_ids=columns.tolist(),
+        observations=observations,
+        matrix=[
+            [None if np.isnan(value) else round(float(value), 4) for value in row]
+            for row in correlation
+        ],
+    )
+    correlation_cache.set(key, matrix)
+    return matrix
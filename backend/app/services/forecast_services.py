@@ -0,0 +1,343 @@
+import datetime
+from typing import TYPE_CHECKING
+
+import numpy as np
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlmodel import col, func, select, text
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.logger import get_logger
+from app.models import ItemForecastModel
+from app.schemas import ForecastPoint, ItemForecast
+from app.utils import price_to_gold_and_silver
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = get_logger(__name__)
+
+SLOTS = 7 * 24
+# Índices das somas guardadas em cada célula
+WEIGHT, SUM_T, SUM_Y, SUM_TT, SUM_TY = range(5)
+FORECAST_ORIGIN = datetime.datetime(2024, 1, 1)
+# Observações perdem metade do peso a cada 60 dias
+FORECAST_HALF_LIFE_DAYS = 60
+
+
+def days_since_origin(timestamps: "pd.Series | pd.DatetimeIndex") -> np.ndarray:
+    import pandas as pd
+
+    return (
+        (pd.DatetimeIndex(timestamps) - FORECAST_ORIGIN).total_seconds() / 86400
+    ).to_numpy(dtype=float)
+
+
+def slot_indexes(timestamps: "pd.Series | pd.DatetimeIndex") -> np.ndarray:
+    """Célula (dia da semana * 24 + hora) de cada horário UTC, no fuso de São Paulo."""
+    import pandas as pd
+
+    local = (
+        pd.DatetimeIndex(timestamps).tz_localize("UTC").tz_convert("America/Sao_Paulo")
+    )
+    # Mesmo dia da semana do EXTRACT(DOW) do SQL: domingo = 0
+    weekdays = (local.dayofweek.to_numpy() + 1) % 7
+    return weekdays * 24 + local.hour.to_numpy()
+
+
+def solve_models(sums: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Weighted least squares for `price = level[slot] + slope * t` on a stack of
+    sufficient statistics shaped (items, 168, 5). Returns the per-slot levels
+    (items, 168) and the shared slopes (items,), all items at once.
+    """
+    weights = sums[..., WEIGHT]
+    has_data = weights > 0
+    safe_weights = np.where(has_data, weights, 1)
+
+    centered_tt = np.where(
+        has_data, sums[..., SUM_TT] - sums[..., SUM_T] ** 2 / safe_weights, 0
+    )
+    centered_ty = np.where(
+        has_data,
+        sums[..., SUM_TY] - sums[..., SUM_T] * sums[..., SUM_Y] / safe_weights,
+        0,
+    )
+    sxx = centered_tt.sum(axis=1)
+    sxy = centered_ty.sum(axis=1)
+    slopes = np.divide(sxy, sxx, out=np.zeros_like(sxy), where=sxx > 1e-9)
+
+    levels = (sums[..., SUM_Y] - slopes[:, None] * sums[..., SUM_T]) / safe_weights
+    # Células sem histórico usam o nível médio do item
+    total_weight = weights.sum(axis=1)
+    fallback = np.divide(
+        sums[..., SUM_Y].sum(axis=1) - slopes * sums[..., SUM_T].sum(axis=1),
+        total_weight,
+        out=np.zeros_like(total_weight),
+        where=total_weight > 0,
+    )
+    levels = np.where(has_data, levels, fallback[:, None])
+
+    return levels, slopes
+
+
+def predict(sums: np.ndarray, future_timestamps: "pd.DatetimeIndex") -> np.ndarray:
+    """Predicted prices shaped (items, len(future_timestamps))."""
+    levels, slopes = solve_models(sums)
+    future_slots = slot_indexes(future_timestamps)
+    future_days = days_since_origin(future_timestamps)
+    return levels[:, future_slots] + slopes[:, None] * future_days[None, :]
+
+
+async def fit_from_history(
+    db_session: AsyncSession, item_ids: list[int], reference: datetime.datetime
+) -> dict[int, np.ndarray]:
+    """Builds the sufficient statistics of the given items from all their history."""
+    result = await db_session.execute(
+        text("""
+            WITH points AS (
+                SELECT
+                    item_id,
+                    (EXTRACT(DOW FROM "timestamp" AT TIME ZONE 'UTC' AT TIME ZONE 'America/Sao_Paulo') * 24
+                        + EXTRACT(HOUR FROM "timestamp" AT TIME ZONE 'UTC' AT TIME ZONE 'America/Sao_Paulo'))::integer AS slot,
+                    EXTRACT(EPOCH FROM "timestamp" - CAST(:origin AS timestamp)) / 86400.0 AS t,
+                    price::double precision AS y,
+                    power(0.5, EXTRACT(EPOCH FROM CAST(:reference AS timestamp) - "timestamp") / 86400.0 / :half_life) AS w
+                FROM
+                    price_history
+                WHERE
+                    item_id = ANY(:item_ids)
+                    AND "timestamp" <= CAST(:reference AS timestamp)
+            )
+            SELECT
+                item_id,
+                slot,
+                SUM(w),
+                SUM(w * t),
+                SUM(w * y),
+                SUM(w * t * t),
+                SUM(w * t * y)
+            FROM
+                points
+            GROUP BY
+                item_id,
+                slot;
+        """),
+        {
+            "item_ids": item_ids,
+            "origin": FORECAST_ORIGIN,
+            "reference": reference,
+            "half_life": float(FORECAST_HALF_LIFE_DAYS),
+        },
+    )
+
+    models: dict[int, np.ndarray] = {}
+    for item_id, slot, *slot_sums in result.fetchall():
+        if item_id not in models:
+            models[item_id] = np.zeros((SLOTS, 5))
+        models[item_id][slot] = [float(value) for value in slot_sums]
+    return models
+
+
+async def update_forecast_models(
+    db_session: AsyncSession, processed_data: "pd.DataFrame"
+) -> None:
+    """
+    Decays each item's statistics to the new snapshot time and adds the new
+    point, so the fit is refreshed in O(1) per item after every ingest.
+    Items without a stored model are fitted from their full history once.
+    """
+    import pandas as pd
+
+    item_ids = [int(item_id) for item_id in processed_data["item_id"]]
+    snapshot_time = pd.Timestamp(processed_data["timestamp"].iloc[0]).to_pydatetime()
+
+    stored = {
+        model.item_id: model
+        for model in (
+            await db_session.exec(
+                select(ItemForecastModel).where(
+                    col(ItemForecastModel.item_id).in_(item_ids)
+                )
+            )
+        ).all()
+    }
+
+    # O histórico já inclui o snapshot recém salvo
+    missing_ids = [item_id for item_id in item_ids if item_id not in stored]
+    fitted = (
+        await fit_from_history(db_session, missing_ids, snapshot_time)
+        if missing_ids
+        else {}
+    )
+
+    slots = slot_indexes(processed_data["timestamp"])
+    days = days_since_origin(processed_data["timestamp"])
+
+    rows = []
+    for (item_id, price), slot, t in zip(
+        processed_data[["item_id", "price"]].itertuples(index=False), slots, days
+    ):
+        item_id = int(item_id)
+        if item_id in stored:
+            model = stored[item_id]
+            elapsed_days = (
+                snapshot_time - model.last_timestamp
+            ).total_seconds() / 86400
+            if elapsed_days <= 0:
+                continue
+            sums = np.asarray(model.sums, dtype=float).reshape(SLOTS, 5)
+            sums *= 0.5 ** (elapsed_days / FORECAST_HALF_LIFE_DAYS)
+            sums[slot] += [1.0, t, float(price), t * t, t * float(price)]
+        elif item_id in fitted:
+            sums = fitted[item_id]
+        else:
+            continue
+
+        rows.append(
+            {
+                "item_id": item_id,
+                "sums": sums.ravel().tolist(),
+                "last_price": int(price),
+                "last_timestamp": snapshot_time,
+            }
+        )
+
+    if not rows:
+        return
+
+    insert_stmt = pg_insert(ItemForecastModel)
+    await db_session.execute(
+        insert_stmt.on_conflict_do_update(
+            index_elements=["item_id"],
+            set_={
+                "sums": insert_stmt.excluded.sums,
+                "last_price": insert_stmt.excluded.last_price,
+                "last_timestamp": insert_stmt.excluded.last_timestamp,
+            },
+        ),
+        rows,
+    )
+    await db_session.commit()
+
+    logger.info(f"Forecast models updated for {len(rows)} items.")
+
+
+class ForecastCache:
+    """Stacked models of every item, reloaded only when a new ingest lands."""
+
+    def __init__(self):
+        self.version: datetime.datetime | None = None
+        self.item_ids: np.ndarray = np.array([], dtype=int)
+        self.last_prices: np.ndarray = np.array([], dtype=float)
+        self.sums: np.ndarray = np.zeros((0, SLOTS, 5))
+
+    async def load(self, db_session: AsyncSession):
+        version = (
+            await db_session.exec(select(func.max(ItemForecastModel.last_timestamp)))
+        ).one()
+        if version is not None and version == self.version:
+            return
+
+        models = (
+            await db_session.exec(
+                select(ItemForecastModel).order_by(col(ItemForecastModel.item_id))
+            )
+        ).all()
+        self.item_ids = np.array([model.item_id for model in models], dtype=int)
+        self.last_prices = np.array([model.last_price for model in models], dtype=float)
+        self.sums = (
+            np.array([model.sums for model in models], dtype=float).reshape(
+                len(models), SLOTS, 5
+            )
+            if models
+            else np.zeros((0, SLOTS, 5))
+        )
+        self.version = version
+
+
+forecast_cache = ForecastCache()
+
+
+def future_hours(hours: int) -> "pd.DatetimeIndex":
+    import pandas as pd
+
+    now = pd.Timestamp.now(tz="UTC").tz_localize(None).floor("h")
+    return pd.date_range(now + pd.Timedelta(hours=1), periods=hours, freq="h")
+
+
+async def forecast_items(
+    db_session: AsyncSession, hours: int, item_ids: list[int] | None = None
+) -> "tuple[np.ndarray, np.ndarray, np.ndarray, pd.DatetimeIndex]":
+    """
+    Returns (item_ids, last_prices, predictions, timestamps) for the requested
+    items, with predictions shaped (items, hours) in copper.
+    """
+    await forecast_cache.load(db_session)
+
+    selected = (
+        np.isin(forecast_cache.item_ids, item_ids)
+        if item_ids
+        else np.ones(len(forecast_cache.item_ids), dtype=bool)
+    )
+    timestamps = future_hours(hours)
+    predictions = predict(forecast_cache.sums[selected], timestamps)
+
+    return (
+        forecast_cache.item_ids[selected],
+        forecast_cache.last_prices[selected],
+        predictions,
+        timestamps,
+    )
+
+
+async def get_items_forecast(
+    db_session: AsyncSession, hours: int, item_ids: list[int] | None = None
+) -> list[ItemForecast]:
+    ids, last_prices, predictions, timestamps = await forecast_items(
+        db_session, hours, item_ids
+    )
+    labels = (
+        timestamps.tz_localize("UTC")
+        .tz_convert("America/Sao_Paulo")
+        .strftime("%Y-%m-%d %H:%M:%S")
+        .tolist()
+    )
+
+    return [
+        ItemForecast(
+            item_id=int(item_id),
+            last_price=price_to_gold_and_silver(last_price),
+            points=[
+                ForecastPoint(timestamp=label, price=max(float(price), 0) / 10000)
+                for label, price in zip(labels, item_predictions)
+            ],
+        )
+        for item_id, last_price, item_predictions in zip(ids, last_prices, predictions)
+    ]
+
+
+async def expected_profits_today(
+    db_session: AsyncSession, item_ids: list[int]
+) -> dict[int, np.ndarray]:
+    """
+    Forecast price minus the latest price for every local hour of today,
+    indexed by hour (0-23), for each item with a model.
+    """
+    import pandas as pd
+
+    await forecast_cache.load(db_session)
+
+    selected = np.isin(forecast_cache.item_ids, item_ids)
+    today_local = pd.Timestamp.now(tz="America/Sao_Paulo").normalize()
+    timestamps = (
+        pd.date_range(today_local, periods=24, freq="h")
+        .tz_convert("UTC")
+        .tz_localize(None)
+    )
+    predictions = predict(forecast_cache.sums[selected], timestamps)
+    profits = predictions - forecast_cache.last_prices[selected][:, None]
+
+    return {
+        int(item_id): item_profits
+        for item_id, item_profits in zip(forecast_cache.item_ids[selected], profits)
+    }
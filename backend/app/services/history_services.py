@@ -0,0 +1,201 @@
+import datetime
+import json
+import math
+from typing import AsyncIterator, NamedTuple
+from zoneinfo import ZoneInfo
+
+from sqlmodel import text
+
+from app.dependencies import get_async_engine
+
+LOCAL_TIMEZONE = ZoneInfo("America/Sao_Paulo")
+# Linhas buscadas do cursor por vez
+CURSOR_BATCH_SIZE = 1000
+
+
+class HistoryPoint(NamedTuple):
+    timestamp: datetime.datetime
+    price: int
+    quantity: int
+
+    @property
+    def x(self) -> float:
+        return self.timestamp.replace(tzinfo=datetime.timezone.utc).timestamp()
+
+    def to_json(self) -> str:
+        label = (
+            self.timestamp.replace(tzinfo=datetime.timezone.utc)
+            .astimezone(LOCAL_TIMEZONE)
+            .strftime("%Y-%m-%d %H:%M:%S")
+        )
+        return json.dumps(
+            {"timestamp": label, "price": self.price / 10000, "quantity": self.quantity}
+        )
+
+
+def to_utc_naive(value: datetime.datetime) -> datetime.datetime:
+    """Datas sem fuso são consideradas no horário de São Paulo, como as do gráfico."""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=LOCAL_TIMEZONE)
+    return value.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+
+
+def bucket_average(bucket: list[HistoryPoint]) -> tuple[float, float]:
+    return (
+        sum(point.x for point in bucket) / len(bucket),
+        sum(point.price for point in bucket) / len(bucket),
+    )
+
+
+def largest_triangle(
+    previous: HistoryPoint, bucket: list[HistoryPoint], next_x: float, next_y: float
+) -> HistoryPoint:
+    """Point of the bucket forming the largest triangle with its neighbours."""
+    return max(
+        bucket,
+        key=lambda point: abs(
+            (previous.x - next_x) * (point.price - previous.price)
+            - (previous.x - point.x) * (next_y - previous.price)
+        ),
+    )
+
+
+async def lttb(
+    points: AsyncIterator[HistoryPoint], total: int, max_points: int
+) -> AsyncIterator[HistoryPoint]:
+    """
+    Largest-Triangle-Three-Buckets over a stream of `total` points. Only the
+    bucket being decided and the following one are kept in memory.
+    """
+    every = (total - 2) / (max_points - 2)
+    bucket_index = 0
+    boundary = math.floor(every) + 1
+    selected: HistoryPoint | None = None
+    current: list[HistoryPoint] | None = None
+    filling: list[HistoryPoint] = []
+
+    index = 0
+    async for point in points:
+        if index == 0:
+            selected = point
+            yield point
+        elif index == total - 1:
+            if current and filling:
+                selected = largest_triangle(selected, current, *bucket_average(filling))  # type: ignore
+                yield selected
+                current = filling
+            elif filling:
+                current = filling
+            if current:
+                yield largest_triangle(selected, current, point.x, point.price)  # type: ignore
+            yield point
+        else:
+            if index >= boundary:
+                # O balde em preenchimento está completo
+                if current is not None:
+                    selected = largest_triangle(
+                        selected,  # type: ignore
+                        current,
+                        *bucket_average(filling),
+                    )
+                    yield selected
+                current, filling = filling, []
+                bucket_index += 1
+                boundary = math.floor((bucket_index + 1) * every) + 1
+            filling.append(point)
+        index += 1
+
+
+async def min_max(
+    points: AsyncIterator[HistoryPoint], total: int, max_points: int
+) -> AsyncIterator[HistoryPoint]:
+    """Emits the cheapest and the priciest point of each bucket, in time order."""
+    bucket_size = math.ceil(total / max(max_points // 2, 1))
+    low: HistoryPoint | None = None
+    high: HistoryPoint | None = None
+
+    index = 0
+    async for point in points:
+        if low is None or point.price < low.price:
+            low = point
+        if high is None or point.price > high.price:
+            high = point
+        index += 1
+        if index % bucket_size == 0:
+            for extreme in sorted({low, high}, key=lambda p: p.timestamp):  # type: ignore
+                yield extreme
+            low = high = None
+
+    if low is not None and high is not None:
+        for extreme in sorted({low, high}, key=lambda p: p.timestamp):
+            yield extreme
+
+
+async def count_history(
+    item_id: int, start: datetime.datetime, end: datetime.datetime
+) -> int:
+    async with get_async_engine().connect() as connection:
+        result = await connection.execute(
+            text("""
+                SELECT COUNT(*)
+                FROM price_history
+                WHERE item_id = :item_id AND "timestamp" >= :start AND "timestamp" <= :end;
+            """),
+            {"item_id": item_id, "start": start, "end": end},
+        )
+        return int(result.scalar_one())
+
+
+async def stream_history_json(
+    item_id: int,
+    start: datetime.datetime,
+    end: datetime.datetime,
+    total: int,
+    max_points: int,
+    method: str,
+) -> AsyncIterator[str]:
+    """
+    Streams the range as JSON through a server-side cursor, downsampling on
+    the fly when it has more than `max_points` rows.
+    """
+    downsampled = total > max_points
+    yield (
+        json.dumps(
+            {
+                "item_id": item_id,
+                "method": method if downsampled else "raw",
+                "total_points": total,
+            }
+        )[:-1]
+        + ', "points": ['
+    )
+
+    async with get_async_engine().connect() as connection:
+        result = await connection.stream(
+            text("""
+                SELECT "timestamp", price, quantity
+                FROM price_history
+                WHERE item_id = :item_id AND "timestamp" >= :start AND "timestamp" <= :end
+                ORDER BY "timestamp"
+                LIMIT :total;
+            """).execution_options(yield_per=CURSOR_BATCH_SIZE),
+            {"item_id": item_id, "start": start, "end": end, "total": total},
+        )
+
+        async def rows() -> AsyncIterator[HistoryPoint]:
+            async for timestamp, price, quantity in result:
+                yield HistoryPoint(timestamp, price, quantity)
+
+        if not downsampled:
+            points = rows()
+        elif method == "minmax":
+            points = min_max(rows(), total, max_points)
+        else:
+            points = lttb(rows(), total, max_points)
+
+        separator = ""
+        async for point in points:
+            yield separator + point.to_json()
+            separator = ","
+
+    yield "]}"
@@ -0,0 +1,254 @@
+import asyncio
+import hashlib
+import importlib.util
+import io
+import os
+import time
+from collections import OrderedDict
+from functools import cache
+from pathlib import Path
+
+import httpx
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.logger import get_logger
+from app.models import Item, ItemCache
+
+logger = get_logger(__name__)
+
+# Tamanhos de miniatura aceitos (os ícones da Blizzard têm 56px)
+ICON_SIZES = (16, 24, 32, 40, 48)
+# /icons/{item_id} é por item, não por conteúdo: cache curto e revalidação pelo
+# ETag. /icons/{digest} nunca muda de conteúdo e pode ficar em cache para sempre
+ICON_MAX_AGE_SECONDS = 3600
+ICON_CACHE_CONTROL = f"public, max-age={ICON_MAX_AGE_SECONDS}"
+IMMUTABLE_ICON_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+class IconMemoryCache:
+    """LRU of icon bytes keyed by (digest, size), bounded by total size."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.entries: OrderedDict[tuple[str, int | None], bytes] = OrderedDict()
+
+    def get(self, key: tuple[str, int | None]) -> bytes | None:
+        content = self.entries.get(key)
+        if content is not None:
+            self.entries.move_to_end(key)
+        return content
+
+    def set(self, key: tuple[str, int | None], content: bytes):
+        if key in self.entries:
+            return
+        self.entries[key] = content
+        self.size += len(content)
+        while self.size > self.max_bytes and self.entries:
+            _, evicted = self.entries.popitem(last=False)
+            self.size -= len(evicted)
+
+
+class IconStore:
+    """
+    Icons on disk named by the sha256 of their content, so items sharing an
+    icon share the file. `urls/` maps each source URL to its digest.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+
+    def blob_path(self, digest: str) -> Path:
+        return self.directory / "blobs" / digest[:2] / digest
+
+    def url_path(self, url: str) -> Path:
+        return self.directory / "urls" / hashlib.sha256(url.encode()).hexdigest()
+
+    def read(self, digest: str) -> bytes | None:
+        try:
+            return self.blob_path(digest).read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def digest_for_url(self, url: str) -> str | None:
+        try:
+            digest = self.url_path(url).read_text().strip()
+        except FileNotFoundError:
+            return None
+        return digest if self.blob_path(digest).exists() else None
+
+    def write(self, url: str, content: bytes) -> str:
+        digest = hashlib.sha256(content).hexdigest()
+        blob_path = self.blob_path(digest)
+        if not blob_path.exists():
+            write_atomic(blob_path, content)
+        write_atomic(self.url_path(url), digest.encode())
+        return digest
+
+
+def write_atomic(path: Path, content: bytes):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temporary = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    temporary.write_bytes(content)
+    os.replace(temporary, path)
+
+
+icon_store = IconStore(Path(os.getenv("ICON_CACHE_DIR", "icon_cache")))
+icon_memory_cache = IconMemoryCache(
+    int(os.getenv("ICON_MEMORY_CACHE_MB", "32")) * 1024 * 1024
+)
+# item_id -> (digest, expira em); resolvido de novo depois do max-age, para uma
+# imagem trocada no banco aparecer
+item_icon_digests: dict[int, tuple[str, float]] = {}
+# Downloads em andamento por URL, para requisições simultâneas baixarem uma vez só
+pending_downloads: dict[str, asyncio.Task[str]] = {}
+
+_http_client: httpx.AsyncClient | None = None
+
+
+def get_icon_http_client() -> httpx.AsyncClient:
+    """Client shared by the icon requests, created on first use."""
+    global _http_client
+    if _http_client is None:
+        _http_client = httpx.AsyncClient(timeout=30, follow_redirects=True)
+    return _http_client
+
+
+async def close_icon_http_client():
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+async def download_icon(httpx_client: httpx.AsyncClient, url: str) -> str:
+    response = await httpx_client.get(url)
+    response.raise_for_status()
+    return await asyncio.to_thread(icon_store.write, url, response.content)
+
+
+async def fetch_icon(httpx_client: httpx.AsyncClient, url: str) -> tuple[str, bytes]:
+    """
+    Returns (digest, content) of the image at `url`, downloading it only if
+    it isn't on disk yet. Raises httpx.HTTPStatusError if the download fails.
+    """
+    digest = await asyncio.to_thread(icon_store.digest_for_url, url)
+    if digest is None:
+        task = pending_downloads.get(url)
+        if task is None:
+            task = asyncio.create_task(download_icon(httpx_client, url))
+            pending_downloads[url] = task
+            task.add_done_callback(lambda _: pending_downloads.pop(url, None))
+        digest = await asyncio.shield(task)
+
+    content = icon_memory_cache.get((digest, None))
+    if content is None:
+        content = await asyncio.to_thread(icon_store.read, digest)
+        if content is None:
+            # Arquivo removido do disco depois de indexado
+            digest = await download_icon(httpx_client, url)
+            content = await asyncio.to_thread(icon_store.read, digest) or b""
+        icon_memory_cache.set((digest, None), content)
+    return digest, content
+
+
+def icon_media_type(content: bytes) -> str:
+    if content.startswith(b"\x89PNG"):
+        return "image/png"
+    if content[:4] == b"RIFF" and content[8:12] == b"WEBP":
+        return "image/webp"
+    return "image/jpeg"
+
+
+@cache
+def icon_resizing_available() -> bool:
+    return importlib.util.find_spec("PIL") is not None
+
+
+def resize_icon(content: bytes, size: int) -> bytes:
+    """Thumbnail of the icon. Needs Pillow (see icon_resizing_available)."""
+    from PIL import Image
+
+    with Image.open(io.BytesIO(content)) as image:
+        image_format = image.format or "PNG"
+        thumbnail = image.resize((size, size), Image.Resampling.LANCZOS)
+        output = io.BytesIO()
+        thumbnail.save(output, format=image_format)
+        return output.getvalue()
+
+
+def item_icon_path(item_id: int) -> str:
+    """
+    Path to put in API responses instead of the image URL: the content-addressed
+    /icons/{digest} once this worker knows the item's icon, /icons/{item_id}
+    otherwise. Relative to the API base URL.
+    """
+    cached = item_icon_digests.get(item_id)
+    if cached and cached[1] > time.monotonic():
+        return f"/icons/{cached[0]}"
+    return f"/icons/{item_id}"
+
+
+def forget_item_icons(item_ids: list[int] | set[int]):
+    """Drops the cached digests, for items whose image just changed."""
+    for item_id in item_ids:
+        item_icon_digests.pop(item_id, None)
+
+
+async def item_icon_url(db_session: AsyncSession, item_id: int) -> str | None:
+    """Imagem do item no Storage ou, na falta dela, a URL da Blizzard em cache."""
+    image_path = (
+        await db_session.exec(select(Item.image_path).where(Item.id == item_id))
+    ).first()
+    if image_path:
+        return image_path
+    return (
+        await db_session.exec(
+            select(ItemCache.blizzard_image_url).where(ItemCache.item_id == item_id)
+        )
+    ).first()
+
+
+async def resized_icon(digest: str, content: bytes, size: int | None) -> bytes:
+    if size is None:
+        return content
+    resized = icon_memory_cache.get((digest, size))
+    if resized is None:
+        resized = await asyncio.to_thread(resize_icon, content, size)
+        icon_memory_cache.set((digest, size), resized)
+    return resized
+
+
+async def get_item_icon(
+    db_session: AsyncSession, item_id: int, size: int | None = None
+) -> tuple[str, bytes] | None:
+    """
+    Returns (digest, content) of the item icon, optionally resized. Once an
+    item's icon was seen, hits are served from memory without the database.
+    """
+    cached = item_icon_digests.get(item_id)
+    digest = cached[0] if cached and cached[1] > time.monotonic() else None
+    content = icon_memory_cache.get((digest, None)) if digest else None
+    if digest is None or content is None:
+        url = await item_icon_url(db_session, item_id)
+        if not url:
+            return None
+        digest, content = await fetch_icon(get_icon_http_client(), url)
+        item_icon_digests[item_id] = (
+            digest,
+            time.monotonic() + ICON_MAX_AGE_SECONDS,
+        )
+
+    return digest, await resized_icon(digest, content, size)
+
+
+async def get_icon_by_digest(digest: str, size: int | None = None) -> bytes | None:
+    """Icon already on disk (or in memory) with this digest, optionally resized."""
+    content = icon_memory_cache.get((digest, None))
+    if content is None:
+        content = await asyncio.to_thread(icon_store.read, digest)
+        if content is None:
+            return None
+        icon_memory_cache.set((digest, None), content)
+    return await resized_icon(digest, content, size)
@@ -0,0 +1,141 @@
+from typing import TYPE_CHECKING
+
+import numpy as np
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.logger import get_logger
+from app.models import PriceLiquidity
+from app.services.market_services import AuctionArrays
+from app.utils import get_settings_values_async
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = get_logger(__name__)
+
+DEFAULT_TARGET_QUANTITIES = "100,1000,5000,20000"
+
+
+def parse_target_quantities(value: str) -> list[int]:
+    targets = {int(target) for target in value.split(",") if target.strip()}
+    return sorted(target for target in targets if target > 0)
+
+
+def compute_liquidity(
+    item_ids: np.ndarray,
+    prices: np.ndarray,
+    quantities: np.ndarray,
+    targets: list[int],
+) -> "pd.DataFrame":
+    """
+    Cost to buy each target quantity from the cheapest listings of every item.
+    All items share one price ladder sorted by (item_id, price), so each
+    target is located with a single searchsorted over the global cumulative
+    quantity, offset by where each item's ladder starts.
+    Returns (item_id, target_quantity, filled_quantity, total_cost).
+    """
+    import pandas as pd
+
+    order = np.lexsort((prices, item_ids))
+    item_ids = item_ids[order]
+    prices = prices[order]
+    quantities = quantities[order]
+
+    cumulative_quantity = np.cumsum(quantities)
+    cumulative_cost = np.cumsum(prices * quantities)
+
+    unique_ids, starts = np.unique(item_ids, return_index=True)
+    ends = np.append(starts[1:], len(item_ids)) - 1
+    quantity_before = np.where(starts > 0, cumulative_quantity[starts - 1], 0)
+    cost_before = np.where(starts > 0, cumulative_cost[starts - 1], 0)
+    available = cumulative_quantity[ends] - quantity_before
+
+    # Uma linha por (item, alvo)
+    targets_array = np.asarray(targets, dtype=np.int64)
+    item_idx = np.repeat(np.arange(len(unique_ids)), len(targets_array))
+    wanted = np.tile(targets_array, len(unique_ids))
+
+    filled = np.minimum(wanted, available[item_idx])
+    # Primeira faixa de preço onde a quantidade acumulada alcança o alvo
+    level = np.searchsorted(
+        cumulative_quantity, quantity_before[item_idx] + filled, side="left"
+    )
+    level = np.minimum(level, ends[item_idx])
+    previous_quantity = np.where(
+        level > starts[item_idx],
+        cumulative_quantity[level - 1],
+        quantity_before[item_idx],
+    )
+    previous_cost = np.where(
+        level > starts[item_idx], cumulative_cost[level - 1], cost_before[item_idx]
+    )
+    total_cost = (
+        previous_cost
+        - cost_before[item_idx]
+        + (quantity_before[item_idx] + filled - previous_quantity) * prices[level]
+    )
+
+    return pd.DataFrame(
+        {
+            "item_id": unique_ids[item_idx],
+            "target_quantity": wanted,
+            "filled_quantity": filled,
+            "total_cost": total_cost,
+        }
+    )
+
+
+async def update_liquidity(
+    db_session: AsyncSession, arrays: AuctionArrays, processed_data: "pd.DataFrame"
+) -> None:
+    """Stores the cost-to-fill of the processed items at the snapshot time."""
+    import pandas as pd
+
+    settings = await get_settings_values_async(
+        db_session, ["liquidity_target_quantities"]
+    )
+    targets = parse_target_quantities(
+        settings.get("liquidity_target_quantities", DEFAULT_TARGET_QUANTITIES)
+    )
+    if not targets:
+        return
+
+    watched = np.isin(arrays.item_ids, processed_data["item_id"].to_numpy())
+    liquidity = compute_liquidity(
+        arrays.item_ids[watched],
+        arrays.prices[watched],
+        arrays.quantities[watched],
+        targets,
+    )
+    if liquidity.empty:
+        return
+
+    timestamp = pd.Timestamp(processed_data["timestamp"].iloc[0]).to_pydatetime()
+    rows = [
+        {
+            "item_id": int(item_id),
+            "timestamp": timestamp,
+            "target_quantity": int(target_quantity),
+            "filled_quantity": int(filled_quantity),
+            "total_cost": int(total_cost),
+        }
+        for item_id, target_quantity, filled_quantity, total_cost in liquidity[
+            ["item_id", "target_quantity", "filled_quantity", "total_cost"]
+        ].itertuples(index=False)
+    ]
+
+    insert_stmt = pg_insert(PriceLiquidity)
+    await db_session.execute(
+        insert_stmt.on_conflict_do_update(
+            index_elements=["item_id", "timestamp", "target_quantity"],
+            set_={
+                "filled_quantity": insert_stmt.excluded.filled_quantity,
+                "total_cost": insert_stmt.excluded.total_cost,
+            },
+        ),
+        rows,
+    )
+    await db_session.commit()
+
+    logger.info(f"Liquidity saved for {liquidity['item_id'].nunique()} items.")
@@ -0,0 +1,296 @@
+import math
+from datetime import datetime, timedelta, timezone
+from typing import NamedTuple
+
+import numpy as np
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlmodel import col, delete, desc, select, text
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.logger import get_logger
+from app.models import MarketBasket, MarketIndex, MarketSnapshot
+from app.utils import get_settings_values_async
+
+logger = get_logger(__name__)
+
+DEFAULT_MARKET_HISTORY_DAYS = 90
+# Valor inicial de todo índice
+INDEX_BASE_VALUE = 100.0
+
+
+class AuctionArrays(NamedTuple):
+    """Leilões do dump como arrays paralelos, na ordem do dump."""
+
+    auction_ids: np.ndarray
+    item_ids: np.ndarray
+    prices: np.ndarray
+    quantities: np.ndarray
+
+
+def auctions_to_arrays(auctions: list[dict]) -> AuctionArrays:
+    """
+    Converte os leilões do dump em arrays. Feito uma vez por ingestão: as fases
+    recebem os arrays em vez de percorrer a lista de dicts de novo.
+    """
+    count = len(auctions)
+    auction_ids = np.fromiter(
+        (auction["id"] for auction in auctions), dtype=np.int64, count=count
+    )
+    item_ids = np.fromiter(
+        (auction["item"]["id"] for auction in auctions), dtype=np.int64, count=count
+    )
+    prices = np.fromiter(
+        (auction["unit_price"] for auction in auctions), dtype=np.int64, count=count
+    )
+    quantities = np.fromiter(
+        (auction["quantity"] for auction in auctions), dtype=np.int64, count=count
+    )
+    return AuctionArrays(auction_ids, item_ids, prices, quantities)
+
+
+def aggregate_market(
+    item_ids: np.ndarray, prices: np.ndarray, quantities: np.ndarray
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Minimum unit price and total listed quantity of every item, sorted by
+    item id. One sort plus two segmented reductions, no Python loop.
+    """
+    if len(item_ids) == 0:
+        empty = np.array([], dtype=np.int64)
+        return empty, empty, empty
+
+    order = np.argsort(item_ids, kind="stable")
+    sorted_ids = item_ids[order]
+    unique_ids, starts = np.unique(sorted_ids, return_index=True)
+    min_prices = np.minimum.reduceat(prices[order], starts)
+    volumes = np.add.reduceat(quantities[order], starts)
+    return unique_ids, min_prices, volumes
+
+
+async def is_market_tracking_enabled(db_session: AsyncSession) -> bool:
+    settings = await get_settings_values_async(db_session, ["track_all_commodities"])
+    return settings.get("track_all_commodities", "false").lower() == "true"
+
+
+def snapshot_timestamp(snapshot_time: datetime) -> datetime:
+    return snapshot_time.astimezone(timezone.utc).replace(tzinfo=None, microsecond=0)
+
+
+async def save_market_snapshot(
+    db_session: AsyncSession,
+    market: tuple[np.ndarray, np.ndarray, np.ndarray],
+    snapshot_time: datetime,
+) -> None:
+    """Stores the whole commodity market of one snapshot in a single row."""
+    item_ids, min_prices, volumes = market
+    if len(item_ids) == 0:
+        return
+
+    timestamp = snapshot_timestamp(snapshot_time)
+    insert_stmt = pg_insert(MarketSnapshot).values(
+        timestamp=timestamp,
+        item_ids=item_ids.tolist(),
+        min_prices=min_prices.tolist(),
+        volumes=volumes.tolist(),
+    )
+    await db_session.execute(
+        insert_stmt.on_conflict_do_update(
+            index_elements=["timestamp"],
+            set_={
+                "item_ids": insert_stmt.excluded.item_ids,
+                "min_prices": insert_stmt.excluded.min_prices,
+                "volumes": insert_stmt.excluded.volumes,
+            },
+        )
+    )
+
+    settings = await get_settings_values_async(db_session, ["market_history_days"])
+    history_days = int(settings.get("market_history_days", DEFAULT_MARKET_HISTORY_DAYS))
+    await db_session.execute(
+        delete(MarketSnapshot).where(
+            col(MarketSnapshot.timestamp) < timestamp - timedelta(days=history_days)
+        )
+    )
+    await db_session.commit()
+
+    logger.info(f"Market snapshot saved with {len(item_ids)} commodities.")
+
+
+async def backfill_item_history(db_session: AsyncSession, item_id: int) -> int:
+    """
+    Copies the item's entries from the market snapshots into price_history,
+    skipping timestamps it already has. Returns the number of rows inserted.
+
+    The snapshots keep only the minimum price and total volume of the whole
+    board, which matches what the ingestion stores only when every price level
+    counts (quantity_threshold <= 1). Items with a higher threshold are not
+    backfilled, so price_history never mixes the two meanings.
+    """
+    return await backfill_items_history(db_session, [item_id])
+
+
+async def backfill_items_history(db_session: AsyncSession, item_ids: list[int]) -> int:
+    """`backfill_item_history` for several items in one statement."""
+    if not item_ids:
+        return 0
+    result = await db_session.execute(
+        text("""
+            INSERT INTO price_history (item_id, price, quantity, "timestamp")
+            SELECT
+                ids.item_id,
+                s.min_prices[position],
+                s.volumes[position],
+                s."timestamp"
+            FROM
+                unnest(CAST(:item_ids AS integer[])) AS ids(item_id)
+                JOIN items AS i
+                    ON i.id = ids.item_id AND i.quantity_threshold <= 1
+                CROSS JOIN market_snapshots AS s
+                CROSS JOIN LATERAL array_position(s.item_ids, ids.item_id) AS position
+            WHERE
+                position IS NOT NULL
+                AND NOT EXISTS (
+                    SELECT 1
+                    FROM price_history AS ph
+                    WHERE ph.item_id = ids.item_id AND ph."timestamp" = s."timestamp"
+                );
+        """),
+        {"item_ids": item_ids},
+    )
+    await db_session.commit()
+
+    inserted = result.rowcount  # type: ignore
+    if inserted:
+        logger.info(f"Backfilled {inserted} history rows for items {item_ids}.")
+    return inserted
+
+
+def basket_log_change(
+    previous: tuple[np.ndarray, np.ndarray, np.ndarray],
+    current: tuple[np.ndarray, np.ndarray, np.ndarray],
+    basket_item_ids: list[int] | None,
+) -> tuple[float, int, int]:
+    """
+    Log change of a basket between two market snapshots (Törnqvist index):
+    the mean log price relative of the items listed in both, weighted by each
+    item's share of the basket's listed value (price * volume) averaged over
+    the two snapshots. Returns (log_change, items, current_volume).
+    """
+    previous_ids, previous_prices, previous_volumes = previous
+    current_ids, current_prices, current_volumes = current
+
+    _, previous_idx, current_idx = np.intersect1d(
+        previous_ids, current_ids, assume_unique=True, return_indices=True
+    )
+    previous_prices = previous_prices[previous_idx].astype(float)
+    current_prices = current_prices[current_idx].astype(float)
+    previous_values = previous_prices * previous_volumes[previous_idx]
+    current_values = current_prices * current_volumes[current_idx]
+
+    in_basket = (previous_prices > 0) & (current_prices > 0)
+    if basket_item_ids is not None:
+        in_basket &= np.isin(current_ids[current_idx], basket_item_ids)
+
+    current_volume = int(current_volumes[current_idx][in_basket].sum())
+    items = int(in_basket.sum())
+    previous_total = previous_values[in_basket].sum()
+    current_total = current_values[in_basket].sum()
+    if items == 0 or previous_total <= 0 or current_total <= 0:
+        return 0.0, items, current_volume
+
+    weights = (
+        previous_values[in_basket] / previous_total
+        + current_values[in_basket] / current_total
+    ) / 2
+    log_relatives = np.log(current_prices[in_basket] / previous_prices[in_basket])
+    return float((weights * log_relatives).sum()), items, current_volume
+
+
+async def update_market_indices(
+    db_session: AsyncSession,
+    market: tuple[np.ndarray, np.ndarray, np.ndarray],
+    snapshot_time: datetime,
+) -> None:
+    """
+    Chains every basket's index from its last value using the change between
+    the previous market snapshot and this one.
+    """
+    timestamp = snapshot_timestamp(snapshot_time)
+
+    baskets = (await db_session.exec(select(MarketBasket))).all()
+    if not baskets:
+        return
+
+    previous_snapshot = (
+        await db_session.exec(
+            select(MarketSnapshot)
+            .where(col(MarketSnapshot.timestamp) < timestamp)
+            .order_by(desc(MarketSnapshot.timestamp))
+            .limit(1)
+        )
+    ).first()
+    previous_market = (
+        (
+            np.asarray(previous_snapshot.item_ids, dtype=np.int64),
+            np.asarray(previous_snapshot.min_prices, dtype=np.int64),
+            np.asarray(previous_snapshot.volumes, dtype=np.int64),
+        )
+        if previous_snapshot is not None
+        else None
+    )
+
+    previous_values = {
+        basket_id: value
+        for basket_id, value in (
+            await db_session.execute(
+                text("""
+                    SELECT DISTINCT ON (basket_id) basket_id, value
+                    FROM market_indices
+                    WHERE "timestamp" < :timestamp
+                    ORDER BY basket_id, "timestamp" DESC;
+                """),
+                {"timestamp": timestamp},
+            )
+        ).all()
+    }
+
+    rows = []
+    for basket in baskets:
+        previous_value = previous_values.get(basket.id)
+        if previous_market is None or previous_value is None:
+            log_change, items, volume = basket_log_change(
+                market, market, basket.item_ids
+            )
+            value, change = INDEX_BASE_VALUE, 0.0
+        else:
+            log_change, items, volume = basket_log_change(
+                previous_market, market, basket.item_ids
+            )
+            value = previous_value * math.exp(log_change)
+            change = math.expm1(log_change)
+
+        rows.append(
+            {
+                "basket_id": basket.id,
+                "timestamp": timestamp,
+                "value": value,
+                "change": change,
+                "items": items,
+                "volume": volume,
+            }
+        )
+
+    insert_stmt = pg_insert(MarketIndex)
+    await db_session.execute(
+        insert_stmt.on_conflict_do_update(
+            index_elements=["basket_id", "timestamp"],
+            set_={
+                column: insert_stmt.excluded[column]
+                for column in ("value", "change", "items", "volume")
+            },
+        ),
+        rows,
+    )
+    await db_session.commit()
+
+    logger.info(f"Market indices updated for {len(rows)} baskets.")
@@ -0,0 +1,130 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from sqlmodel import select, text
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.logger import get_logger
+from app.models import Settings
+
+logger = get_logger(__name__)
+
+ARCHIVE_BATCH_SIZE = 1000
+MARK_READ_BATCH_SIZE = 1000
+DEFAULT_ARCHIVE_DAYS = 30
+
+
+async def archive_cutoff_date(db_session: AsyncSession) -> datetime | None:
+    """Data limite para arquivar notificações lidas, ou None se desativado."""
+    archive_days_db = (
+        await db_session.exec(
+            select(Settings.value).where(Settings.key == "notification_archive_days")
+        )
+    ).one_or_none()
+
+    archive_days = DEFAULT_ARCHIVE_DAYS
+    if archive_days_db is not None:
+        if archive_days_db == "never":
+            return None
+        archive_days = int(archive_days_db)
+
+    cutoff = datetime.now(timezone.utc) - timedelta(days=archive_days)
+    return cutoff.replace(tzinfo=None)
+
+
+async def archive_read_notifications(
+    db_session: AsyncSession,
+    older_than: datetime,
+    batch_size: int = ARCHIVE_BATCH_SIZE,
+) -> int:
+    """
+    Moves read notifications created before `older_than` to `notifications_archive`.
+    Each batch is its own short transaction, so the hot table is never locked for long.
+    """
+    total_archived = 0
+
+    while True:
+        result = await db_session.execute(
+            text("""
+                WITH batch AS (
+                    SELECT id
+                    FROM notifications
+                    WHERE read = true AND created_at < :older_than
+                    ORDER BY created_at, id
+                    LIMIT :batch_size
+                    FOR UPDATE SKIP LOCKED
+                ),
+                moved AS (
+                    DELETE FROM notifications AS n
+                    USING batch
+                    WHERE n.id = batch.id
+                    RETURNING n.id, n.type, n.price_diff, n.current_price,
+                        n.price_threshold, n.item_id, n.created_at
+                )
+                INSERT INTO notifications_archive
+                    (id, type, price_diff, current_price, price_threshold, item_id, created_at)
+                SELECT id, type, price_diff, current_price, price_threshold, item_id, created_at
+                FROM moved;
+            """),
+            {"older_than": older_than, "batch_size": batch_size},
+        )
+        await db_session.commit()
+
+        archived = result.rowcount  # type: ignore
+        total_archived += archived
+        if archived < batch_size:
+            break
+
+        # Gives other writers a chance to take the rows between batches
+        await asyncio.sleep(0)
+
+    return total_archived
+
+
+async def mark_all_as_read_in_batches(
+    db_session: AsyncSession, batch_size: int = MARK_READ_BATCH_SIZE
+) -> int:
+    """
+    Marks every unread notification that exists right now as read, in chunks
+    walked through the partial `notifications_unread_id_idx` index.
+    """
+    max_id = (
+        await db_session.execute(
+            text("SELECT MAX(id) FROM notifications WHERE read = false;")
+        )
+    ).scalar()
+    if max_id is None:
+        return 0
+
+    total_updated = 0
+
+    while True:
+        result = await db_session.execute(
+            text("""
+                WITH batch AS (
+                    SELECT id
+                    FROM notifications
+                    WHERE read = false AND id <= :max_id
+                    ORDER BY id
+                    LIMIT :batch_size
+                    FOR UPDATE
+                )
+                UPDATE notifications AS n
+                SET read = true
+                FROM batch
+                WHERE n.id = batch.id;
+            """),
+            {"max_id": max_id, "batch_size": batch_size},
+        )
+        await db_session.commit()
+
+        updated = result.rowcount  # type: ignore
+        total_updated += updated
+        # Sem SKIP LOCKED: linhas travadas por outra transação são esperadas, não
+        # puladas, então só para quando não sobra nada abaixo de max_id
+        if updated == 0:
+            break
+
+        await asyncio.sleep(0)
+
+    return total_updated
@@ -1,11 +1,20 @@
 from datetime import datetime, timezone
 
-from sqlmodel import Session, text
+import numpy as np
+from sqlmodel import text
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app.logger import get_logger
+from app.metrics import INGEST_PHASE_SECONDS
 from app.models import Notification, NotificationType
 from app.schemas import ItemForNotification
-from app.utils import best_price_window_start_date, price_to_gold_and_silver
+from app.services.icon_services import item_icon_path
+from app.services.price_update_services import publish_price_updates
+from app.utils import (
+    best_price_window_start_date_async,
+    get_settings_values_async,
+    price_to_gold_and_silver,
+)
 
 from ..websocket import connection_manager
 
@@ -13,7 +22,7 @@ logger = get_logger(__name__)
 
 
 async def create_and_broadcast_notification(
-    db_session: Session,
+    db_session: AsyncSession,
     item: ItemForNotification,
     notification_type: NotificationType,
     current_price: int,
@@ -28,12 +37,12 @@ async def create_and_broadcast_notification(
         current_price=current_price,
         price_threshold=price_threshold,
         item_id=item.id,
-        created_at=now,
+        created_at=now.replace(tzinfo=None),
     )
 
     db_session.add(notification)
-    db_session.commit()
-    db_session.refresh(notification)
+    await db_session.commit()
+    await db_session.refresh(notification)
 
     notification_id = notification.id
 
@@ -64,7 +73,7 @@ async def create_and_broadcast_notification(
             "item": {
                 "id": item.id,
                 "name": item.name,
-                "image": item.image_path,
+                "image": item_icon_path(item.id),
                 "quality": item.quality.value,
                 "rarity": item.rarity.value,
             },
@@ -76,8 +85,8 @@ async def create_and_broadcast_notification(
     await connection_manager.broadcast(message)
 
 
-async def notify_price_below(db_session: Session):
-    items_to_notify = db_session.execute(
+async def notify_price_below(db_session: AsyncSession):
+    result = await db_session.execute(
         text(
             """
         WITH latest_prices AS
@@ -103,7 +112,8 @@ async def notify_price_below(db_session: Session):
         ORDER BY lp.price DESC
     """
         )
-    ).fetchall()
+    )
+    items_to_notify = result.fetchall()
 
     for item in items_to_notify:
         (
@@ -132,8 +142,8 @@ async def notify_price_below(db_session: Session):
         )
 
 
-async def notify_price_above(db_session: Session):
-    items_to_notify = db_session.execute(
+async def notify_price_above(db_session: AsyncSession):
+    result = await db_session.execute(
         text(
             """
        WITH latest_prices AS
@@ -159,7 +169,8 @@ async def notify_price_above(db_session: Session):
         ORDER BY lp.price DESC
     """
         )
-    ).fetchall()
+    )
+    items_to_notify = result.fetchall()
 
     for item in items_to_notify:
         (
@@ -188,10 +199,10 @@ async def notify_price_above(db_session: Session):
         )
 
 
-async def notify_price_below_best_avg(db_session: Session):
-    window_start = best_price_window_start_date(db_session)
+async def notify_price_below_best_avg(db_session: AsyncSession):
+    window_start = await best_price_window_start_date_async(db_session)
 
-    items_to_notify = db_session.execute(
+    result = await db_session.execute(
         text(
             """
         WITH latest_prices AS (
@@ -214,7 +225,7 @@ async def notify_price_below_best_avg(db_session: Session):
                     FROM
                         price_history
                     WHERE
-                        (:window_start IS NULL OR "timestamp" >= :window_start)
+                        (CAST(:window_start AS timestamp) IS NULL OR "timestamp" >= :window_start)
                     GROUP BY
                         item_id,
                         EXTRACT(DOW FROM "timestamp" AT TIME ZONE 'UTC' AT TIME ZONE 'America/Sao_Paulo'),
@@ -244,7 +255,8 @@ async def notify_price_below_best_avg(db_session: Session):
     """
         ),
         {"window_start": window_start},
-    ).fetchall()
+    )
+    items_to_notify = result.fetchall()
 
     for item in items_to_notify:
         (
@@ -272,10 +284,10 @@ async def notify_price_below_best_avg(db_session: Session):
         )
 
 
-async def notify_price_above_best_avg(db_session: Session):
-    window_start = best_price_window_start_date(db_session)
+async def notify_price_above_best_avg(db_session: AsyncSession):
+    window_start = await best_price_window_start_date_async(db_session)
 
-    items_to_notify = db_session.execute(
+    result = await db_session.execute(
         text(
             """
         WITH latest_prices AS (
@@ -298,7 +310,7 @@ async def notify_price_above_best_avg(db_session: Session):
                     FROM
                         price_history
                     WHERE
-                        (:window_start IS NULL OR "timestamp" >= :window_start)
+                        (CAST(:window_start AS timestamp) IS NULL OR "timestamp" >= :window_start)
                     GROUP BY
                         item_id,
                         EXTRACT(DOW FROM "timestamp" AT TIME ZONE 'UTC' AT TIME ZONE 'America/Sao_Paulo'),
@@ -328,7 +340,8 @@ async def notify_price_above_best_avg(db_session: Session):
     """
         ),
         {"window_start": window_start},
-    ).fetchall()
+    )
+    items_to_notify = result.fetchall()
 
     for item in items_to_notify:
         (
@@ -356,16 +369,110 @@ async def notify_price_above_best_avg(db_session: Session):
         )
 
 
-async def notify_after_update(db_session: Session):
-    await connection_manager.broadcast(
-        {
-            "action": "new_data",
-            "data": {
-                "timestamp": datetime.now(timezone.utc).isoformat(),
-            },
-        }
+async def notify_price_anomaly(db_session: AsyncSession):
+    import pandas as pd
+
+    settings = await get_settings_values_async(
+        db_session,
+        [
+            "anomaly_zscore_threshold",
+            "anomaly_score_source",
+            "anomaly_baseline_half_life_hours",
+            "anomaly_min_samples",
+        ],
+    )
+    zscore_threshold = float(settings.get("anomaly_zscore_threshold", "3"))
+    if zscore_threshold <= 0:
+        return
+    score_source = settings.get("anomaly_score_source", "price")
+    half_life_hours = int(settings.get("anomaly_baseline_half_life_hours", "168"))
+    min_samples = int(settings.get("anomaly_min_samples", "24"))
+
+    result = await db_session.execute(
+        text(
+            """
+        SELECT
+            i.id,
+            i.name,
+            i.image_path,
+            i.quality,
+            i.rarity,
+            s.last_price,
+            s.price_mean,
+            s.price_zscore,
+            s.return_zscore,
+            s.samples
+        FROM
+            item_rolling_stats s
+        JOIN items i ON i.id = s.item_id
+        WHERE
+            s.half_life_hours = :half_life_hours
+            AND i.is_active = TRUE
+            AND s.last_timestamp = (SELECT MAX("timestamp") FROM price_history);
+    """
+        ),
+        {"half_life_hours": half_life_hours},
+    )
+    candidates = pd.DataFrame(
+        result.fetchall(),
+        columns=[
+            "id",
+            "name",
+            "image_path",
+            "quality",
+            "rarity",
+            "last_price",
+            "price_mean",
+            "price_zscore",
+            "return_zscore",
+            "samples",
+        ],
     )
-    await notify_price_below(db_session)
-    await notify_price_above(db_session)
-    await notify_price_below_best_avg(db_session)
-    await notify_price_above_best_avg(db_session)
+    if candidates.empty:
+        return
+
+    # Todos os itens são avaliados de uma vez, sem loop em Python
+    zscore_column = "return_zscore" if score_source == "returns" else "price_zscore"
+    zscores = candidates[zscore_column].to_numpy(dtype=float)
+    is_anomaly = (np.abs(zscores) >= zscore_threshold) & (
+        candidates["samples"].to_numpy() >= min_samples
+    )
+
+    for item in candidates[is_anomaly].itertuples(index=False):
+        zscore = getattr(item, zscore_column)
+        baseline_price = int(round(item.price_mean))
+
+        await create_and_broadcast_notification(
+            db_session,
+            ItemForNotification(
+                id=item.id,
+                name=item.name,
+                image_path=item.image_path,
+                quality=item.quality,
+                rarity=item.rarity,
+            ),
+            NotificationType.price_above_anomaly_alert
+            if zscore > 0
+            else NotificationType.price_below_anomaly_alert,
+            int(item.last_price),
+            abs(int(item.last_price) - baseline_price),
+            baseline_price,
+        )
+
+
+async def notify_after_update(db_session: AsyncSession):
+    with INGEST_PHASE_SECONDS.labels("alerts").time():
+        await publish_price_updates(db_session)
+        await connection_manager.broadcast_to_unsubscribed(
+            {
+                "action": "new_data",
+                "data": {
+                    "timestamp": datetime.now(timezone.utc).isoformat(),
+                },
+            }
+        )
+        await notify_price_below(db_session)
+        await notify_price_above(db_session)
+        await notify_price_below_best_avg(db_session)
+        await notify_price_above_best_avg(db_session)
+        await notify_price_anomaly(db_session)
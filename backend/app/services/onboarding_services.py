@@ -0,0 +1,314 @@
+import asyncio
+import os
+from typing import AsyncIterator, NamedTuple
+
+import httpx
+from fastapi import HTTPException
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlmodel import col, text
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.blizzard_api import blizzard_api_url, fetch_blizzard_api
+from app.dependencies import get_async_engine
+from app.logger import get_logger
+from app.models import Item, ItemCache
+from app.schemas import (
+    BulkItemResult,
+    BulkItemStatus,
+    CreateItemOptions,
+    Quality,
+    Rarity,
+)
+from app.services.icon_services import forget_item_icons
+from app.services.market_services import backfill_items_history
+from app.services.quality_services import get_item_qualities, get_item_quality
+from app.services.search_services import item_search_index
+from app.utils import (
+    download_image_and_upload_to_supabase,
+    gold_and_silver_to_price,
+)
+
+logger = get_logger(__name__)
+
+# Itens resolvidos ao mesmo tempo; o limite de requisições da Blizzard é
+# respeitado à parte em fetch_blizzard_api
+RESOLVE_CONCURRENCY = int(os.getenv("ITEM_RESOLVE_CONCURRENCY", "10"))
+INSERT_BATCH_SIZE = 50
+UPLOAD_TRIES = 3
+
+
+class ItemMetadata(NamedTuple):
+    name: str
+    blizzard_image_url: str
+    quality: Quality
+    rarity: Rarity
+
+
+class ResolvedItem(NamedTuple):
+    item_id: int
+    metadata: ItemMetadata
+    image_path: str
+    from_cache: bool
+
+
+async def resolve_item_metadata(
+    httpx_client: httpx.AsyncClient, item_id: int
+) -> ItemMetadata:
+    """Name, rarity and image from the Blizzard API, quality from Wowhead."""
+    item_response = await fetch_blizzard_api(
+        blizzard_api_url(f"/data/wow/item/{item_id}"),
+        httpx_client,
+        {"namespace": "static-us", "locale": "pt_BR"},
+        "Item",
+    )
+    img_response = await fetch_blizzard_api(
+        item_response["media"]["key"]["href"],
+        httpx_client,
+    )
+    return ItemMetadata(
+        name=item_response["name"],
+        blizzard_image_url=img_response["assets"][0]["value"],
+        quality=await get_item_quality(item_id),
+        rarity=Rarity(item_response["quality"]["type"]),
+    )
+
+
+async def upload_item_image(httpx_client: httpx.AsyncClient, img_url: str) -> str:
+    """Sobe a imagem para o Storage, com a URL original como fallback."""
+    img_path = img_url.split("/")[-1]
+    for _ in range(UPLOAD_TRIES):
+        uploaded_image_url = await download_image_and_upload_to_supabase(
+            httpx_client, img_url, img_path
+        )
+        if uploaded_image_url:
+            return uploaded_image_url
+    return img_url
+
+
+async def find_existing_and_cached(
+    db_session: AsyncSession, item_ids: list[int]
+) -> tuple[set[int], dict[int, ItemMetadata]]:
+    """Ids already in `items` and cached metadata of the others, in one query."""
+    rows = (
+        await db_session.execute(
+            text("""
+                SELECT
+                    ids.id,
+                    i.id IS NOT NULL AS already_added,
+                    c.name,
+                    c.blizzard_image_url,
+                    c.quality,
+                    c.rarity
+                FROM
+                    unnest(CAST(:item_ids AS integer[])) AS ids(id)
+                    LEFT JOIN items AS i ON i.id = ids.id
+                    LEFT JOIN item_cache AS c ON c.item_id = ids.id;
+            """),
+            {"item_ids": item_ids},
+        )
+    ).all()
+
+    existing: set[int] = set()
+    cached: dict[int, ItemMetadata] = {}
+    for item_id, already_added, name, image_url, quality, rarity in rows:
+        if already_added:
+            existing.add(item_id)
+        elif name is not None:
+            cached[item_id] = ItemMetadata(
+                name, image_url, Quality[quality], Rarity[rarity]
+            )
+    return existing, cached
+
+
+async def resolve_item(
+    httpx_client: httpx.AsyncClient,
+    semaphore: asyncio.Semaphore,
+    item_id: int,
+    cached: ItemMetadata | None,
+) -> ResolvedItem | BulkItemResult:
+    async with semaphore:
+        try:
+            metadata = cached or await resolve_item_metadata(httpx_client, item_id)
+            image_path = await upload_item_image(
+                httpx_client, metadata.blizzard_image_url
+            )
+        except HTTPException as e:
+            detail = str(e.detail)
+        except httpx.HTTPError as e:
+            detail = f"Erro ao se comunicar com a API externa: {e}"
+        except (KeyError, IndexError, ValueError) as e:
+            detail = f"Resposta inesperada da API da Blizzard: {e}"
+        except Exception as e:
+            logger.error(f"Failed to resolve item {item_id}: {e}", exc_info=True)
+            detail = "Erro inesperado ao buscar o item"
+        else:
+            return ResolvedItem(item_id, metadata, image_path, cached is not None)
+    return BulkItemResult(item_id=item_id, status=BulkItemStatus.error, detail=detail)
+
+
+async def insert_items(
+    db_session: AsyncSession,
+    resolved: list[ResolvedItem],
+    options: CreateItemOptions,
+) -> set[int]:
+    """
+    Inserts the new cache rows and the items of a batch with one statement
+    each. Returns the ids inserted (an id added meanwhile is skipped).
+    """
+    cache_rows = [
+        {
+            "item_id": item.item_id,
+            "name": item.metadata.name,
+            "blizzard_image_url": item.metadata.blizzard_image_url,
+            "quality": item.metadata.quality,
+            "rarity": item.metadata.rarity,
+        }
+        for item in resolved
+        if not item.from_cache
+    ]
+    if cache_rows:
+        await db_session.execute(
+            pg_insert(ItemCache).values(cache_rows).on_conflict_do_nothing()
+        )
+
+    item_rows = [
+        {
+            "id": item.item_id,
+            "name": item.metadata.name,
+            "image_path": item.image_path,
+            "quality": item.metadata.quality,
+            "rarity": item.metadata.rarity,
+            "quantity_threshold": options.quantity_threshold,
+            "intent": options.intent,
+            "above_alert": gold_and_silver_to_price(options.above_alert),
+            "below_alert": gold_and_silver_to_price(options.below_alert),
+            "notify_sell": options.notify_sell,
+            "notify_buy": options.notify_buy,
+            "is_active": True,
+        }
+        for item in resolved
+    ]
+    inserted = set(
+        (
+            await db_session.execute(
+                pg_insert(Item)
+                .values(item_rows)
+                .on_conflict_do_nothing()
+                .returning(col(Item.id))
+            )
+        )
+        .scalars()
+        .all()
+    )
+    await db_session.commit()
+    item_search_index.invalidate()
+    forget_item_icons(inserted)
+    return inserted
+
+
+async def stream_bulk_add(
+    item_ids: list[int],
+    existing: set[int],
+    cached: dict[int, ItemMetadata],
+    options: CreateItemOptions,
+) -> AsyncIterator[str]:
+    """
+    Resolves the new items concurrently and inserts them in batches of
+    INSERT_BATCH_SIZE, streaming one NDJSON line per id as each settles.
+    """
+    for item_id in item_ids:
+        if item_id in existing:
+            yield result_line(
+                item_id, BulkItemStatus.exists, detail="Item já adicionado"
+            )
+
+    semaphore = asyncio.Semaphore(RESOLVE_CONCURRENCY)
+    async with (
+        httpx.AsyncClient(timeout=30) as httpx_client,
+        AsyncSession(get_async_engine(), expire_on_commit=False) as db_session,
+    ):
+        # As páginas da Wowhead são buscadas em paralelo às chamadas da
+        # Blizzard; resolve_item reaproveita as que já estiverem em andamento
+        prefetch = asyncio.create_task(
+            get_item_qualities(
+                [
+                    item_id
+                    for item_id in item_ids
+                    if item_id not in existing and item_id not in cached
+                ],
+            )
+        )
+        tasks = [
+            asyncio.create_task(
+                resolve_item(httpx_client, semaphore, item_id, cached.get(item_id))
+            )
+            for item_id in item_ids
+            if item_id not in existing
+        ]
+        try:
+            batch: list[ResolvedItem] = []
+            for index, task in enumerate(asyncio.as_completed(tasks), start=1):
+                result = await task
+                if isinstance(result, BulkItemResult):
+                    yield result.model_dump_json() + "\n"
+                else:
+                    batch.append(result)
+
+                if batch and (len(batch) >= INSERT_BATCH_SIZE or index == len(tasks)):
+                    async for line in flush_batch(db_session, batch, options):
+                        yield line
+                    batch = []
+        finally:
+            # Cliente desconectou no meio: não deixa tarefas soltas
+            for task in [prefetch, *tasks]:
+                task.cancel()
+
+
+async def flush_batch(
+    db_session: AsyncSession,
+    batch: list[ResolvedItem],
+    options: CreateItemOptions,
+) -> AsyncIterator[str]:
+    try:
+        inserted = await insert_items(db_session, batch, options)
+    except Exception as e:
+        logger.error(f"Failed to insert items batch: {e}", exc_info=True)
+        await db_session.rollback()
+        for item in batch:
+            yield result_line(
+                item.item_id, BulkItemStatus.error, detail="Erro ao salvar o item"
+            )
+        return
+
+    logger.info(f"Bulk add inserted {len(inserted)} items.")
+    # Itens acompanhados pelo mercado completo já chegam com histórico; os itens
+    # já foram criados, então uma falha aqui não muda o status deles
+    try:
+        await backfill_items_history(db_session, sorted(inserted))
+    except Exception as e:
+        await db_session.rollback()
+        logger.warning(f"History backfill failed for items {sorted(inserted)}: {e}")
+
+    for item in batch:
+        if item.item_id in inserted:
+            yield result_line(
+                item.item_id, BulkItemStatus.created, name=item.metadata.name
+            )
+        else:
+            yield result_line(
+                item.item_id, BulkItemStatus.exists, detail="Item já adicionado"
+            )
+
+
+def result_line(
+    item_id: int,
+    status: BulkItemStatus,
+    name: str | None = None,
+    detail: str | None = None,
+) -> str:
+    return (
+        BulkItemResult(
+            item_id=item_id, status=status, name=name, detail=detail
+        ).model_dump_json()
+        + "\n"
+    )
@@ -0,0 +1,146 @@
+from sqlmodel import text
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.logger import get_logger
+from app.utils import price_to_gold_and_silver
+
+from ..websocket import connection_manager
+
+logger = get_logger(__name__)
+
+
+async def get_latest_snapshot(
+    db_session: AsyncSession, item_ids: list[int] | None = None
+):
+    result = await db_session.execute(
+        text("""
+            SELECT
+                item_id,
+                price,
+                quantity,
+                to_char("timestamp" AT TIME ZONE 'UTC' AT TIME ZONE 'America/Sao_Paulo', 'YYYY-MM-DD HH24:MI:SS'),
+                CASE EXTRACT(DOW FROM "timestamp" AT TIME ZONE 'UTC' AT TIME ZONE 'America/Sao_Paulo')
+                    WHEN 0 THEN 'Domingo'
+                    WHEN 1 THEN 'Segunda'
+                    WHEN 2 THEN 'Terça'
+                    WHEN 3 THEN 'Quarta'
+                    WHEN 4 THEN 'Quinta'
+                    WHEN 5 THEN 'Sexta'
+                    WHEN 6 THEN 'Sábado'
+                END AS weekday,
+                EXTRACT(DOW FROM "timestamp" AT TIME ZONE 'UTC' AT TIME ZONE 'America/Sao_Paulo')::integer AS weekday_num,
+                EXTRACT(HOUR FROM "timestamp" AT TIME ZONE 'UTC' AT TIME ZONE 'America/Sao_Paulo')::integer AS hour
+            FROM
+                price_history
+            WHERE
+                "timestamp" = (SELECT MAX("timestamp") FROM price_history)
+                AND (CAST(:item_ids AS integer[]) IS NULL OR item_id = ANY(:item_ids));
+        """),
+        {"item_ids": item_ids},
+    )
+    return result.fetchall()
+
+
+async def get_heatmap_cells(
+    db_session: AsyncSession, item_ids: list[int], weekday_num: int, hour: int
+) -> dict[int, tuple[float, float]]:
+    """Média de preço e quantidade da célula (dia da semana, hora) de cada item."""
+    result = await db_session.execute(
+        text("""
+            SELECT
+                item_id,
+                AVG(price) / 10000.0 AS avg_price,
+                AVG(quantity) AS avg_quantity
+            FROM
+                price_history
+            WHERE
+                item_id = ANY(:item_ids)
+                AND EXTRACT(DOW FROM "timestamp" AT TIME ZONE 'UTC' AT TIME ZONE 'America/Sao_Paulo') = :weekday_num
+                AND EXTRACT(HOUR FROM "timestamp" AT TIME ZONE 'UTC' AT TIME ZONE 'America/Sao_Paulo')::integer = :hour
+            GROUP BY
+                item_id;
+        """),
+        {"item_ids": item_ids, "weekday_num": weekday_num, "hour": hour},
+    )
+    rows = result.fetchall()
+
+    return {
+        int(item_id): (float(avg_price), float(avg_quantity))
+        for item_id, avg_price, avg_quantity in rows
+    }
+
+
+async def publish_price_updates(db_session: AsyncSession):
+    """
+    Pushes the newest snapshot only to the topics someone is subscribed to:
+    `item:<id>` gets the new point plus its updated heatmap cells and `items`
+    gets the latest price of every updated item.
+    """
+    topics = connection_manager.subscribed_topics()
+    if topics is not None and not topics:
+        return
+
+    if topics is None:
+        # Other workers may hold the subscribers, so every topic gets published
+        snapshot = await get_latest_snapshot(db_session)
+        item_ids = [int(row[0]) for row in snapshot]
+        wants_items_view = True
+    else:
+        item_ids = [int(topic[5:]) for topic in topics if topic.startswith("item:")]
+        wants_items_view = "items" in topics
+        snapshot = await get_latest_snapshot(
+            db_session, None if wants_items_view else item_ids
+        )
+
+    if not snapshot:
+        return
+
+    if item_ids:
+        _, _, _, _, _, weekday_num, hour = snapshot[0]
+        cells = await get_heatmap_cells(db_session, item_ids, weekday_num, hour)
+
+        for item_id, price, quantity, timestamp, weekday, _, hour in snapshot:
+            if item_id not in cells:
+                continue
+            avg_price, avg_quantity = cells[item_id]
+            await connection_manager.publish(
+                f"item:{item_id}",
+                {
+                    "action": "price_update",
+                    "data": {
+                        "item_id": item_id,
+                        "timestamp": timestamp,
+                        "price": price / 10000.0,
+                        "quantity": quantity,
+                        "average_price_cell": {
+                            "weekday": weekday,
+                            "hour": f"{str(hour).zfill(2)}h",
+                            "value": avg_price,
+                        },
+                        "average_quantity_cell": {
+                            "weekday": weekday,
+                            "hour": f"{str(hour).zfill(2)}h",
+                            "value": avg_quantity,
+                        },
+                    },
+                },
+            )
+
+    if wants_items_view:
+        await connection_manager.publish(
+            "items",
+            {
+                "action": "prices_update",
+                "data": [
+                    {
+                        "id": item_id,
+                        "price": price_to_gold_and_silver(price).model_dump(),
+                        "quantity": quantity,
+                        "timestamp": timestamp,
+                    }
+                    for item_id, price, quantity, timestamp, _, _, _ in snapshot
+                ],
+            },
+        )
+
+    logger.info(f"Published price updates for {len(snapshot)} items.")
@@ -0,0 +1,182 @@
+import asyncio
+import os
+import time
+
+import httpx
+
+from app.logger import get_logger
+from app.schemas import Quality
+
+logger = get_logger(__name__)
+
+DEFAULT_WOWHEAD_URL = "https://www.wowhead.com"
+CONTEXT_NAMES_MARKER = b'id="data.page.wow.item.contextNames"'
+SCRIPT_OPEN = b"<script"
+SCRIPT_CLOSE = b"</script>"
+
+# Ícones procurados no script depois do contextNames, na ordem: o primeiro
+# encontrado decide. Os de Midnight vêm antes porque contêm "tierN.png".
+QUALITY_MARKERS: tuple[tuple[str, Quality], ...] = (
+    ("12-tier2.png", Quality.tier_2_midnight),
+    ("12-tier1.png", Quality.tier_1_midnight),
+    ("tier5.png", Quality.tier_5),
+    ("tier4.png", Quality.tier_4),
+    ("tier3.png", Quality.tier_1),
+    ("tier2.png", Quality.tier_2),
+    ("tier1.png", Quality.tier_3),
+)
+
+QUALITY_CACHE_TTL = 30 * 24 * 3600
+# Itens sem qualidade na página (ou página inexistente) são checados de novo antes
+NEGATIVE_CACHE_TTL = 24 * 3600
+WOWHEAD_CONCURRENCY = int(os.getenv("WOWHEAD_CONCURRENCY", "4"))
+
+
+def wowhead_item_url(item_id: int) -> str:
+    base_url = os.getenv("WOWHEAD_URL", DEFAULT_WOWHEAD_URL).rstrip("/")
+    return f"{base_url}/item={item_id}/"
+
+
+def quality_from_script(script_text: str) -> Quality:
+    for marker, quality in QUALITY_MARKERS:
+        if marker in script_text:
+            return quality
+    return Quality.normal
+
+
+def find_context_script(buffer: bytes) -> tuple[bytes | None, int]:
+    """
+    Looks for the script right after the contextNames one. Returns (script
+    body, -1) once it's complete in `buffer`; otherwise (None, n) where the
+    first n bytes can be dropped without losing a partial match.
+    """
+    marker = buffer.find(CONTEXT_NAMES_MARKER)
+    if marker == -1:
+        return None, max(len(buffer) - len(CONTEXT_NAMES_MARKER), 0)
+
+    marker_end = buffer.find(SCRIPT_CLOSE, marker)
+    if marker_end == -1:
+        return None, marker
+    next_open = buffer.find(SCRIPT_OPEN, marker_end + len(SCRIPT_CLOSE))
+    if next_open == -1:
+        return None, marker
+    body_start = buffer.find(b">", next_open)
+    body_end = buffer.find(SCRIPT_CLOSE, next_open)
+    if body_start == -1 or body_end == -1:
+        return None, marker
+    return buffer[body_start + 1 : body_end], -1
+
+
+async def fetch_item_quality(
+    httpx_client: httpx.AsyncClient, item_id: int
+) -> Quality | None:
+    """
+    Streams the Wowhead page and stops reading as soon as the script after
+    contextNames is complete. Returns None when the page has no quality data.
+    """
+    buffer = b""
+    async with httpx_client.stream(
+        "GET", wowhead_item_url(item_id), follow_redirects=True
+    ) as response:
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        async for chunk in response.aiter_bytes():
+            buffer += chunk
+            script, consumed = find_context_script(buffer)
+            if script is not None:
+                return quality_from_script(script.decode("utf-8", "replace"))
+            buffer = buffer[consumed:]
+    return None
+
+
+class QualityCache:
+    """
+    Resolved qualities by item id with expiry, including negative entries
+    (None) for pages without quality data. Lookups of an id already being
+    fetched wait for that request instead of starting another.
+    """
+
+    def __init__(self):
+        self.http_client: httpx.AsyncClient | None = None
+        self.entries: dict[int, tuple[Quality | None, float]] = {}
+        self.pending: dict[int, asyncio.Task[Quality | None]] = {}
+        self.semaphore = asyncio.Semaphore(WOWHEAD_CONCURRENCY)
+
+    def get(self, item_id: int) -> tuple[bool, Quality | None]:
+        entry = self.entries.get(item_id)
+        if entry is None or entry[1] < time.monotonic():
+            return False, None
+        return True, entry[0]
+
+    def set(self, item_id: int, quality: Quality | None):
+        ttl = QUALITY_CACHE_TTL if quality is not None else NEGATIVE_CACHE_TTL
+        self.entries[item_id] = (quality, time.monotonic() + ttl)
+
+    def get_http_client(self) -> httpx.AsyncClient:
+        """
+        Client owned by the cache, created on first use. The fetches are shared
+        between callers, so they can't depend on a client one of them closes.
+        """
+        if self.http_client is None:
+            self.http_client = httpx.AsyncClient(timeout=30, follow_redirects=True)
+        return self.http_client
+
+    async def close(self):
+        if self.http_client is not None:
+            await self.http_client.aclose()
+            self.http_client = None
+
+    async def fetch(self, item_id: int) -> Quality | None:
+        async with self.semaphore:
+            quality = await fetch_item_quality(self.get_http_client(), item_id)
+        self.set(item_id, quality)
+        return quality
+
+    def forget_pending(self, item_id: int, task: asyncio.Task[Quality | None]):
+        self.pending.pop(item_id, None)
+        # Marca o erro como lido: se todos que esperavam foram cancelados, o
+        # asyncio reclamaria de "Task exception was never retrieved"
+        if not task.cancelled():
+            task.exception()
+
+    async def resolve(self, item_id: int) -> Quality | None:
+        found, quality = self.get(item_id)
+        if found:
+            return quality
+        task = self.pending.get(item_id)
+        if task is None:
+            task = asyncio.create_task(self.fetch(item_id))
+            self.pending[item_id] = task
+            task.add_done_callback(lambda done: self.forget_pending(item_id, done))
+        return await asyncio.shield(task)
+
+
+quality_cache = QualityCache()
+
+
+async def close_quality_http_client():
+    await quality_cache.close()
+
+
+async def get_item_quality(item_id: int) -> Quality:
+    """Crafting quality shown by Wowhead, Quality.normal when it has none."""
+    return await quality_cache.resolve(item_id) or Quality.normal
+
+
+async def get_item_qualities(item_ids: list[int]) -> dict[int, Quality]:
+    """
+    Resolves many items at once, at most WOWHEAD_CONCURRENCY pages at a
+    time. Items whose page fails are left out.
+    """
+    results = await asyncio.gather(
+        *(get_item_quality(item_id) for item_id in item_ids),
+        return_exceptions=True,
+    )
+    qualities: dict[int, Quality] = {}
+    for item_id, result in zip(item_ids, results, strict=True):
+        if isinstance(result, BaseException):
+            logger.warning(f"Failed to get the quality of item {item_id}: {result}")
+        else:
+            qualities[item_id] = result
+    return qualities
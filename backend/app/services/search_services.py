@@ -0,0 +1,217 @@
+import asyncio
+import bisect
+import itertools
+import re
+import time
+from typing import NamedTuple
+
+import numpy as np
+from sqlmodel import text
+from sqlmodel.ext.asyncio.session import AsyncSession
+from unidecode import unidecode
+
+from app.logger import get_logger
+from app.schemas import ItemSearchResult, Quality, Rarity
+from app.services.icon_services import item_icon_path
+
+logger = get_logger(__name__)
+
+# Intervalo mínimo entre as checagens de mudança no item_cache
+VERSION_CHECK_SECONDS = 30
+# Fração mínima dos trigramas da busca presentes no nome
+MIN_QUERY_COVERAGE = 0.5
+
+NON_ALPHANUMERIC = re.compile(r"[^a-z0-9]+")
+
+
+def normalize(name: str) -> str:
+    """Minúsculas, sem acentos e com só um espaço entre as palavras."""
+    return NON_ALPHANUMERIC.sub(" ", unidecode(name).lower()).strip()
+
+
+def trigrams(normalized: str) -> set[str]:
+    """Trigrams of each word padded like pg_trgm ("  w", " wo", ..., "rd ")."""
+    grams: set[str] = set()
+    for word in normalized.split():
+        padded = f"  {word} "
+        grams.update(padded[i : i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class SearchEntry(NamedTuple):
+    id: int
+    name: str
+    quality: Quality
+    rarity: Rarity
+    added: bool
+
+
+class ItemSearchIndex:
+    """
+    In-memory index over the item_cache names:
+    - `names`: (normalized name, entry) sorted, for whole-name prefixes;
+    - `words`: (word, entry) sorted, for prefixes of any word;
+    - `postings`: trigram -> entries, for typos and partial words.
+    """
+
+    def __init__(self):
+        self.entries: list[SearchEntry] = []
+        self.names: list[tuple[str, int]] = []
+        self.words: list[tuple[str, int]] = []
+        self.postings: dict[str, np.ndarray] = {}
+        self.trigram_counts = np.zeros(0, dtype=np.int32)
+        self.version: tuple | None = None
+        self.checked_at = 0.0
+        self.lock = asyncio.Lock()
+
+    def build(self, entries: list[SearchEntry]):
+        names: list[tuple[str, int]] = []
+        words: list[tuple[str, int]] = []
+        postings: dict[str, list[int]] = {}
+        trigram_counts = np.zeros(len(entries), dtype=np.int32)
+
+        for position, entry in enumerate(entries):
+            normalized = normalize(entry.name)
+            names.append((normalized, position))
+            words.extend((word, position) for word in set(normalized.split()))
+            grams = trigrams(normalized)
+            trigram_counts[position] = len(grams)
+            for gram in grams:
+                postings.setdefault(gram, []).append(position)
+
+        names.sort()
+        words.sort()
+        self.entries = entries
+        self.names = names
+        self.words = words
+        self.postings = {
+            gram: np.asarray(positions, dtype=np.int32)
+            for gram, positions in postings.items()
+        }
+        self.trigram_counts = trigram_counts
+
+    def invalidate(self):
+        """Força a checagem da versão na próxima busca (após gravar no cache)."""
+        self.checked_at = 0.0
+
+    async def refresh(self, db_session: AsyncSession):
+        if time.monotonic() - self.checked_at < VERSION_CHECK_SECONDS:
+            return
+        async with self.lock:
+            if time.monotonic() - self.checked_at < VERSION_CHECK_SECONDS:
+                return
+            version = tuple(
+                (
+                    await db_session.execute(
+                        text("""
+                            SELECT
+                                (SELECT COUNT(*) FROM item_cache),
+                                (SELECT MAX(item_id) FROM item_cache),
+                                (SELECT COUNT(*) FROM items);
+                        """)
+                    )
+                ).one()
+            )
+            if version != self.version:
+                rows = (
+                    await db_session.execute(
+                        text("""
+                            SELECT
+                                c.item_id,
+                                c.name,
+                                c.quality,
+                                c.rarity,
+                                i.id IS NOT NULL
+                            FROM
+                                item_cache AS c
+                                LEFT JOIN items AS i ON i.id = c.item_id;
+                        """)
+                    )
+                ).all()
+                entries = [
+                    SearchEntry(item_id, name, Quality[quality], Rarity[rarity], added)
+                    for item_id, name, quality, rarity, added in rows
+                ]
+                await asyncio.to_thread(self.build, entries)
+                self.version = version
+                logger.info(f"Item search index rebuilt with {len(entries)} names.")
+            self.checked_at = time.monotonic()
+
+    def prefix_matches(
+        self, sorted_keys: list[tuple[str, int]], prefix: str, limit: int
+    ) -> list[int]:
+        matches = []
+        start = bisect.bisect_left(sorted_keys, (prefix, -1))
+        for key, position in itertools.islice(sorted_keys, start, None):
+            if not key.startswith(prefix) or len(matches) >= limit:
+                break
+            matches.append(position)
+        return matches
+
+    def similar(self, query: str, limit: int) -> list[int]:
+        """
+        Entries sharing most of the query trigrams (so a typo or a piece of
+        one word still matches a long name), ties broken by Jaccard similarity.
+        """
+        grams = trigrams(query)
+        lists = [self.postings[gram] for gram in grams if gram in self.postings]
+        if not lists:
+            return []
+        shared = np.bincount(np.concatenate(lists), minlength=len(self.entries))
+        candidates = np.flatnonzero(shared)
+        shared = shared[candidates]
+        coverage = shared / len(grams)
+        keep = coverage >= MIN_QUERY_COVERAGE
+        candidates, shared, coverage = candidates[keep], shared[keep], coverage[keep]
+        jaccard = shared / (len(grams) + self.trigram_counts[candidates] - shared)
+        best = np.lexsort((-jaccard, -coverage))[:limit]
+        return candidates[best].tolist()
+
+    def search(self, query: str, limit: int) -> list[SearchEntry]:
+        """
+        Whole-name prefix matches first, then names with a word starting with
+        the query, then trigram matches.
+        """
+        normalized = normalize(query)
+        if not normalized:
+            return []
+
+        positions: dict[int, None] = {}
+        whole = self.prefix_matches(self.names, normalized, limit)
+        # Prefixo de nome mais curto primeiro ("Minério" antes de "Minério raro")
+        whole.sort(key=lambda position: len(self.entries[position].name))
+        positions.update(dict.fromkeys(whole))
+
+        last_word = normalized.split()[-1]
+        if len(positions) < limit:
+            for position in self.prefix_matches(self.words, last_word, limit * 4):
+                if normalized in normalize(self.entries[position].name):
+                    positions.setdefault(position)
+                if len(positions) >= limit:
+                    break
+
+        if len(positions) < limit:
+            for position in self.similar(normalized, limit):
+                positions.setdefault(position)
+
+        return [self.entries[position] for position in list(positions)[:limit]]
+
+
+item_search_index = ItemSearchIndex()
+
+
+async def search_items(
+    db_session: AsyncSession, query: str, limit: int
+) -> list[ItemSearchResult]:
+    await item_search_index.refresh(db_session)
+    return [
+        ItemSearchResult(
+            id=entry.id,
+            name=entry.name,
+            image=item_icon_path(entry.id),
+            quality=entry.quality,
+            rarity=entry.rarity,
+            added=entry.added,
+        )
+        for entry in item_search_index.search(query, limit)
+    ]
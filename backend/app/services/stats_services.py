@@ -0,0 +1,225 @@
+import datetime
+import itertools
+import math
+from typing import TYPE_CHECKING
+
+import numpy as np
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlmodel import col, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.logger import get_logger
+from app.models import ItemRollingStats
+from app.schemas import ItemStats, RollingStats
+from app.utils import price_to_gold_and_silver
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = get_logger(__name__)
+
+# Meias-vidas das médias móveis exponenciais: 1 dia, 1 semana e 30 dias
+STATS_HALF_LIVES_HOURS = (24, 168, 720)
+
+STATS_COLUMNS = [
+    "item_id",
+    "half_life_hours",
+    "price_mean",
+    "price_var",
+    "quantity_mean",
+    "quantity_var",
+    "return_mean",
+    "return_var",
+    "last_price",
+    "samples",
+    "last_timestamp",
+]
+
+
+def ewm_update(
+    values: np.ndarray,
+    means: np.ndarray,
+    variances: np.ndarray,
+    alphas: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    One incremental step of the exponentially weighted mean and variance.
+    Returns the new means, the new variances and the z-score of `values`
+    against the previous baseline.
+    """
+    diff = values - means
+    std = np.sqrt(variances)
+    zscores = np.divide(diff, std, out=np.zeros_like(diff), where=std > 0)
+    increment = alphas * diff
+    new_means = means + increment
+    new_variances = (1 - alphas) * (variances + diff * increment)
+    return new_means, new_variances, zscores
+
+
+def compute_rolling_stats(
+    snapshot: "pd.DataFrame", previous: "pd.DataFrame"
+) -> "pd.DataFrame":
+    """
+    Applies one snapshot (item_id, price, quantity, timestamp) on top of the
+    previous stats rows, for every half-life at once.
+    """
+    import pandas as pd
+
+    half_lives = pd.DataFrame({"half_life_hours": STATS_HALF_LIVES_HOURS})
+    stats = snapshot[["item_id", "price", "quantity", "timestamp"]].merge(
+        half_lives, how="cross"
+    )
+    stats = stats.merge(previous, on=["item_id", "half_life_hours"], how="left")
+
+    is_new = stats["price_mean"].isna().to_numpy()
+    # Retorno logarítmico em relação ao snapshot anterior (0 no primeiro)
+    previous_prices = stats["last_price"].to_numpy(dtype=float, na_value=0)
+    prices = stats["price"].to_numpy(dtype=float)
+    stats["return"] = np.log(
+        np.divide(
+            prices,
+            previous_prices,
+            out=np.ones_like(prices),
+            where=(previous_prices > 0) & (prices > 0),
+        )
+    )
+    elapsed_hours = (
+        (stats["timestamp"] - stats["last_timestamp"]).dt.total_seconds() / 3600
+    ).to_numpy(dtype=float, na_value=0)
+    # A taxa de decaimento depende do tempo real entre snapshots, não da contagem
+    alphas = 1 - np.power(
+        0.5, np.clip(elapsed_hours, 0, None) / stats["half_life_hours"].to_numpy()
+    )
+
+    for column in ("price", "quantity", "return"):
+        values = stats[column].to_numpy(dtype=float)
+        means = stats[f"{column}_mean"].to_numpy(dtype=float, na_value=0)
+        variances = stats[f"{column}_var"].to_numpy(dtype=float, na_value=0)
+
+        new_means, new_variances, zscores = ewm_update(
+            values, np.where(is_new, values, means), variances, alphas
+        )
+        stats[f"{column}_mean"] = new_means
+        stats[f"{column}_var"] = np.where(is_new, 0.0, new_variances)
+        stats[f"{column}_zscore"] = np.where(is_new, 0.0, zscores)
+
+    stats["samples"] = stats["samples"].astype(float).fillna(0).astype(int) + 1
+    stats["last_price"] = stats["price"].astype(int)
+    stats["last_quantity"] = stats["quantity"].astype(int)
+    stats["last_timestamp"] = stats["timestamp"]
+
+    return stats.drop(columns=["price", "quantity", "return", "timestamp"])
+
+
+async def update_rolling_stats(
+    db_session: AsyncSession, processed_data: "pd.DataFrame"
+) -> None:
+    """Atualiza as estatísticas móveis dos itens do snapshot em O(1) por item."""
+    import pandas as pd
+
+    item_ids = [int(item_id) for item_id in processed_data["item_id"]]
+
+    previous_rows = (
+        await db_session.exec(
+            select(
+                ItemRollingStats.item_id,
+                ItemRollingStats.half_life_hours,
+                ItemRollingStats.price_mean,
+                ItemRollingStats.price_var,
+                ItemRollingStats.quantity_mean,
+                ItemRollingStats.quantity_var,
+                ItemRollingStats.return_mean,
+                ItemRollingStats.return_var,
+                ItemRollingStats.last_price,
+                ItemRollingStats.samples,
+                ItemRollingStats.last_timestamp,
+            ).where(col(ItemRollingStats.item_id).in_(item_ids))
+        )
+    ).all()
+    previous = pd.DataFrame(previous_rows, columns=STATS_COLUMNS)
+    previous["last_timestamp"] = pd.to_datetime(previous["last_timestamp"])
+
+    stats = compute_rolling_stats(processed_data, previous)
+
+    rows = [
+        {
+            "item_id": int(row.item_id),
+            "half_life_hours": int(row.half_life_hours),
+            "price_mean": float(row.price_mean),
+            "price_var": float(row.price_var),
+            "price_zscore": float(row.price_zscore),
+            "quantity_mean": float(row.quantity_mean),
+            "quantity_var": float(row.quantity_var),
+            "quantity_zscore": float(row.quantity_zscore),
+            "return_mean": float(row.return_mean),
+            "return_var": float(row.return_var),
+            "return_zscore": float(row.return_zscore),
+            "last_price": int(row.last_price),
+            "last_quantity": int(row.last_quantity),
+            "samples": int(row.samples),
+            "last_timestamp": row.last_timestamp.to_pydatetime(),
+        }
+        for row in stats.itertuples(index=False)
+    ]
+    if not rows:
+        return
+
+    insert_stmt = pg_insert(ItemRollingStats)
+    await db_session.execute(
+        insert_stmt.on_conflict_do_update(
+            index_elements=["item_id", "half_life_hours"],
+            set_={
+                column: insert_stmt.excluded[column]
+                for column in rows[0].keys()
+                if column not in ("item_id", "half_life_hours")
+            },
+        ),
+        rows,
+    )
+    await db_session.commit()
+
+    logger.info(f"Rolling stats updated for {len(item_ids)} items.")
+
+
+async def get_items_stats(
+    db_session: AsyncSession, item_ids: list[int] | None = None
+) -> list[ItemStats]:
+    query = select(ItemRollingStats).order_by(
+        col(ItemRollingStats.item_id), col(ItemRollingStats.half_life_hours)
+    )
+    if item_ids:
+        query = query.where(col(ItemRollingStats.item_id).in_(item_ids))
+
+    rows = (await db_session.exec(query)).all()
+
+    items_stats = []
+    for item_id, group in itertools.groupby(rows, lambda row: row.item_id):
+        windows = list(group)
+        latest = windows[0]
+        items_stats.append(
+            ItemStats(
+                item_id=item_id,
+                last_price=price_to_gold_and_silver(latest.last_price),
+                last_quantity=latest.last_quantity,
+                last_timestamp=latest.last_timestamp.replace(
+                    tzinfo=datetime.timezone.utc
+                ).isoformat(),
+                samples=latest.samples,
+                windows=[
+                    RollingStats(
+                        half_life_hours=window.half_life_hours,
+                        price_mean=window.price_mean,
+                        price_std=math.sqrt(max(window.price_var, 0)),
+                        price_zscore=window.price_zscore,
+                        quantity_mean=window.quantity_mean,
+                        quantity_std=math.sqrt(max(window.quantity_var, 0)),
+                        quantity_zscore=window.quantity_zscore,
+                        return_std=math.sqrt(max(window.return_var, 0)),
+                        return_zscore=window.return_zscore,
+                    )
+                    for window in windows
+                ],
+            )
+        )
+
+    return items_stats
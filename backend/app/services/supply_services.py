@@ -0,0 +1,200 @@
+import datetime
+from typing import TYPE_CHECKING, NamedTuple
+
+import numpy as np
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlmodel import col, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.logger import get_logger
+from app.models import ItemSupply
+from app.schemas import ItemSupplyResponse, SupplyPoint
+from app.services.market_services import AuctionArrays
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = get_logger(__name__)
+
+
+class AuctionSnapshot(NamedTuple):
+    """Auctions of one dump as parallel arrays sorted by auction id."""
+
+    timestamp: datetime.datetime
+    auction_ids: np.ndarray
+    item_ids: np.ndarray
+    quantities: np.ndarray
+
+
+def snapshot_from_arrays(
+    arrays: AuctionArrays, timestamp: datetime.datetime
+) -> AuctionSnapshot:
+    order = np.argsort(arrays.auction_ids)
+    return AuctionSnapshot(
+        timestamp,
+        arrays.auction_ids[order],
+        arrays.item_ids[order],
+        arrays.quantities[order],
+    )
+
+
+def sum_by_item(
+    item_ids: np.ndarray, values: np.ndarray, tracked_ids: np.ndarray
+) -> np.ndarray:
+    """Soma `values` por item, na ordem de `tracked_ids` (que deve estar ordenado)."""
+    positions = np.searchsorted(tracked_ids, item_ids)
+    positions = np.minimum(positions, len(tracked_ids) - 1)
+    tracked = tracked_ids[positions] == item_ids
+    return np.bincount(
+        positions[tracked], weights=values[tracked], minlength=len(tracked_ids)
+    ).astype(np.int64)
+
+
+def diff_snapshots(
+    previous: AuctionSnapshot, current: AuctionSnapshot, tracked_ids: np.ndarray
+) -> "pd.DataFrame":
+    """
+    Per tracked item, between two snapshots:
+    - listed: quantity of auctions that are new in `current`;
+    - removed: quantity that left the board (auctions gone, sold or expired,
+      plus partial buys on auctions that are still up);
+    - remaining: quantity of the auctions carried over from `previous`.
+    """
+    import pandas as pd
+
+    tracked_ids = np.unique(tracked_ids)
+    if len(tracked_ids) == 0:
+        return pd.DataFrame(columns=["item_id", "listed", "removed", "remaining"])
+
+    _, previous_idx, current_idx = np.intersect1d(
+        previous.auction_ids,
+        current.auction_ids,
+        assume_unique=True,
+        return_indices=True,
+    )
+
+    is_new = np.ones(len(current.auction_ids), dtype=bool)
+    is_new[current_idx] = False
+    is_gone = np.ones(len(previous.auction_ids), dtype=bool)
+    is_gone[previous_idx] = False
+
+    kept_items = current.item_ids[current_idx]
+    kept_quantities = current.quantities[current_idx]
+    partially_bought = np.clip(
+        previous.quantities[previous_idx] - kept_quantities, 0, None
+    )
+
+    listed = sum_by_item(
+        current.item_ids[is_new], current.quantities[is_new], tracked_ids
+    )
+    removed = sum_by_item(
+        previous.item_ids[is_gone], previous.quantities[is_gone], tracked_ids
+    ) + sum_by_item(kept_items, partially_bought, tracked_ids)
+    remaining = sum_by_item(kept_items, kept_quantities, tracked_ids)
+
+    return pd.DataFrame(
+        {
+            "item_id": tracked_ids,
+            "listed": listed,
+            "removed": removed,
+            "remaining": remaining,
+        }
+    )
+
+
+class SupplyTracker:
+    """
+    Keeps only the previous snapshot's sorted arrays (about 24 bytes per
+    auction) and diffs each new dump against it.
+    """
+
+    def __init__(self):
+        self.previous: AuctionSnapshot | None = None
+
+    async def update(
+        self,
+        db_session: AsyncSession,
+        arrays: AuctionArrays,
+        processed_data: "pd.DataFrame",
+    ) -> None:
+        import pandas as pd
+
+        timestamp = pd.Timestamp(processed_data["timestamp"].iloc[0]).to_pydatetime()
+        current = snapshot_from_arrays(arrays, timestamp)
+        previous, self.previous = self.previous, current
+
+        if previous is None or previous.timestamp >= timestamp:
+            logger.info("No previous auction snapshot, supply diff skipped.")
+            return
+
+        interval_hours = (timestamp - previous.timestamp).total_seconds() / 3600
+        supply = diff_snapshots(
+            previous, current, processed_data["item_id"].to_numpy(dtype=np.int64)
+        )
+        rows = [
+            {
+                "item_id": int(item_id),
+                "timestamp": timestamp,
+                "interval_hours": interval_hours,
+                "listed": int(listed),
+                "removed": int(removed),
+                "remaining": int(remaining),
+            }
+            for item_id, listed, removed, remaining in supply.itertuples(index=False)
+        ]
+        if not rows:
+            return
+
+        insert_stmt = pg_insert(ItemSupply)
+        await db_session.execute(
+            insert_stmt.on_conflict_do_update(
+                index_elements=["item_id", "timestamp"],
+                set_={
+                    column: insert_stmt.excluded[column]
+                    for column in ("interval_hours", "listed", "removed", "remaining")
+                },
+            ),
+            rows,
+        )
+        await db_session.commit()
+
+        logger.info(f"Supply diff saved for {len(rows)} items.")
+
+
+supply_tracker = SupplyTracker()
+
+
+async def get_item_supply(
+    db_session: AsyncSession, item_id: int, days: int
+) -> ItemSupplyResponse | None:
+    start = datetime.datetime.now(datetime.timezone.utc).replace(
+        tzinfo=None
+    ) - datetime.timedelta(days=days)
+    points = (
+        await db_session.exec(
+            select(ItemSupply)
+            .where(ItemSupply.item_id == item_id, col(ItemSupply.timestamp) >= start)
+            .order_by(col(ItemSupply.timestamp))
+        )
+    ).all()
+    if not points:
+        return None
+
+    total_hours = sum(point.interval_hours for point in points)
+    return ItemSupplyResponse(
+        item_id=item_id,
+        listed_per_hour=sum(point.listed for point in points) / total_hours,
+        removed_per_hour=sum(point.removed for point in points) / total_hours,
+        points=[
+            SupplyPoint(
+                timestamp=point.timestamp.replace(
+                    tzinfo=datetime.timezone.utc
+                ).isoformat(),
+                interval_hours=point.interval_hours,
+                listed=point.listed,
+                removed=point.removed,
+                remaining=point.remaining,
+            )
+            for point in points
+        ],
+    )
@@ -1,81 +1,199 @@
+import asyncio
+import datetime
+import os
+
 import httpx
-from sqlmodel import Session, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlmodel import col, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from app.dependencies import engine
+from app.dependencies import get_async_engine
 from app.logger import get_logger
-from app.models import Item, ItemCache
+from app.models import Item, ItemCache, VerifiedImage
 from app.utils import (
     BUCKET_NAME,
     download_image_and_upload_to_supabase,
     get_item_blizzard_image_url,
-    supabase_client,
+    get_supabase_client,
 )
 
 logger = get_logger(__name__)
 
+# O list do Storage devolve no máximo 100 arquivos por padrão
+STORAGE_PAGE_SIZE = 1000
+# Imagens confirmadas há mais tempo que isso são conferidas de novo, para pegar
+# arquivos apagados do bucket manualmente
+VERIFIED_MAX_AGE = datetime.timedelta(days=30)
+
+
+def image_file_name(image_path: str) -> str:
+    return image_path.split("/")[-1][:-1]  # Removing the "?"
+
+
+def list_storage_files() -> set[str]:
+    """Names of every file in the bucket, following the pagination."""
+    bucket = get_supabase_client().storage.from_(BUCKET_NAME)
+    names: set[str] = set()
+    offset = 0
+    while True:
+        page = bucket.list(
+            options={
+                "limit": STORAGE_PAGE_SIZE,
+                "offset": offset,
+                "sortBy": {"column": "name", "order": "asc"},
+            }
+        )
+        names.update(file["name"] for file in page)
+        if len(page) < STORAGE_PAGE_SIZE:
+            return names
+        offset += STORAGE_PAGE_SIZE
+
+
+async def items_to_verify(session: AsyncSession) -> list[tuple[int, str]]:
+    """Items whose image changed or was never (or long ago) confirmed."""
+    cutoff = (
+        datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+        - VERIFIED_MAX_AGE
+    )
+    rows = (
+        await session.exec(
+            select(Item.id, Item.image_path)
+            .outerjoin(VerifiedImage, col(VerifiedImage.item_id) == Item.id)
+            .where(
+                col(Item.image_path).is_not(None),
+                col(Item.image_path) != "",
+                (col(VerifiedImage.image_path).is_(None))
+                | (col(VerifiedImage.image_path) != Item.image_path)
+                | (col(VerifiedImage.verified_at) < cutoff),
+            )
+        )
+    ).all()
+    return [(item_id, image_path) for item_id, image_path in rows]
+
+
+async def repair_image(
+    client: httpx.AsyncClient,
+    semaphore: asyncio.Semaphore,
+    item_id: int,
+    file_name: str,
+    blizzard_url: str | None,
+) -> bool:
+    async with semaphore:
+        logger.warning(
+            f"Image '{file_name}' for item ID {item_id} is missing. Attempting to re-upload..."
+        )
+        if not blizzard_url:
+            # If it isn't cached, we get it from the Blizzard API
+            blizzard_url = await get_item_blizzard_image_url(client, item_id)
+            if not blizzard_url:
+                logger.error(
+                    f"Could not find Blizzard URL in cache or API for item ID {item_id}."
+                )
+                return False
+        try:
+            return (
+                await download_image_and_upload_to_supabase(
+                    client, blizzard_url, file_name
+                )
+                is not None
+            )
+        except Exception as e:
+            logger.error(f"Failed to re-upload '{file_name}': {e}", exc_info=True)
+            return False
+
+
+async def save_verified(session: AsyncSession, items: list[tuple[int, str]]) -> None:
+    if not items:
+        return
+    now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+    insert_stmt = pg_insert(VerifiedImage)
+    await session.execute(
+        insert_stmt.on_conflict_do_update(
+            index_elements=["item_id"],
+            set_={
+                "image_path": insert_stmt.excluded.image_path,
+                "verified_at": insert_stmt.excluded.verified_at,
+            },
+        ),
+        [
+            {"item_id": item_id, "image_path": image_path, "verified_at": now}
+            for item_id, image_path in items
+        ],
+    )
+    await session.commit()
+
 
 async def verify_images_on_startup():
     """
-    Checks if all images in the 'items' table exist in Supabase Storage.
-    If an image is missing, it re-downloads and uploads it.
+    Checks if the images of the 'items' table exist in Supabase Storage and
+    re-uploads the missing ones. Items already confirmed with the same
+    image_path (see `verified_images`) are skipped, so a restart with no
+    new items doesn't even list the bucket.
     """
     logger.info("Starting image verification task...")
 
     async with httpx.AsyncClient(timeout=30) as client:
         try:
-            with Session(engine) as session:
-                items = session.exec(select(Item.id, Item.image_path)).all()
-                if not items:
-                    logger.info(
-                        "No items found in the database. Skipping image verification."
-                    )
+            async with AsyncSession(get_async_engine()) as session:
+                pending = await items_to_verify(session)
+                if not pending:
+                    logger.info("All item images already verified.")
                     return
 
-                storage_files_list = supabase_client.storage.from_(BUCKET_NAME).list()
-
-                existing_storage_files = {file["name"] for file in storage_files_list}
-
-                missing_count = 0
-                for item_id, image_path in items:
-                    if not image_path:
-                        continue
-
-                    file_name = image_path.split("/")[-1][:-1]  # Removing the "?"
-
-                    if file_name not in existing_storage_files:
-                        missing_count += 1
-                        logger.warning(
-                            f"Image '{file_name}' for item ID {item_id} is missing. Attempting to re-upload..."
-                        )
-
-                        # Verifies if we have a cached Blizzard URL for this item
-                        cache_entry = session.exec(
-                            select(ItemCache.blizzard_image_url).where(
-                                ItemCache.item_id == item_id
-                            )
-                        ).first()
-
-                        if not cache_entry:
-                            # If it doesn't exist, we get it from the Blizzard API
-                            blizzard_url = await get_item_blizzard_image_url(
-                                client, item_id
-                            )
-                            if not blizzard_url:
-                                logger.error(
-                                    f"Could not find Blizzard URL in cache or API for item ID {item_id}."
+                existing_storage_files = await asyncio.to_thread(list_storage_files)
+
+                verified = [
+                    (item_id, image_path)
+                    for item_id, image_path in pending
+                    if image_file_name(image_path) in existing_storage_files
+                ]
+                missing = [
+                    (item_id, image_path)
+                    for item_id, image_path in pending
+                    if image_file_name(image_path) not in existing_storage_files
+                ]
+
+                # URLs da Blizzard já salvas, em uma consulta só
+                cached_urls: dict[int, str] = {}
+                if missing:
+                    cached_urls = dict(
+                        (
+                            await session.exec(
+                                select(
+                                    ItemCache.item_id, ItemCache.blizzard_image_url
+                                ).where(
+                                    col(ItemCache.item_id).in_(
+                                        [item_id for item_id, _ in missing]
+                                    )
                                 )
-                                continue
-                        else:
-                            blizzard_url = cache_entry
-
-                        try:
-                            await download_image_and_upload_to_supabase(
-                                client, blizzard_url, file_name
-                            )
-                        except Exception as e:
-                            logger.error(
-                                f"Failed to re-upload '{file_name}': {e}", exc_info=True
                             )
+                        ).all()
+                    )
+
+                semaphore = asyncio.Semaphore(
+                    int(os.getenv("IMAGE_VERIFY_CONCURRENCY", "8"))
+                )
+                repaired = await asyncio.gather(
+                    *(
+                        repair_image(
+                            client,
+                            semaphore,
+                            item_id,
+                            image_file_name(image_path),
+                            cached_urls.get(item_id),
+                        )
+                        for item_id, image_path in missing
+                    )
+                )
+                verified += [
+                    item for item, ok in zip(missing, repaired, strict=True) if ok
+                ]
+
+                await save_verified(session, verified)
+                logger.info(
+                    f"Image verification done: {len(pending)} checked, "
+                    f"{len(missing)} missing, {sum(repaired)} re-uploaded."
+                )
         except Exception as e:
             logger.error(
                 f"An error occurred during image verification: {e}", exc_info=True
@@ -83,6 +201,4 @@ async def verify_images_on_startup():
 
 
 if __name__ == "__main__":
-    import asyncio
-
     asyncio.run(verify_images_on_startup())
@@ -1,35 +1,49 @@
+import asyncio
 import datetime
 import json
 import os
 import zoneinfo
-from typing import Any, Sequence
+from functools import cache
+from typing import TYPE_CHECKING, Any, Sequence
 
 import httpx
-import pandas as pd
-from bs4 import BeautifulSoup, Tag
 from sqlalchemy import Row
 from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from app.blizzard_api import fetch_blizzard_api
+from app.blizzard_api import blizzard_api_url, fetch_blizzard_api
 from app.logger import get_logger
 from app.models import Settings
-from app.schemas import PriceGoldSilver, Quality
+from app.schemas import PriceGoldSilver
+from app.services.icon_services import fetch_icon
 from exceptions import EnvNotSetError
-from supabase import Client, create_client
 
-logger = get_logger(__name__)
+if TYPE_CHECKING:
+    from supabase import Client
 
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-if not SUPABASE_URL:
-    raise EnvNotSetError("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
-if not SUPABASE_KEY:
-    raise EnvNotSetError("SUPABASE_KEY")
+logger = get_logger(__name__)
 
-supabase_client: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
 BUCKET_NAME = "images"
 
 
+def get_supabase_credentials() -> tuple[str, str]:
+    supabase_url = os.getenv("SUPABASE_URL")
+    if not supabase_url:
+        raise EnvNotSetError("SUPABASE_URL")
+    supabase_key = os.getenv("SUPABASE_KEY")
+    if not supabase_key:
+        raise EnvNotSetError("SUPABASE_KEY")
+    return supabase_url, supabase_key
+
+
+@cache
+def get_supabase_client() -> "Client":
+    """Cliente do Supabase criado no primeiro uso; o SDK é pesado para importar."""
+    from supabase import create_client
+
+    return create_client(*get_supabase_credentials())
+
+
 def price_to_gold_and_silver(price: int | float) -> PriceGoldSilver:
     """Converte o preço em centavos para ouro e prata."""
     gold = int(price) // 10000
@@ -50,14 +64,12 @@ async def download_image_and_upload_to_supabase(
     httpx_client: httpx.AsyncClient, url: str, file_name: str
 ):
     try:
-        img_response = await httpx_client.get(url)
-        img_response.raise_for_status()
-        supabase_client.storage.from_(BUCKET_NAME).upload(
-            file_name, img_response.content
-        )
-        public_url = supabase_client.storage.from_(BUCKET_NAME).get_public_url(
-            file_name
-        )
+        # Usa o cache local de ícones, então um reparo não baixa a imagem de novo
+        _, content = await fetch_icon(httpx_client, url)
+        bucket = get_supabase_client().storage.from_(BUCKET_NAME)
+        # O SDK do Supabase é síncrono; em uma thread os uploads não travam o loop
+        await asyncio.to_thread(bucket.upload, file_name, content)
+        public_url = bucket.get_public_url(file_name)
         return public_url
     except httpx.HTTPStatusError as e:
         logger.error(f"Failed to download image: {e}")
@@ -65,32 +77,16 @@ async def download_image_and_upload_to_supabase(
     except Exception as e:
         if "duplicate" in str(e).lower():
             logger.info("Image already exists in Supabase, getting public URL.")
-            return supabase_client.storage.from_(BUCKET_NAME).get_public_url(file_name)
+            return (
+                get_supabase_client()
+                .storage.from_(BUCKET_NAME)
+                .get_public_url(file_name)
+            )
         else:
             logger.error(f"Unexpected error downloading image: {e}", exc_info=True)
             raise e
 
 
-async def get_item_quality(item_id: int, httpx_client: httpx.AsyncClient) -> Quality:
-    response = await httpx_client.get(f"https://www.wowhead.com/item={item_id}/")
-    if response.status_code == 301:
-        response = await httpx_client.get(
-            f"https://www.wowhead.com{response.headers['location']}"
-        )
-    soup = BeautifulSoup(response.content, "html.parser")
-    script = soup.find("script", {"id": "data.page.wow.item.contextNames"})
-    if script and script.next_sibling and isinstance(script.next_sibling, Tag):
-        script_text = script.next_sibling.string
-        if script_text:
-            if "tier3.png" in script_text:
-                return Quality.tier_1
-            if "tier2.png" in script_text:
-                return Quality.tier_2
-            if "tier1.png" in script_text:
-                return Quality.tier_3
-    return Quality.normal
-
-
 def get_plotly_heatmap_data(
     raw_data: Sequence[Row[Any]],
     column_name: str,
@@ -98,6 +94,8 @@ def get_plotly_heatmap_data(
     if not raw_data:
         return {"x": [], "y": [], "z": []}
 
+    import pandas as pd
+
     weekday_order = [
         "Domingo",
         "Segunda",
@@ -129,7 +127,7 @@ async def get_item_blizzard_image_url(
 ) -> str | None:
     try:
         item_response = await fetch_blizzard_api(
-            f"https://us.api.blizzard.com/data/wow/item/{item_id}",
+            blizzard_api_url(f"/data/wow/item/{item_id}"),
             httpx_client,
             {"namespace": "static-us", "locale": "pt_BR"},
             "Item",
@@ -146,11 +144,10 @@ async def get_item_blizzard_image_url(
         return None
 
 
-def best_price_window_start_date(db_session: Session) -> datetime.datetime | None:
-    best_price_window_days_db = db_session.exec(
-        select(Settings.value).where(Settings.key == "best_price_window_days")
-    ).one_or_none()
-
+def window_start_from_setting(
+    best_price_window_days_db: str | None,
+) -> datetime.datetime | None:
+    """Converte a configuração `best_price_window_days` na data inicial (UTC, sem fuso)."""
     best_price_window_days = "all"
 
     if best_price_window_days_db != "all" and best_price_window_days_db is not None:
@@ -167,6 +164,42 @@ def best_price_window_start_date(db_session: Session) -> datetime.datetime | Non
             target_date.day,
             tzinfo=sao_paulo,
         )
-        window_start = window_start_local.astimezone(datetime.timezone.utc)
+        # As colunas são "timestamp without time zone" em UTC
+        window_start = window_start_local.astimezone(datetime.timezone.utc).replace(
+            tzinfo=None
+        )
 
     return window_start
+
+
+def best_price_window_start_date(db_session: Session) -> datetime.datetime | None:
+    best_price_window_days_db = db_session.exec(
+        select(Settings.value).where(Settings.key == "best_price_window_days")
+    ).one_or_none()
+
+    return window_start_from_setting(best_price_window_days_db)
+
+
+async def best_price_window_start_date_async(
+    db_session: AsyncSession,
+) -> datetime.datetime | None:
+    best_price_window_days_db = (
+        await db_session.exec(
+            select(Settings.value).where(Settings.key == "best_price_window_days")
+        )
+    ).one_or_none()
+
+    return window_start_from_setting(best_price_window_days_db)
+
+
+async def get_settings_values_async(
+    db_session: AsyncSession, keys: list[str]
+) -> dict[str, str]:
+    settings = (
+        await db_session.exec(
+            select(Settings.key, Settings.value).where(
+                Settings.key.in_(keys)  # type: ignore
+            )
+        )
+    ).all()
+    return {key: value for key, value in settings}
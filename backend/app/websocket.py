@@ -1,37 +1,291 @@
+import asyncio
+import json
+import time
+
 from fastapi import APIRouter, WebSocket
 
+from app.broadcast import (
+    InMemoryBroadcastBackend,
+    PostgresBroadcastBackend,
+    create_broadcast_backend,
+)
 from app.logger import get_logger
+from app.metrics import (
+    WEBSOCKET_FANOUT_SECONDS,
+    WEBSOCKET_MESSAGES,
+    WEBSOCKET_SEND_SECONDS,
+    Gauge,
+)
 
 logger = get_logger(__name__)
 
+CLIENT_QUEUE_SIZE = 64
+SEND_TIMEOUT_SECONDS = 10
+MAX_CONSECUTIVE_DROPS = 32
+MAX_TOPICS_PER_CLIENT = 500
+
+
+class ClientConnection:
+    """A connected socket with its own bounded outbound queue and writer task."""
+
+    def __init__(self, websocket: WebSocket, manager: "ConnectionManager"):
+        self.websocket = websocket
+        self.manager = manager
+        self.queue: asyncio.Queue[str] = asyncio.Queue(maxsize=CLIENT_QUEUE_SIZE)
+        self.dropped_messages = 0
+        self.consecutive_drops = 0
+        self.sent_messages = 0
+        self.last_send_latency = 0.0
+        self.avg_send_latency = 0.0
+        self.max_send_latency = 0.0
+        self.writer_task: asyncio.Task | None = None
+        self.topics: set[str] = set()
+
+    def start(self):
+        self.writer_task = asyncio.create_task(self._writer())
+
+    def enqueue(self, payload: str) -> bool:
+        """
+        Queues a payload without waiting. When the queue is full the oldest
+        message is dropped; returns False once the client keeps falling behind.
+        """
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped_messages += 1
+            WEBSOCKET_MESSAGES.labels("dropped").inc()
+            self.consecutive_drops += 1
+            if self.consecutive_drops >= MAX_CONSECUTIVE_DROPS:
+                return False
+        self.queue.put_nowait(payload)
+        return True
+
+    def _record_latency(self, latency: float):
+        WEBSOCKET_SEND_SECONDS.labels().observe(latency)
+        WEBSOCKET_MESSAGES.labels("sent").inc()
+        self.sent_messages += 1
+        self.consecutive_drops = 0
+        self.last_send_latency = latency
+        self.max_send_latency = max(self.max_send_latency, latency)
+        # Média móvel exponencial para não guardar o histórico inteiro
+        self.avg_send_latency += (latency - self.avg_send_latency) * 0.1
+
+    async def _writer(self):
+        try:
+            while True:
+                payload = await self.queue.get()
+                start = time.perf_counter()
+                await asyncio.wait_for(
+                    self.websocket.send_text(payload), SEND_TIMEOUT_SECONDS
+                )
+                self._record_latency(time.perf_counter() - start)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Dropping WebSocket client after send failure: {e!r}")
+            await self.manager.close(self.websocket)
+
+    def stats(self) -> dict:
+        return {
+            "queue_size": self.queue.qsize(),
+            "sent_messages": self.sent_messages,
+            "dropped_messages": self.dropped_messages,
+            "last_send_latency": self.last_send_latency,
+            "avg_send_latency": self.avg_send_latency,
+            "max_send_latency": self.max_send_latency,
+        }
+
 
 class ConnectionManager:
-    def __init__(self):
-        self.active_connections: list[WebSocket] = []
+    def __init__(self, backend: InMemoryBroadcastBackend | PostgresBroadcastBackend):
+        self.backend = backend
+        self.active_connections: dict[WebSocket, ClientConnection] = {}
+        self.topic_subscribers: dict[str, set[WebSocket]] = {}
 
     async def connect(self, websocket: WebSocket):
         await websocket.accept()
-        self.active_connections.append(websocket)
+        client = ClientConnection(websocket, self)
+        self.active_connections[websocket] = client
+        client.start()
 
     def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
+        client = self.active_connections.pop(websocket, None)
+        if client:
+            self.unsubscribe(websocket, list(client.topics))
+        if client and client.writer_task and not client.writer_task.done():
+            if client.writer_task is not asyncio.current_task():
+                client.writer_task.cancel()
+
+    async def close(self, websocket: WebSocket):
+        """Removes a client and closes its socket, so its receive loop ends too."""
+        self.disconnect(websocket)
+        try:
+            await websocket.close()
+        except Exception:
+            pass
+
+    def subscribe(self, websocket: WebSocket, topics: list[str]) -> list[str]:
+        client = self.active_connections.get(websocket)
+        if client is None:
+            return []
+        for topic in topics:
+            if len(client.topics) >= MAX_TOPICS_PER_CLIENT:
+                break
+            client.topics.add(topic)
+            self.topic_subscribers.setdefault(topic, set()).add(websocket)
+        return sorted(client.topics)
+
+    def unsubscribe(self, websocket: WebSocket, topics: list[str]) -> list[str]:
+        client = self.active_connections.get(websocket)
+        for topic in topics:
+            subscribers = self.topic_subscribers.get(topic)
+            if subscribers is not None:
+                subscribers.discard(websocket)
+                if not subscribers:
+                    del self.topic_subscribers[topic]
+            if client is not None:
+                client.topics.discard(topic)
+        return sorted(client.topics) if client is not None else []
+
+    def subscribed_topics(self) -> set[str] | None:
+        """
+        Topics with subscribers, or None when other workers may hold
+        subscribers this process can't see (every topic must be published).
+        """
+        if self.backend.distributed:
+            return None
+        return set(self.topic_subscribers.keys())
+
+    async def start(self):
+        await self.backend.start(self._deliver)
+
+    async def stop(self):
+        await self.backend.stop()
+
+    async def _deliver(self, envelope: dict):
+        """Sends an envelope coming from the broadcast backend to the local sockets."""
+        start = time.perf_counter()
+        target = envelope["target"]
+        if target == "all":
+            websockets = list(self.active_connections.keys())
+        elif target == "unsubscribed":
+            websockets = [
+                websocket
+                for websocket, client in self.active_connections.items()
+                if not client.topics
+            ]
+        else:
+            websockets = list(self.topic_subscribers.get(envelope["topic"], ()))
+
+        slow_clients = [
+            websocket
+            for websocket in websockets
+            if websocket in self.active_connections
+            and not self.active_connections[websocket].enqueue(envelope["payload"])
+        ]
+        WEBSOCKET_FANOUT_SECONDS.labels(target).observe(time.perf_counter() - start)
+
+        for websocket in slow_clients:
+            logger.warning("Dropping slow WebSocket client.")
+            await self.close(websocket)
 
     async def broadcast(self, message: dict):
-        for connection in self.active_connections:
-            await connection.send_json(message)
+        payload = json.dumps(message, separators=(",", ":"), ensure_ascii=False)
+        await self.backend.publish({"target": "all", "payload": payload})
+
+    async def broadcast_to_unsubscribed(self, message: dict):
+        """Sends to clients that didn't subscribe to any topic (legacy clients)."""
+        payload = json.dumps(message, separators=(",", ":"), ensure_ascii=False)
+        await self.backend.publish({"target": "unsubscribed", "payload": payload})
+
+    async def publish(self, topic: str, message: dict):
+        if not self.backend.distributed and topic not in self.topic_subscribers:
+            return
+        payload = json.dumps(
+            {"topic": topic, **message}, separators=(",", ":"), ensure_ascii=False
+        )
+        await self.backend.publish(
+            {"target": "topic", "topic": topic, "payload": payload}
+        )
 
+    def stats(self) -> list[dict]:
+        return [client.stats() for client in self.active_connections.values()]
 
-connection_manager = ConnectionManager()
+
+connection_manager = ConnectionManager(create_broadcast_backend())
+
+Gauge(
+    "websocket_connections",
+    "Open WebSocket connections in this worker.",
+    function=lambda: len(connection_manager.active_connections),
+)
+Gauge(
+    "websocket_topics",
+    "Topics with at least one local subscriber.",
+    function=lambda: len(connection_manager.topic_subscribers),
+)
+Gauge(
+    "websocket_queued_messages",
+    "Messages waiting in the client queues.",
+    function=lambda: sum(
+        client.queue.qsize()
+        for client in list(connection_manager.active_connections.values())
+    ),
+)
+Gauge(
+    "websocket_max_queue_depth",
+    "Deepest client queue.",
+    function=lambda: max(
+        (
+            client.queue.qsize()
+            for client in list(connection_manager.active_connections.values())
+        ),
+        default=0,
+    ),
+)
 
 router = APIRouter()
 
 
+async def handle_client_message(websocket: WebSocket, raw_message: str):
+    """
+    Handles `{"action": "subscribe" | "unsubscribe", "topics": [...]}` messages.
+    Topics are `item:<id>` for a single item or `items` for the item list view.
+    """
+    try:
+        message = json.loads(raw_message)
+        action = message["action"]
+        topics = [
+            topic
+            for topic in map(str, message.get("topics", []))
+            if topic == "items" or (topic.startswith("item:") and topic[5:].isdigit())
+        ]
+    except (json.JSONDecodeError, KeyError, TypeError):
+        return
+
+    if action == "subscribe":
+        current_topics = connection_manager.subscribe(websocket, topics)
+    elif action == "unsubscribe":
+        current_topics = connection_manager.unsubscribe(websocket, topics)
+    else:
+        return
+
+    client = connection_manager.active_connections.get(websocket)
+    if client is not None:
+        client.enqueue(
+            json.dumps(
+                {"action": "subscriptions", "data": {"topics": current_topics}},
+                separators=(",", ":"),
+                ensure_ascii=False,
+            )
+        )
+
+
 @router.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     await connection_manager.connect(websocket)
     try:
         while True:
-            await websocket.receive_text()
+            await handle_client_message(websocket, await websocket.receive_text())
     except Exception as e:
         logger.error(f"WebSocket error: {e}")
     finally:
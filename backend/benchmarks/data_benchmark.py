@@ -0,0 +1,373 @@
+"""
+Benchmarks dos caminhos quentes da ingestão e das consultas com dados
+sintéticos (ver synthetic_data.py), contra um banco local. Os resultados
+vão para um JSON, que pode ser comparado com o de uma execução anterior.
+
+Uso, a partir de backend/ (com DATABASE_URL apontando para o banco local):
+    python benchmarks/data_benchmark.py --auctions 50000,200000,1000000
+    python benchmarks/data_benchmark.py --compare benchmarks/results/<anterior>.json
+
+Os itens sintéticos usam ids a partir de 900000000 e são apagados ao final
+(junto com o histórico e as notificações deles), a menos de --keep-data.
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+import httpx  # noqa: E402
+from sqlalchemy import make_url  # noqa: E402
+from sqlalchemy.dialects.postgresql import insert as pg_insert  # noqa: E402
+from sqlmodel import text  # noqa: E402
+from sqlmodel.ext.asyncio.session import AsyncSession  # noqa: E402
+from synthetic_data import (  # noqa: E402
+    commodities_payload,
+    heatmap_rows,
+    price_history_records,
+    synthetic_item_ids,
+)
+
+from app.dependencies import get_async_engine, get_database_url  # noqa: E402
+from app.models import Item  # noqa: E402
+from app.schemas import Intent  # noqa: E402
+
+RESULTS_DIR = BACKEND_DIR / "benchmarks" / "results"
+LOCAL_HOSTS = (None, "", "localhost", "127.0.0.1", "::1")
+# Tabelas com item_id, limpas antes de apagar os itens sintéticos
+ITEM_TABLES = (
+    "item_cache",
+    "notifications",
+    "notifications_archive",
+    "price_history",
+    "item_rolling_stats",
+    "item_forecast_models",
+    "price_liquidity",
+    "item_supply",
+    "verified_images",
+)
+
+
+def percentile(ordered: list[float], fraction: float) -> float:
+    return ordered[round(fraction * (len(ordered) - 1))]
+
+
+def summarize(durations: list[float]) -> dict[str, float]:
+    ordered = sorted(durations)
+    return {
+        "runs": len(ordered),
+        "min_ms": ordered[0] * 1000,
+        "median_ms": statistics.median(ordered) * 1000,
+        "p95_ms": percentile(ordered, 0.95) * 1000,
+        "p99_ms": percentile(ordered, 0.99) * 1000,
+        "max_ms": ordered[-1] * 1000,
+        "mean_ms": statistics.fmean(ordered) * 1000,
+    }
+
+
+async def measure(
+    results: dict[str, dict],
+    name: str,
+    func: Callable[[int], Awaitable[Any]],
+    repeats: int,
+    warmup: int = 1,
+) -> Any:
+    """Runs func(run) warmup + repeats times and stores the timed runs."""
+    result = None
+    for run in range(warmup):
+        result = await func(-1 - run)
+    durations = []
+    for run in range(repeats):
+        gc.collect()
+        start = time.perf_counter()
+        result = await func(run)
+        durations.append(time.perf_counter() - start)
+    results[name] = summarize(durations)
+    print(
+        f"{name:<45} median {results[name]['median_ms']:>10.2f} ms  "
+        f"p95 {results[name]['p95_ms']:>10.2f} ms"
+    )
+    return result
+
+
+async def delete_synthetic_data(db_session: AsyncSession, item_ids: list[int]):
+    for table in ITEM_TABLES:
+        await db_session.execute(
+            text(f"DELETE FROM {table} WHERE item_id = ANY(CAST(:ids AS integer[]))"),
+            {"ids": item_ids},
+        )
+    await db_session.execute(
+        text("DELETE FROM items WHERE id = ANY(CAST(:ids AS integer[]))"),
+        {"ids": item_ids},
+    )
+    await db_session.commit()
+
+
+async def seed_database(
+    db_session: AsyncSession, item_ids: list[int], history_end: datetime, args
+):
+    await delete_synthetic_data(db_session, item_ids)
+    await db_session.execute(
+        pg_insert(Item).values(
+            [
+                {
+                    "id": item_id,
+                    "name": f"Synthetic Commodity {index}",
+                    "image_path": "",
+                    "quantity_threshold": 1,
+                    "intent": Intent.sell if index % 2 else Intent.buy,
+                    # Alertas perto do preço, para as notificações terem trabalho
+                    "above_alert": 1,
+                    "below_alert": 2**31 - 1,
+                    "notify_sell": index % 2 == 1,
+                    "notify_buy": index % 2 == 0,
+                    "is_active": True,
+                }
+                for index, item_id in enumerate(item_ids)
+            ]
+        )
+    )
+    await db_session.commit()
+
+    start = time.perf_counter()
+    rows = 0
+    connection = await db_session.connection()
+    raw = (await connection.get_raw_connection()).driver_connection
+    for records in price_history_records(
+        item_ids, history_end, args.history_years, args.seed
+    ):
+        await raw.copy_records_to_table(  # type: ignore
+            "price_history",
+            records=records,
+            columns=["item_id", "price", "quantity", "timestamp"],
+        )
+        rows += len(records)
+    await db_session.commit()
+    await db_session.execute(text("ANALYZE price_history"))
+    await db_session.commit()
+    print(
+        f"Seeded {len(item_ids)} items and {rows} price_history rows "
+        f"in {time.perf_counter() - start:.1f}s"
+    )
+    return rows
+
+
+async def run_benchmarks(args) -> dict[str, dict]:
+    from app.background_tasks import process_data, save_data
+    from app.main import app
+    from app.services.market_services import auctions_to_arrays
+    from app.services.notification_services import notify_after_update
+    from app.utils import get_plotly_heatmap_data
+
+    results: dict[str, dict] = {}
+    item_ids = synthetic_item_ids(args.items)
+    history_end = datetime.now(timezone.utc).replace(
+        tzinfo=None, minute=0, second=0, microsecond=0
+    )
+
+    async with AsyncSession(get_async_engine(), expire_on_commit=False) as db_session:
+        await seed_database(db_session, item_ids, history_end, args)
+        try:
+            processed = None
+            for auction_count in args.auctions:
+                payload = commodities_payload(
+                    auction_count, args.payload_items, args.seed
+                )
+
+                async def to_arrays(_: int):
+                    return auctions_to_arrays(payload["auctions"])
+
+                arrays = await measure(
+                    results,
+                    f"auctions_to_arrays[{auction_count}]",
+                    to_arrays,
+                    args.repeats,
+                )
+                payload.clear()
+                processed = await measure(
+                    results,
+                    f"process_data[{auction_count}]",
+                    lambda _: process_data(arrays, db_session, history_end),
+                    args.repeats,
+                )
+                gc.collect()
+
+            if processed is not None:
+                # Horas seguintes ao histórico, uma por execução
+                async def save(run: int):
+                    rows = processed.copy()
+                    rows["timestamp"] = history_end + timedelta(hours=run + 10)
+                    await save_data(rows, db_session)
+
+                await measure(
+                    results, f"save_data[{len(processed)}]", save, args.repeats
+                )
+
+            rows = heatmap_rows(args.seed)
+
+            async def heatmap(_: int):
+                for _ in range(100):
+                    get_plotly_heatmap_data(rows, "price")
+
+            await measure(
+                results, "get_plotly_heatmap_data[x100]", heatmap, args.repeats
+            )
+
+            item_id = item_ids[0]
+            endpoints = [
+                "/items/",
+                "/items/week",
+                "/items/today",
+                "/items/stats",
+                "/items/search?q=synthetic",
+                f"/items/{item_id}",
+                f"/items/{item_id}/plot-data",
+                f"/items/{item_id}/history",
+            ]
+            async with httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=app),
+                base_url="http://benchmark",
+                timeout=None,
+            ) as client:
+                for endpoint in endpoints:
+
+                    async def request(_: int, endpoint=endpoint):
+                        response = await client.get(endpoint)
+                        response.raise_for_status()
+
+                    await measure(results, f"GET {endpoint}", request, args.requests)
+
+            await measure(
+                results,
+                "notify_after_update",
+                lambda _: notify_after_update(db_session),
+                args.repeats,
+            )
+        finally:
+            if not args.keep_data:
+                await db_session.rollback()
+                await delete_synthetic_data(db_session, item_ids)
+    return results
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BACKEND_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current: dict[str, dict], previous_path: Path, threshold: float) -> bool:
+    """Prints the median change per benchmark; True if any got slower."""
+    previous = json.loads(previous_path.read_text())["results"]
+    regressed = False
+    print()
+    print(f"Compared with {previous_path.name} (threshold +{threshold:.0%}):")
+    for name, stats in current.items():
+        if name not in previous:
+            continue
+        before = previous[name]["median_ms"]
+        change = stats["median_ms"] / before - 1 if before else 0.0
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            regressed = True
+        print(
+            f"{name:<45} {before:>10.2f} -> {stats['median_ms']:>10.2f} ms "
+            f"({change:+.1%}){flag}"
+        )
+    return regressed
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--auctions",
+        type=lambda value: [int(count) for count in value.split(",")],
+        default=[50_000, 200_000, 1_000_000],
+        help="Tamanhos do dump de commodities, separados por vírgula",
+    )
+    parser.add_argument(
+        "--payload-items",
+        type=int,
+        default=8000,
+        help="Itens distintos no dump",
+    )
+    parser.add_argument(
+        "--items", type=int, default=100, help="Itens sintéticos acompanhados"
+    )
+    parser.add_argument("--history-years", type=float, default=2)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument(
+        "--requests", type=int, default=20, help="Requisições por endpoint"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path)
+    parser.add_argument("--compare", type=Path)
+    parser.add_argument("--threshold", type=float, default=0.2)
+    parser.add_argument("--keep-data", action="store_true")
+    parser.add_argument(
+        "--allow-remote",
+        action="store_true",
+        help="Permite um DATABASE_URL fora da máquina local",
+    )
+    args = parser.parse_args()
+
+    if args.items > args.payload_items:
+        parser.error("--items não pode passar de --payload-items")
+    host = make_url(get_database_url()).host
+    if host not in LOCAL_HOSTS and not args.allow_remote:
+        parser.error(f"DATABASE_URL aponta para {host}; use um banco local")
+
+    results = asyncio.run(run_benchmarks(args))
+
+    output = args.output or RESULTS_DIR / (
+        f"data-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(
+        json.dumps(
+            {
+                "meta": {
+                    "created_at": datetime.now(timezone.utc).isoformat(),
+                    "commit": git_commit(),
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "cpus": os.cpu_count(),
+                    "args": {
+                        key: str(value) if isinstance(value, Path) else value
+                        for key, value in vars(args).items()
+                    },
+                },
+                "results": results,
+            },
+            indent=2,
+        )
+    )
+    print(f"\nResults written to {output}")
+
+    if args.compare and compare(results, args.compare, args.threshold):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
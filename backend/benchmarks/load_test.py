@@ -0,0 +1,437 @@
+"""
+Teste de carga de ponta a ponta sem rede. Sobe o servidor local que imita a
+Blizzard, a Wowhead e o Supabase (stand_in_server.py) e o app apontando para
+ele. Em seguida adiciona itens sintéticos pelo /items/bulk e, durante
+--duration segundos, roda três cargas ao mesmo tempo:
+- ingestões periódicas;
+- clientes da API;
+- clientes WebSocket.
+
+No fim informa vazão e latências de cauda. O resultado vai para
+benchmarks/results/load-<data>.json.
+
+Uso, a partir de backend/ (com DATABASE_URL apontando para um banco local):
+    python benchmarks/load_test.py --duration 60 --api-clients 20 --ws-clients 50
+
+O app também faz a sua própria ingestão ao subir se o último dado tiver mais
+de uma hora. Os itens sintéticos, e os snapshots de mercado gravados durante
+o teste, são apagados ao final, a menos de --keep-data.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+import httpx  # noqa: E402
+from data_benchmark import (  # noqa: E402
+    LOCAL_HOSTS,
+    RESULTS_DIR,
+    delete_synthetic_data,
+    git_commit,
+    summarize,
+)
+from sqlalchemy import make_url  # noqa: E402
+from sqlmodel import text  # noqa: E402
+from sqlmodel.ext.asyncio.session import AsyncSession  # noqa: E402
+from synthetic_data import synthetic_item_ids  # noqa: E402
+from websockets.asyncio.client import connect as websocket_connect  # noqa: E402
+
+from app.dependencies import get_async_engine, get_database_url  # noqa: E402
+
+# Chave no formato de JWT; o servidor local não a valida
+STAND_IN_SUPABASE_KEY = "eyJhbGciOiJIUzI1NiJ9.eyJyb2xlIjoic2VydmljZV9yb2xlIn0.load-test"
+STARTUP_TIMEOUT = 60
+
+# (peso, caminho); {item_id} é sorteado entre os itens sintéticos
+API_MIX = (
+    (4, "/items/"),
+    (2, "/items/week"),
+    (2, "/items/today"),
+    (1, "/items/stats"),
+    (2, "/items/search?q=commodity"),
+    (4, "/items/{item_id}"),
+    (2, "/items/{item_id}/plot-data"),
+    (3, "/items/{item_id}/history"),
+    (1, "/notifications/"),
+)
+
+
+async def wait_until_up(url: str, process: subprocess.Popen, name: str):
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    async with httpx.AsyncClient(timeout=2) as client:
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError(f"{name} exited with code {process.returncode}")
+            try:
+                if (await client.get(url)).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.25)
+    raise RuntimeError(f"{name} did not start in {STARTUP_TIMEOUT}s")
+
+
+def start_process(args: list[str], log_path: Path) -> subprocess.Popen:
+    # O processo filho herda uma cópia do descritor; a nossa pode ser fechada
+    with open(log_path, "wb") as log:
+        return subprocess.Popen(
+            [sys.executable, *args],
+            cwd=BACKEND_DIR,
+            stdout=log,
+            stderr=subprocess.STDOUT,
+        )
+
+
+def stop_process(process: subprocess.Popen | None):
+    if process is None or process.poll() is not None:
+        return
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+class LoadStats:
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.statuses: dict[str, dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self.ingestions: list[float] = []
+        self.ingestion_results: dict[str, int] = defaultdict(int)
+        # Início de cada ingestão, para medir quanto o aviso leva até os clientes
+        self.ingestion_starts: list[float] = []
+        self.ws_messages: dict[str, int] = defaultdict(int)
+        self.ws_delivery: list[float] = []
+        self.ws_errors = 0
+
+    def record_request(self, label: str, status: int | str, elapsed: float):
+        self.latencies[label].append(elapsed)
+        self.statuses[label][str(status)] += 1
+
+
+async def onboard_items(app_url: str, item_ids: list[int]) -> dict:
+    """Adds the synthetic items through POST /items/bulk, like a user would."""
+    counts: dict[str, int] = defaultdict(int)
+    start = time.perf_counter()
+    async with httpx.AsyncClient(base_url=app_url, timeout=None) as client:
+        async with client.stream(
+            "POST",
+            "/items/bulk",
+            json={
+                "item_ids": item_ids,
+                "options": {
+                    "quantity_threshold": 1,
+                    "above_alert": {"gold": 1, "silver": 0},
+                    "notify_sell": True,
+                },
+            },
+        ) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if line:
+                    counts[json.loads(line)["status"]] += 1
+    elapsed = time.perf_counter() - start
+    print(f"Onboarded {dict(counts)} in {elapsed:.1f}s")
+    return {"seconds": elapsed, "statuses": dict(counts)}
+
+
+async def api_client(
+    app_url: str, item_ids: list[int], stats: LoadStats, stop_at: float, seed: int
+):
+    rng = random.Random(seed)
+    weights = [weight for weight, _ in API_MIX]
+    paths = [path for _, path in API_MIX]
+    async with httpx.AsyncClient(base_url=app_url, timeout=30) as client:
+        while time.monotonic() < stop_at:
+            label = rng.choices(paths, weights)[0]
+            path = label.format(item_id=rng.choice(item_ids))
+            start = time.perf_counter()
+            try:
+                response = await client.get(path)
+                status: int | str = response.status_code
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            stats.record_request(label, status, time.perf_counter() - start)
+
+
+async def websocket_client(
+    ws_url: str, item_ids: list[int], stats: LoadStats, stop_at: float, index: int
+):
+    try:
+        async with websocket_connect(ws_url) as websocket:
+            # Metade assina tópicos; a outra metade fica como cliente antigo
+            if index % 2:
+                topics = ["items", f"item:{item_ids[index % len(item_ids)]}"]
+                await websocket.send(
+                    json.dumps({"action": "subscribe", "topics": topics})
+                )
+            while time.monotonic() < stop_at:
+                try:
+                    raw = await asyncio.wait_for(
+                        websocket.recv(), stop_at - time.monotonic()
+                    )
+                except TimeoutError:
+                    break
+                message = json.loads(raw)
+                kind = message.get("action") or message.get("topic", "other")
+                stats.ws_messages[kind] += 1
+                if message.get("action") == "new_data" and stats.ingestion_starts:
+                    stats.ws_delivery.append(
+                        time.perf_counter() - stats.ingestion_starts[-1]
+                    )
+    except Exception:
+        stats.ws_errors += 1
+
+
+async def ingestion_loop(stats: LoadStats, stop_at: float, interval: float):
+    from app.background_tasks import run_ingestion
+
+    while time.monotonic() < stop_at:
+        started = time.perf_counter()
+        stats.ingestion_starts.append(started)
+        try:
+            async with (
+                AsyncSession(get_async_engine(), expire_on_commit=False) as db_session,
+                httpx.AsyncClient(timeout=60) as client,
+            ):
+                result = "ok" if await run_ingestion(db_session, client) else "no_data"
+        except Exception as e:
+            result = type(e).__name__
+        elapsed = time.perf_counter() - started
+        stats.ingestions.append(elapsed)
+        stats.ingestion_results[result] += 1
+        print(f"Ingestion {result} in {elapsed:.1f}s")
+        await asyncio.sleep(max(interval - elapsed, 0))
+
+
+def report(stats: LoadStats, duration: float) -> dict:
+    endpoints = {}
+    print()
+    print(
+        f"{'endpoint':<32} {'reqs':>6} {'req/s':>7} {'p50 ms':>8} "
+        f"{'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}  errors"
+    )
+    for label, latencies in sorted(stats.latencies.items()):
+        summary = summarize(latencies)
+        statuses = dict(stats.statuses[label])
+        errors = sum(
+            count for status, count in statuses.items() if not status.startswith("2")
+        )
+        endpoints[label] = {
+            **summary,
+            "throughput_rps": len(latencies) / duration,
+            "statuses": statuses,
+        }
+        print(
+            f"{label:<32} {len(latencies):>6} {len(latencies) / duration:>7.1f} "
+            f"{summary['median_ms']:>8.1f} {summary['p95_ms']:>8.1f} "
+            f"{summary['p99_ms']:>8.1f} {summary['max_ms']:>8.1f}  {errors}"
+        )
+
+    all_latencies = [value for values in stats.latencies.values() for value in values]
+    overall = summarize(all_latencies) if all_latencies else {}
+    if all_latencies:
+        overall["throughput_rps"] = len(all_latencies) / duration
+        print(
+            f"{'total':<32} {len(all_latencies):>6} "
+            f"{overall['throughput_rps']:>7.1f} {overall['median_ms']:>8.1f} "
+            f"{overall['p95_ms']:>8.1f} {overall['p99_ms']:>8.1f} "
+            f"{overall['max_ms']:>8.1f}"
+        )
+
+    ingestion = {
+        "results": dict(stats.ingestion_results),
+        **(summarize(stats.ingestions) if stats.ingestions else {}),
+    }
+    websocket = {
+        "messages": dict(stats.ws_messages),
+        "errors": stats.ws_errors,
+        "new_data_delivery": summarize(stats.ws_delivery) if stats.ws_delivery else {},
+    }
+    print(f"\nIngestions: {ingestion}")
+    print(f"WebSocket: {websocket}")
+    return {
+        "endpoints": endpoints,
+        "overall": overall,
+        "ingestion": ingestion,
+        "websocket": websocket,
+    }
+
+
+async def run(args, workdir: Path) -> dict:
+    stand_in_url = f"http://127.0.0.1:{args.stand_in_port}"
+    app_url = f"http://127.0.0.1:{args.app_port}"
+    os.environ.update(
+        {
+            "BLIZZARD_API_URL": stand_in_url,
+            "BLIZZARD_OAUTH_URL": stand_in_url,
+            "BLIZZARD_CLIENT_ID": "load-test",
+            "BLIZZARD_CLIENT_SECRET": "load-test",
+            "BLIZZARD_TOKEN_FILE": str(workdir / "token.json"),
+            "WOWHEAD_URL": stand_in_url,
+            "SUPABASE_URL": stand_in_url,
+            "SUPABASE_KEY": STAND_IN_SUPABASE_KEY,
+            "ICON_CACHE_DIR": str(workdir / "icon_cache"),
+            "INTERNAL_WEBHOOK_SECRET": os.getenv("INTERNAL_WEBHOOK_SECRET")
+            or "load-test",
+            "SELF_BASE_URL": app_url,
+            # O servidor local não tem limite de requisições
+            "BLIZZARD_RATE_LIMIT": "100000",
+        }
+    )
+
+    item_ids = synthetic_item_ids(args.items)
+    run_started = datetime.now(timezone.utc).replace(tzinfo=None)
+    stand_in = app = None
+    try:
+        stand_in = start_process(
+            [
+                "benchmarks/stand_in_server.py",
+                f"--port={args.stand_in_port}",
+                f"--auctions={args.auctions}",
+                f"--payload-items={args.payload_items}",
+                f"--latency-ms={args.latency_ms}",
+                f"--jitter-ms={args.jitter_ms}",
+                f"--error-rate={args.error_rate}",
+                "--vary",
+            ],
+            workdir / "stand_in.log",
+        )
+        await wait_until_up(f"{stand_in_url}/__health", stand_in, "stand-in server")
+
+        async with AsyncSession(get_async_engine()) as db_session:
+            await delete_synthetic_data(db_session, item_ids)
+
+        app = start_process(
+            [
+                "-m",
+                "uvicorn",
+                "app.main:app",
+                f"--port={args.app_port}",
+                "--log-level=warning",
+            ],
+            workdir / "app.log",
+        )
+        await wait_until_up(f"{app_url}/health", app, "app")
+        onboarding = await onboard_items(app_url, item_ids)
+
+        print(
+            f"Running for {args.duration}s: {args.api_clients} API clients, "
+            f"{args.ws_clients} WebSocket clients, ingestion every "
+            f"{args.ingest_interval}s"
+        )
+        stats = LoadStats()
+        start = time.monotonic()
+        stop_at = start + args.duration
+        ws_url = app_url.replace("http", "ws", 1) + "/ws"
+        await asyncio.gather(
+            ingestion_loop(stats, stop_at, args.ingest_interval),
+            *(
+                api_client(app_url, item_ids, stats, stop_at, args.seed + index)
+                for index in range(args.api_clients)
+            ),
+            *(
+                websocket_client(ws_url, item_ids, stats, stop_at, index)
+                for index in range(args.ws_clients)
+            ),
+        )
+        results = report(stats, time.monotonic() - start)
+        results["onboarding"] = onboarding
+
+        async with httpx.AsyncClient() as client:
+            results["stand_in"] = (await client.get(f"{stand_in_url}/__stats")).json()
+        return results
+    finally:
+        stop_process(app)
+        stop_process(stand_in)
+        if not args.keep_data:
+            async with AsyncSession(get_async_engine()) as db_session:
+                await delete_synthetic_data(db_session, item_ids)
+                for table in ("market_indices", "market_snapshots"):
+                    await db_session.execute(
+                        text(f'DELETE FROM {table} WHERE "timestamp" >= :start'),
+                        {"start": run_started},
+                    )
+                await db_session.commit()
+        await get_async_engine().dispose()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--duration", type=float, default=60)
+    parser.add_argument("--api-clients", type=int, default=20)
+    parser.add_argument("--ws-clients", type=int, default=50)
+    parser.add_argument("--ingest-interval", type=float, default=20)
+    parser.add_argument(
+        "--items", type=int, default=100, help="Itens sintéticos acompanhados"
+    )
+    parser.add_argument("--auctions", type=int, default=200_000)
+    parser.add_argument("--payload-items", type=int, default=8000)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--stand-in-port", type=int, default=8900)
+    parser.add_argument("--app-port", type=int, default=8901)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path)
+    parser.add_argument("--keep-data", action="store_true")
+    parser.add_argument(
+        "--allow-remote",
+        action="store_true",
+        help="Permite um DATABASE_URL fora da máquina local",
+    )
+    args = parser.parse_args()
+    # Uma linha por requisição dos clientes esconderia o relatório
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    if args.items > args.payload_items:
+        parser.error("--items não pode passar de --payload-items")
+    host = make_url(get_database_url()).host
+    if host not in LOCAL_HOSTS and not args.allow_remote:
+        parser.error(f"DATABASE_URL aponta para {host}; use um banco local")
+
+    # Guarda os logs do app e do servidor local para consulta depois
+    workdir = Path(tempfile.mkdtemp(prefix="load-test-"))
+    print(f"Logs in {workdir}")
+    results = asyncio.run(run(args, workdir))
+
+    output = args.output or RESULTS_DIR / (
+        f"load-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(
+        json.dumps(
+            {
+                "meta": {
+                    "created_at": datetime.now(timezone.utc).isoformat(),
+                    "commit": git_commit(),
+                    "cpus": os.cpu_count(),
+                    "args": {
+                        key: str(value) if isinstance(value, Path) else value
+                        for key, value in vars(args).items()
+                    },
+                },
+                "results": results,
+            },
+            indent=2,
+        )
+    )
+    print(f"\nResults written to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,284 @@
+"""
+Servidor local que imita os serviços externos do app, para testes de carga
+sem rede: OAuth e API da Blizzard (commodities, item e mídia), ícones, páginas
+de item da Wowhead e o Storage do Supabase. Tamanho do dump, latência e taxa
+de erros são configuráveis.
+
+Uso, a partir de backend/:
+    python benchmarks/stand_in_server.py --port 8900 --auctions 200000 \\
+        --latency-ms 40 --jitter-ms 20 --error-rate 0.01
+
+E no app (ou no .env):
+    BLIZZARD_API_URL=http://127.0.0.1:8900
+    BLIZZARD_OAUTH_URL=http://127.0.0.1:8900
+    WOWHEAD_URL=http://127.0.0.1:8900
+    SUPABASE_URL=http://127.0.0.1:8900
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import re
+import secrets
+import struct
+import zlib
+from collections import Counter
+from dataclasses import dataclass
+
+import uvicorn
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse
+from synthetic_data import SYNTHETIC_ITEM_ID_START, commodities_payload
+
+# Respostas de erro sorteadas pela injeção de falhas
+INJECTED_STATUSES = (429, 500, 503)
+RARITIES = ("COMMON", "UNCOMMON", "RARE", "EPIC")
+QUALITY_ICONS = (None, "tier1.png", "tier2.png", "tier3.png", "12-tier1.png")
+# Ids nos caminhos, para agrupar as contagens por endpoint
+NUMBERS = re.compile(r"\d{3,}")
+
+
+@dataclass
+class StandInConfig:
+    auctions: int = 200_000
+    payload_items: int = 8000
+    seed: int = 0
+    # Um dump novo (preços diferentes) a cada busca, como de hora em hora
+    vary: bool = False
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0
+    wowhead_page_kb: int = 200
+
+
+def png_icon(item_id: int, size: int = 56) -> bytes:
+    """Square PNG of one color derived from the id."""
+    red, green, blue = (item_id * 37) % 256, (item_id * 101) % 256, (item_id * 7) % 256
+    row = b"\x00" + bytes((red, green, blue)) * size
+    raw = zlib.compress(row * size)
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return (
+            struct.pack(">I", len(data))
+            + kind
+            + data
+            + struct.pack(">I", zlib.crc32(kind + data))
+        )
+
+    header = struct.pack(">IIBBBBB", size, size, 8, 2, 0, 0, 0)
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", header)
+        + chunk(b"IDAT", raw)
+        + chunk(b"IEND", b"")
+    )
+
+
+def wowhead_page(item_id: int, page_kb: int) -> bytes:
+    """Item page with the contextNames script followed by the quality icons."""
+    icon = QUALITY_ICONS[item_id % len(QUALITY_ICONS)]
+    markup = f'WH.markup.printHtml("[icon name={icon}]")' if icon else "WH.noop()"
+    filler = b"<div class='filler'></div>\n" * (page_kb * 1024 // 28)
+    return (
+        b"<!DOCTYPE html><html><head><title>Item</title></head><body>"
+        + filler
+        + b'<script type="application/json" id="data.page.wow.item.contextNames">'
+        + b"{}</script>\n<script>"
+        + markup.encode()
+        + b"</script>"
+        + filler
+        + b"</body></html>"
+    )
+
+
+def create_app(config: StandInConfig) -> FastAPI:
+    app = FastAPI(title="wow-prices stand-in")
+    hits: Counter[str] = Counter()
+    errors: Counter[str] = Counter()
+    storage: dict[str, dict[str, tuple[bytes, str]]] = {}
+    token = secrets.token_hex(16)
+    dumps: dict[int, bytes] = {}
+    fetches = 0
+
+    def commodities_body(seed: int) -> bytes:
+        if seed not in dumps:
+            dumps.clear()
+            payload = commodities_payload(config.auctions, config.payload_items, seed)
+            dumps[seed] = json.dumps(payload, separators=(",", ":")).encode()
+        return dumps[seed]
+
+    @app.middleware("http")
+    async def inject_latency_and_errors(request: Request, call_next):
+        path = request.url.path
+        if path.startswith("/__"):
+            return await call_next(request)
+        label = NUMBERS.sub(":id", path)
+        if config.latency_ms or config.jitter_ms:
+            delay = config.latency_ms + random.uniform(0, config.jitter_ms)
+            await asyncio.sleep(delay / 1000)
+        if config.error_rate and random.random() < config.error_rate:
+            errors[label] += 1
+            status_code = random.choice(INJECTED_STATUSES)
+            return JSONResponse(
+                {
+                    "statusCode": str(status_code),
+                    "error": "Injected",
+                    "message": "Falha injetada pelo servidor de testes",
+                },
+                status_code=status_code,
+            )
+        hits[label] += 1
+        return await call_next(request)
+
+    # OAuth da Blizzard
+    @app.post("/token")
+    async def oauth_token():
+        return {
+            "access_token": token,
+            "token_type": "bearer",
+            "expires_in": 86399,
+            "sub": "stand-in",
+        }
+
+    # API da Blizzard
+    @app.get("/data/wow/auctions/commodities")
+    async def commodities(request: Request):
+        nonlocal fetches
+        if request.headers.get("authorization") != f"Bearer {token}":
+            return JSONResponse({"code": 401, "detail": "Unauthorized"}, 401)
+        seed = config.seed + (fetches if config.vary else 0)
+        fetches += 1
+        body = await asyncio.to_thread(commodities_body, seed)
+        return Response(body, media_type="application/json")
+
+    @app.get("/data/wow/item/{item_id}")
+    async def item(item_id: int, request: Request):
+        if request.headers.get("authorization") != f"Bearer {token}":
+            return JSONResponse({"code": 401, "detail": "Unauthorized"}, 401)
+        if item_id < SYNTHETIC_ITEM_ID_START:
+            return JSONResponse({"code": 404, "detail": "Not Found"}, 404)
+        base_url = str(request.base_url).rstrip("/")
+        return {
+            "id": item_id,
+            "name": f"Commodity {item_id - SYNTHETIC_ITEM_ID_START}",
+            "quality": {"type": RARITIES[item_id % len(RARITIES)]},
+            "media": {
+                "key": {"href": f"{base_url}/data/wow/media/item/{item_id}"},
+                "id": item_id,
+            },
+        }
+
+    @app.get("/data/wow/media/item/{item_id}")
+    async def item_media(item_id: int, request: Request):
+        base_url = str(request.base_url).rstrip("/")
+        return {
+            "assets": [
+                {
+                    "key": "icon",
+                    "value": f"{base_url}/icons/inv_commodity_{item_id}.png",
+                    "file_data_id": item_id,
+                }
+            ],
+            "id": item_id,
+        }
+
+    @app.get("/icons/inv_commodity_{item_id}.png")
+    async def icon(item_id: int):
+        return Response(png_icon(item_id), media_type="image/png")
+
+    # Wowhead
+    @app.get("/item={item_id}/")
+    async def wowhead_item(item_id: int):
+        page = wowhead_page(item_id, config.wowhead_page_kb)
+        return Response(page, media_type="text/html")
+
+    # Storage do Supabase
+    @app.post("/storage/v1/object/list/{bucket}")
+    async def list_objects(bucket: str, request: Request):
+        options = await request.json()
+        offset = int(options.get("offset", 0))
+        limit = int(options.get("limit", 100))
+        names = sorted(storage.get(bucket, {}))[offset : offset + limit]
+        return [{"name": name, "id": name, "metadata": {}} for name in names]
+
+    @app.post("/storage/v1/object/{bucket}/{path:path}")
+    async def upload_object(bucket: str, path: str, request: Request):
+        files = storage.setdefault(bucket, {})
+        if path in files and request.headers.get("x-upsert") != "true":
+            return JSONResponse(
+                {
+                    "statusCode": "409",
+                    "error": "Duplicate",
+                    "message": "The resource already exists",
+                },
+                400,
+            )
+        form = await request.form()
+        upload = form["file"]
+        content = await upload.read()  # type: ignore
+        files[path] = (content, upload.content_type or "application/octet-stream")  # type: ignore
+        return {"Key": f"{bucket}/{path}", "Id": path}
+
+    @app.get("/storage/v1/object/public/{bucket}/{path:path}")
+    async def public_object(bucket: str, path: str):
+        stored = storage.get(bucket, {}).get(path)
+        if stored is None:
+            return JSONResponse(
+                {"statusCode": "404", "error": "not_found", "message": "Not found"},
+                404,
+            )
+        return Response(stored[0], media_type=stored[1])
+
+    # Controle do próprio servidor
+    @app.get("/__stats")
+    async def stats():
+        return {
+            "hits": dict(hits),
+            "injected_errors": dict(errors),
+            "commodities_fetches": fetches,
+            "stored_objects": sum(len(files) for files in storage.values()),
+        }
+
+    @app.get("/__health")
+    async def health():
+        return {"status": "ok"}
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--auctions", type=int, default=StandInConfig.auctions)
+    parser.add_argument(
+        "--payload-items", type=int, default=StandInConfig.payload_items
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--vary", action="store_true")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument(
+        "--error-rate", type=float, default=0.0, help="Fração de respostas com erro"
+    )
+    parser.add_argument(
+        "--wowhead-page-kb", type=int, default=StandInConfig.wowhead_page_kb
+    )
+    args = parser.parse_args()
+
+    config = StandInConfig(
+        auctions=args.auctions,
+        payload_items=args.payload_items,
+        seed=args.seed,
+        vary=args.vary,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        wowhead_page_kb=args.wowhead_page_kb,
+    )
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
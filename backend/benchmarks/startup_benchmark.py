@@ -0,0 +1,119 @@
+"""
+Mede o tempo de import do app (o que atrasa cada worker do uvicorn a subir) com
+`python -X importtime` e falha se a mediana passar do orçamento.
+
+Uso, a partir de backend/:
+    python benchmarks/startup_benchmark.py --runs 5 --budget-ms 1800
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_BUDGET_MS = 1800
+# Módulos que só devem ser importados quando usados
+DEFERRED_MODULES = ("pandas", "supabase", "bs4", "asyncpg", "psycopg2")
+
+CHECK_DEFERRED = (
+    "import sys, app.main; "
+    f"print(','.join(m for m in {DEFERRED_MODULES!r} if m in sys.modules))"
+)
+
+
+def import_env() -> dict[str, str]:
+    """Sem variáveis reais: o import do app não pode depender delas."""
+    env = {
+        key: value
+        for key, value in os.environ.items()
+        if key
+        not in (
+            "DATABASE_URL",
+            "SUPABASE_URL",
+            "SUPABASE_KEY",
+            "INTERNAL_WEBHOOK_SECRET",
+        )
+    }
+    env["PYTHONPATH"] = str(BACKEND_DIR)
+    return env
+
+
+def parse_importtime(stderr: str) -> dict[str, tuple[int, int]]:
+    """{módulo: (self_us, cumulative_us)} a partir da saída do -X importtime."""
+    modules: dict[str, tuple[int, int]] = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line.removeprefix("import time:").split("|")
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+def measure_once() -> dict[str, tuple[int, int]]:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=BACKEND_DIR,
+        env=import_env(),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return parse_importtime(result.stderr)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument(
+        "--budget-ms",
+        type=float,
+        default=float(os.getenv("STARTUP_BUDGET_MS", DEFAULT_BUDGET_MS)),
+    )
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    # A primeira execução compila os .pyc e não entra na conta
+    measure_once()
+    runs = [measure_once() for _ in range(args.runs)]
+
+    totals_ms = [run["app.main"][1] / 1000 for run in runs]
+    median_ms = statistics.median(totals_ms)
+
+    last = runs[-1]
+    print(f"{'self ms':>10} {'cumulative ms':>14}  module")
+    for name, (self_us, cumulative_us) in sorted(
+        last.items(), key=lambda item: item[1][0], reverse=True
+    )[: args.top]:
+        print(f"{self_us / 1000:>10.1f} {cumulative_us / 1000:>14.1f}  {name}")
+
+    print()
+    print(
+        f"import app.main: median {median_ms:.0f} ms "
+        f"(min {min(totals_ms):.0f}, max {max(totals_ms):.0f}, runs {args.runs}), "
+        f"budget {args.budget_ms:.0f} ms"
+    )
+
+    deferred = subprocess.run(
+        [sys.executable, "-c", CHECK_DEFERRED],
+        cwd=BACKEND_DIR,
+        env=import_env(),
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout.strip()
+
+    failed = False
+    if deferred:
+        print(f"FAIL: imported at startup: {deferred}")
+        failed = True
+    if median_ms > args.budget_ms:
+        print("FAIL: startup import time over budget")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+"""
+Gerador determinístico de dados no formato da Blizzard e do banco, para os
+benchmarks. A mesma seed sempre gera os mesmos leilões e o mesmo histórico.
+"""
+
+from datetime import datetime, timedelta
+from typing import Iterator
+
+import numpy as np
+
+# Faixa de ids reservada aos itens sintéticos (os reais ficam bem abaixo)
+SYNTHETIC_ITEM_ID_START = 900_000_000
+TIME_LEFT = ("SHORT", "MEDIUM", "LONG", "VERY_LONG")
+COPPER_PER_GOLD = 10_000
+
+
+def synthetic_item_ids(count: int) -> list[int]:
+    return list(range(SYNTHETIC_ITEM_ID_START, SYNTHETIC_ITEM_ID_START + count))
+
+
+def base_prices(item_ids: np.ndarray, seed: int) -> np.ndarray:
+    """Preço de referência por item, log-normal entre ~1 prata e milhares de ouro."""
+    rng = np.random.default_rng([seed, 1])
+    prices = rng.lognormal(
+        mean=np.log(20 * COPPER_PER_GOLD), sigma=1.6, size=len(item_ids)
+    )
+    return np.maximum(prices.astype(np.int64), 100)
+
+
+def commodities_payload(
+    auction_count: int, item_count: int, seed: int = 0
+) -> dict[str, list[dict]]:
+    """
+    Commodities response with `auction_count` auctions spread over
+    `item_count` items. As in the real dump, a few items have most of the
+    auctions, prices climb in a ladder above each item's floor and most
+    stacks are small with a long tail.
+    """
+    rng = np.random.default_rng([seed, auction_count, item_count])
+    item_ids = np.asarray(synthetic_item_ids(item_count), dtype=np.int64)
+    floors = base_prices(item_ids, seed)
+
+    # Zipf: poucos itens concentram a maioria dos leilões
+    popularity = 1 / np.arange(1, item_count + 1) ** 1.1
+    popularity = rng.permutation(popularity / popularity.sum())
+    positions = rng.choice(item_count, size=auction_count, p=popularity)
+
+    markups = 1 + rng.exponential(0.08, size=auction_count)
+    prices = (floors[positions] * markups).astype(np.int64)
+    quantities = np.minimum(rng.geometric(0.04, size=auction_count), 1000)
+    time_left = rng.integers(0, len(TIME_LEFT), size=auction_count)
+
+    return {
+        "auctions": [
+            {
+                "id": auction_id,
+                "item": {"id": item_id},
+                "quantity": quantity,
+                "unit_price": price,
+                "time_left": TIME_LEFT[left],
+            }
+            for auction_id, item_id, quantity, price, left in zip(
+                range(1, auction_count + 1),
+                item_ids[positions].tolist(),
+                quantities.tolist(),
+                prices.tolist(),
+                time_left.tolist(),
+            )
+        ]
+    }
+
+
+def price_history_records(
+    item_ids: list[int], end: datetime, years: float, seed: int = 0
+) -> Iterator[list[tuple[int, int, int, datetime]]]:
+    """
+    Hourly (item_id, price, quantity, timestamp) rows ending at `end`, one
+    list per item, with a daily and a weekly cycle, a slow random walk and
+    noise on top of each item's base price.
+    """
+    hours = int(years * 365 * 24)
+    timestamps = [end - timedelta(hours=hours - hour) for hour in range(hours)]
+    hour_index = np.arange(hours)
+    daily = 0.06 * np.sin(2 * np.pi * hour_index / 24)
+    weekly = 0.04 * np.sin(2 * np.pi * hour_index / (24 * 7))
+    floors = base_prices(np.asarray(item_ids), seed)
+
+    for item_id, floor in zip(item_ids, floors.tolist()):
+        rng = np.random.default_rng([seed, item_id])
+        walk = np.cumsum(rng.normal(0, 0.004, size=hours))
+        noise = rng.normal(0, 0.02, size=hours)
+        prices = (floor * np.exp(walk + daily + weekly + noise)).astype(np.int64)
+        quantities = rng.poisson(2000, size=hours)
+        yield list(
+            zip(
+                [item_id] * hours,
+                prices.tolist(),
+                quantities.tolist(),
+                timestamps,
+            )
+        )
+
+
+def heatmap_rows(seed: int = 0) -> list[tuple[str, int, float]]:
+    """(weekday, hour, value) rows like the plot-data heatmap query returns."""
+    rng = np.random.default_rng([seed, 7])
+    weekdays = ("Domingo", "Segunda", "Terça", "Quarta", "Quinta", "Sexta", "Sábado")
+    values = rng.normal(100_000, 5_000, size=(7, 24))
+    return [
+        (weekday, hour, float(values[day, hour]))
+        for day, weekday in enumerate(weekdays)
+        for hour in range(24)
+    ]
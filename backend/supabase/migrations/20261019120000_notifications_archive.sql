@@ -0,0 +1,76 @@
+  create table "public"."notifications_archive" (
+    "id" integer not null,
+    "type" notification_type not null,
+    "price_diff" bigint not null default '0'::bigint,
+    "current_price" bigint not null,
+    "price_threshold" bigint,
+    "item_id" integer not null,
+    "created_at" timestamp without time zone not null,
+    "archived_at" timestamp without time zone not null default CURRENT_TIMESTAMP
+      );
+
+
+alter table "public"."notifications_archive" enable row level security;
+
+CREATE UNIQUE INDEX notifications_archive_pkey ON public.notifications_archive USING btree (id);
+
+CREATE INDEX notifications_archive_item_id_created_at_idx ON public.notifications_archive USING btree (item_id, created_at);
+
+alter table "public"."notifications_archive" add constraint "notifications_archive_pkey" PRIMARY KEY using index "notifications_archive_pkey";
+
+alter table "public"."notifications_archive" add constraint "notifications_archive_item_id_fkey" FOREIGN KEY (item_id) REFERENCES items(id) not valid;
+
+alter table "public"."notifications_archive" validate constraint "notifications_archive_item_id_fkey";
+
+-- Índice parcial usado pelo mark-all-read em lotes (só as não lidas ficam no índice)
+CREATE INDEX notifications_unread_id_idx ON public.notifications USING btree (id) WHERE (read = false);
+
+-- Índice parcial usado pela rotina de arquivamento (só as lidas, ordenadas por data)
+CREATE INDEX notifications_read_created_at_idx ON public.notifications USING btree (created_at, id) WHERE (read = true);
+
+insert into "public"."settings" ("key", "value", "label", "description") values
+  ('notification_archive_days', '30', 'Arquivar notificações após (dias)', 'Notificações lidas mais antigas que esse número de dias são movidas para o arquivo.')
+on conflict ("key") do nothing;
+
+grant delete on table "public"."notifications_archive" to "anon";
+
+grant insert on table "public"."notifications_archive" to "anon";
+
+grant references on table "public"."notifications_archive" to "anon";
+
+grant select on table "public"."notifications_archive" to "anon";
+
+grant trigger on table "public"."notifications_archive" to "anon";
+
+grant truncate on table "public"."notifications_archive" to "anon";
+
+grant update on table "public"."notifications_archive" to "anon";
+
+grant delete on table "public"."notifications_archive" to "authenticated";
+
+grant insert on table "public"."notifications_archive" to "authenticated";
+
+grant references on table "public"."notifications_archive" to "authenticated";
+
+grant select on table "public"."notifications_archive" to "authenticated";
+
+grant trigger on table "public"."notifications_archive" to "authenticated";
+
+grant truncate on table "public"."notifications_archive" to "authenticated";
+
+grant update on table "public"."notifications_archive" to "authenticated";
+
+grant delete on table "public"."notifications_archive" to "service_role";
+
+grant insert on table "public"."notifications_archive" to "service_role";
+
+grant references on table "public"."notifications_archive" to "service_role";
+
+grant select on table "public"."notifications_archive" to "service_role";
+
+grant trigger on table "public"."notifications_archive" to "service_role";
+
+grant truncate on table "public"."notifications_archive" to "service_role";
+
+grant update on table "public"."notifications_archive" to "service_role";
+
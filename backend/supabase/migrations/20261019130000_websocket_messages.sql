@@ -0,0 +1,58 @@
+-- Payloads de broadcast grandes demais para o NOTIFY (limite de 8000 bytes)
+  create unlogged table "public"."websocket_messages" (
+    "id" bigint generated always as identity not null,
+    "payload" text not null,
+    "created_at" timestamp with time zone not null default now()
+      );
+
+
+alter table "public"."websocket_messages" enable row level security;
+
+CREATE UNIQUE INDEX websocket_messages_pkey ON public.websocket_messages USING btree (id);
+
+alter table "public"."websocket_messages" add constraint "websocket_messages_pkey" PRIMARY KEY using index "websocket_messages_pkey";
+
+CREATE INDEX websocket_messages_created_at_idx ON public.websocket_messages USING btree (created_at);
+
+grant delete on table "public"."websocket_messages" to "anon";
+
+grant insert on table "public"."websocket_messages" to "anon";
+
+grant references on table "public"."websocket_messages" to "anon";
+
+grant select on table "public"."websocket_messages" to "anon";
+
+grant trigger on table "public"."websocket_messages" to "anon";
+
+grant truncate on table "public"."websocket_messages" to "anon";
+
+grant update on table "public"."websocket_messages" to "anon";
+
+grant delete on table "public"."websocket_messages" to "authenticated";
+
+grant insert on table "public"."websocket_messages" to "authenticated";
+
+grant references on table "public"."websocket_messages" to "authenticated";
+
+grant select on table "public"."websocket_messages" to "authenticated";
+
+grant trigger on table "public"."websocket_messages" to "authenticated";
+
+grant truncate on table "public"."websocket_messages" to "authenticated";
+
+grant update on table "public"."websocket_messages" to "authenticated";
+
+grant delete on table "public"."websocket_messages" to "service_role";
+
+grant insert on table "public"."websocket_messages" to "service_role";
+
+grant references on table "public"."websocket_messages" to "service_role";
+
+grant select on table "public"."websocket_messages" to "service_role";
+
+grant trigger on table "public"."websocket_messages" to "service_role";
+
+grant truncate on table "public"."websocket_messages" to "service_role";
+
+grant update on table "public"."websocket_messages" to "service_role";
+
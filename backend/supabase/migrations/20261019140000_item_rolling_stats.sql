@@ -0,0 +1,68 @@
+  create table "public"."item_rolling_stats" (
+    "item_id" integer not null,
+    "half_life_hours" integer not null,
+    "price_mean" double precision not null,
+    "price_var" double precision not null default 0,
+    "price_zscore" double precision not null default 0,
+    "quantity_mean" double precision not null,
+    "quantity_var" double precision not null default 0,
+    "quantity_zscore" double precision not null default 0,
+    "last_price" bigint not null,
+    "last_quantity" integer not null,
+    "samples" integer not null default 1,
+    "last_timestamp" timestamp without time zone not null
+      );
+
+
+alter table "public"."item_rolling_stats" enable row level security;
+
+CREATE UNIQUE INDEX item_rolling_stats_pkey ON public.item_rolling_stats USING btree (item_id, half_life_hours);
+
+alter table "public"."item_rolling_stats" add constraint "item_rolling_stats_pkey" PRIMARY KEY using index "item_rolling_stats_pkey";
+
+alter table "public"."item_rolling_stats" add constraint "item_rolling_stats_item_id_fkey" FOREIGN KEY (item_id) REFERENCES items(id) not valid;
+
+alter table "public"."item_rolling_stats" validate constraint "item_rolling_stats_item_id_fkey";
+
+grant delete on table "public"."item_rolling_stats" to "anon";
+
+grant insert on table "public"."item_rolling_stats" to "anon";
+
+grant references on table "public"."item_rolling_stats" to "anon";
+
+grant select on table "public"."item_rolling_stats" to "anon";
+
+grant trigger on table "public"."item_rolling_stats" to "anon";
+
+grant truncate on table "public"."item_rolling_stats" to "anon";
+
+grant update on table "public"."item_rolling_stats" to "anon";
+
+grant delete on table "public"."item_rolling_stats" to "authenticated";
+
+grant insert on table "public"."item_rolling_stats" to "authenticated";
+
+grant references on table "public"."item_rolling_stats" to "authenticated";
+
+grant select on table "public"."item_rolling_stats" to "authenticated";
+
+grant trigger on table "public"."item_rolling_stats" to "authenticated";
+
+grant truncate on table "public"."item_rolling_stats" to "authenticated";
+
+grant update on table "public"."item_rolling_stats" to "authenticated";
+
+grant delete on table "public"."item_rolling_stats" to "service_role";
+
+grant insert on table "public"."item_rolling_stats" to "service_role";
+
+grant references on table "public"."item_rolling_stats" to "service_role";
+
+grant select on table "public"."item_rolling_stats" to "service_role";
+
+grant trigger on table "public"."item_rolling_stats" to "service_role";
+
+grant truncate on table "public"."item_rolling_stats" to "service_role";
+
+grant update on table "public"."item_rolling_stats" to "service_role";
+
@@ -0,0 +1,16 @@
+alter type "public"."notification_type" add value 'price_above_anomaly_alert';
+
+alter type "public"."notification_type" add value 'price_below_anomaly_alert';
+
+alter table "public"."item_rolling_stats" add column "return_mean" double precision not null default 0;
+
+alter table "public"."item_rolling_stats" add column "return_var" double precision not null default 0;
+
+alter table "public"."item_rolling_stats" add column "return_zscore" double precision not null default 0;
+
+insert into "public"."settings" ("key", "value", "label", "description") values
+  ('anomaly_zscore_threshold', '3', 'Limite de anomalia (z-score)', 'Alerta quando o preço se afasta da média recente por esse número de desvios padrão. Use 0 para desativar.'),
+  ('anomaly_score_source', 'price', 'Base da anomalia', 'Calcula o z-score sobre o preço ("price") ou sobre a variação entre atualizações ("returns").'),
+  ('anomaly_baseline_half_life_hours', '168', 'Meia-vida da média (horas)', 'Meia-vida da média móvel usada como referência: 24, 168 ou 720 horas.'),
+  ('anomaly_min_samples', '24', 'Amostras mínimas', 'Número mínimo de atualizações antes de um item poder gerar alertas de anomalia.')
+on conflict ("key") do nothing;
@@ -0,0 +1,62 @@
+-- Somas suficientes (ponderadas) do modelo sazonal + tendência de cada item:
+-- 168 células (dia da semana x hora) x [peso, Σt, Σy, Σt², Σty]
+  create table "public"."item_forecast_models" (
+    "item_id" integer not null,
+    "sums" double precision[] not null,
+    "last_price" bigint not null,
+    "last_timestamp" timestamp without time zone not null
+      );
+
+
+alter table "public"."item_forecast_models" enable row level security;
+
+CREATE UNIQUE INDEX item_forecast_models_pkey ON public.item_forecast_models USING btree (item_id);
+
+alter table "public"."item_forecast_models" add constraint "item_forecast_models_pkey" PRIMARY KEY using index "item_forecast_models_pkey";
+
+alter table "public"."item_forecast_models" add constraint "item_forecast_models_item_id_fkey" FOREIGN KEY (item_id) REFERENCES items(id) not valid;
+
+alter table "public"."item_forecast_models" validate constraint "item_forecast_models_item_id_fkey";
+
+grant delete on table "public"."item_forecast_models" to "anon";
+
+grant insert on table "public"."item_forecast_models" to "anon";
+
+grant references on table "public"."item_forecast_models" to "anon";
+
+grant select on table "public"."item_forecast_models" to "anon";
+
+grant trigger on table "public"."item_forecast_models" to "anon";
+
+grant truncate on table "public"."item_forecast_models" to "anon";
+
+grant update on table "public"."item_forecast_models" to "anon";
+
+grant delete on table "public"."item_forecast_models" to "authenticated";
+
+grant insert on table "public"."item_forecast_models" to "authenticated";
+
+grant references on table "public"."item_forecast_models" to "authenticated";
+
+grant select on table "public"."item_forecast_models" to "authenticated";
+
+grant trigger on table "public"."item_forecast_models" to "authenticated";
+
+grant truncate on table "public"."item_forecast_models" to "authenticated";
+
+grant update on table "public"."item_forecast_models" to "authenticated";
+
+grant delete on table "public"."item_forecast_models" to "service_role";
+
+grant insert on table "public"."item_forecast_models" to "service_role";
+
+grant references on table "public"."item_forecast_models" to "service_role";
+
+grant select on table "public"."item_forecast_models" to "service_role";
+
+grant trigger on table "public"."item_forecast_models" to "service_role";
+
+grant truncate on table "public"."item_forecast_models" to "service_role";
+
+grant update on table "public"."item_forecast_models" to "service_role";
+
@@ -0,0 +1,63 @@
+-- Preço mínimo e volume de todas as commodities do dump, um snapshot por linha:
+-- arrays paralelos ordenados por item_id (muito menor que uma linha por item)
+  create table "public"."market_snapshots" (
+    "timestamp" timestamp without time zone not null,
+    "item_ids" integer[] not null,
+    "min_prices" bigint[] not null,
+    "volumes" bigint[] not null
+      );
+
+
+alter table "public"."market_snapshots" enable row level security;
+
+CREATE UNIQUE INDEX market_snapshots_pkey ON public.market_snapshots USING btree ("timestamp");
+
+alter table "public"."market_snapshots" add constraint "market_snapshots_pkey" PRIMARY KEY using index "market_snapshots_pkey";
+
+insert into "public"."settings" ("key", "value", "label", "description") values
+  ('track_all_commodities', 'false', 'Acompanhar todo o mercado', 'Guarda o preço mínimo e o volume de todas as commodities a cada atualização, para que itens novos já venham com histórico. Os índices do mercado também dependem dela: com a opção desligada, eles param de ser atualizados.'),
+  ('market_history_days', '90', 'Histórico do mercado (dias)', 'Por quantos dias os snapshots do mercado inteiro são mantidos.')
+on conflict ("key") do nothing;
+
+grant delete on table "public"."market_snapshots" to "anon";
+
+grant insert on table "public"."market_snapshots" to "anon";
+
+grant references on table "public"."market_snapshots" to "anon";
+
+grant select on table "public"."market_snapshots" to "anon";
+
+grant trigger on table "public"."market_snapshots" to "anon";
+
+grant truncate on table "public"."market_snapshots" to "anon";
+
+grant update on table "public"."market_snapshots" to "anon";
+
+grant delete on table "public"."market_snapshots" to "authenticated";
+
+grant insert on table "public"."market_snapshots" to "authenticated";
+
+grant references on table "public"."market_snapshots" to "authenticated";
+
+grant select on table "public"."market_snapshots" to "authenticated";
+
+grant trigger on table "public"."market_snapshots" to "authenticated";
+
+grant truncate on table "public"."market_snapshots" to "authenticated";
+
+grant update on table "public"."market_snapshots" to "authenticated";
+
+grant delete on table "public"."market_snapshots" to "service_role";
+
+grant insert on table "public"."market_snapshots" to "service_role";
+
+grant references on table "public"."market_snapshots" to "service_role";
+
+grant select on table "public"."market_snapshots" to "service_role";
+
+grant trigger on table "public"."market_snapshots" to "service_role";
+
+grant truncate on table "public"."market_snapshots" to "service_role";
+
+grant update on table "public"."market_snapshots" to "service_role";
+
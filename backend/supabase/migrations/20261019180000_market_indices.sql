@@ -0,0 +1,126 @@
+-- Cestas de itens com índice próprio; item_ids nulo = todas as commodities.
+-- Os índices só são atualizados com a configuração track_all_commodities ligada
+  create table "public"."market_baskets" (
+    "id" integer generated by default as identity not null,
+    "name" text not null,
+    "item_ids" integer[]
+      );
+
+
+  create table "public"."market_indices" (
+    "basket_id" integer not null,
+    "timestamp" timestamp without time zone not null,
+    "value" double precision not null,
+    "change" double precision not null default 0,
+    "items" integer not null default 0,
+    "volume" bigint not null default 0
+      );
+
+
+alter table "public"."market_baskets" enable row level security;
+
+alter table "public"."market_indices" enable row level security;
+
+CREATE UNIQUE INDEX market_baskets_pkey ON public.market_baskets USING btree (id);
+
+alter table "public"."market_baskets" add constraint "market_baskets_pkey" PRIMARY KEY using index "market_baskets_pkey";
+
+CREATE UNIQUE INDEX market_indices_pkey ON public.market_indices USING btree (basket_id, "timestamp");
+
+alter table "public"."market_indices" add constraint "market_indices_pkey" PRIMARY KEY using index "market_indices_pkey";
+
+alter table "public"."market_indices" add constraint "market_indices_basket_id_fkey" FOREIGN KEY (basket_id) REFERENCES market_baskets(id) ON DELETE CASCADE not valid;
+
+alter table "public"."market_indices" validate constraint "market_indices_basket_id_fkey";
+
+insert into "public"."market_baskets" ("id", "name", "item_ids") values
+  (1, 'Mercado', null)
+on conflict ("id") do nothing;
+
+select setval(pg_get_serial_sequence('public.market_baskets', 'id'), greatest((select max(id) from public.market_baskets), 1));
+
+grant delete on table "public"."market_baskets" to "anon";
+
+grant insert on table "public"."market_baskets" to "anon";
+
+grant references on table "public"."market_baskets" to "anon";
+
+grant select on table "public"."market_baskets" to "anon";
+
+grant trigger on table "public"."market_baskets" to "anon";
+
+grant truncate on table "public"."market_baskets" to "anon";
+
+grant update on table "public"."market_baskets" to "anon";
+
+grant delete on table "public"."market_baskets" to "authenticated";
+
+grant insert on table "public"."market_baskets" to "authenticated";
+
+grant references on table "public"."market_baskets" to "authenticated";
+
+grant select on table "public"."market_baskets" to "authenticated";
+
+grant trigger on table "public"."market_baskets" to "authenticated";
+
+grant truncate on table "public"."market_baskets" to "authenticated";
+
+grant update on table "public"."market_baskets" to "authenticated";
+
+grant delete on table "public"."market_baskets" to "service_role";
+
+grant insert on table "public"."market_baskets" to "service_role";
+
+grant references on table "public"."market_baskets" to "service_role";
+
+grant select on table "public"."market_baskets" to "service_role";
+
+grant trigger on table "public"."market_baskets" to "service_role";
+
+grant truncate on table "public"."market_baskets" to "service_role";
+
+grant update on table "public"."market_baskets" to "service_role";
+
+
+grant delete on table "public"."market_indices" to "anon";
+
+grant insert on table "public"."market_indices" to "anon";
+
+grant references on table "public"."market_indices" to "anon";
+
+grant select on table "public"."market_indices" to "anon";
+
+grant trigger on table "public"."market_indices" to "anon";
+
+grant truncate on table "public"."market_indices" to "anon";
+
+grant update on table "public"."market_indices" to "anon";
+
+grant delete on table "public"."market_indices" to "authenticated";
+
+grant insert on table "public"."market_indices" to "authenticated";
+
+grant references on table "public"."market_indices" to "authenticated";
+
+grant select on table "public"."market_indices" to "authenticated";
+
+grant trigger on table "public"."market_indices" to "authenticated";
+
+grant truncate on table "public"."market_indices" to "authenticated";
+
+grant update on table "public"."market_indices" to "authenticated";
+
+grant delete on table "public"."market_indices" to "service_role";
+
+grant insert on table "public"."market_indices" to "service_role";
+
+grant references on table "public"."market_indices" to "service_role";
+
+grant select on table "public"."market_indices" to "service_role";
+
+grant trigger on table "public"."market_indices" to "service_role";
+
+grant truncate on table "public"."market_indices" to "service_role";
+
+grant update on table "public"."market_indices" to "service_role";
+
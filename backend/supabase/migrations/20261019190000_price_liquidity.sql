@@ -0,0 +1,66 @@
+-- Custo para comprar cada quantidade alvo a partir dos leilões mais baratos
+  create table "public"."price_liquidity" (
+    "item_id" integer not null,
+    "timestamp" timestamp without time zone not null,
+    "target_quantity" integer not null,
+    "filled_quantity" bigint not null,
+    "total_cost" bigint not null
+      );
+
+
+alter table "public"."price_liquidity" enable row level security;
+
+CREATE UNIQUE INDEX price_liquidity_pkey ON public.price_liquidity USING btree (item_id, "timestamp", target_quantity);
+
+alter table "public"."price_liquidity" add constraint "price_liquidity_pkey" PRIMARY KEY using index "price_liquidity_pkey";
+
+alter table "public"."price_liquidity" add constraint "price_liquidity_item_id_fkey" FOREIGN KEY (item_id) REFERENCES items(id) not valid;
+
+alter table "public"."price_liquidity" validate constraint "price_liquidity_item_id_fkey";
+
+insert into "public"."settings" ("key", "value", "label", "description") values
+  ('liquidity_target_quantities', '100,1000,5000,20000', 'Quantidades de liquidez', 'Quantidades (separadas por vírgula) para as quais o custo total e o preço médio de compra são calculados a cada atualização.')
+on conflict ("key") do nothing;
+
+grant delete on table "public"."price_liquidity" to "anon";
+
+grant insert on table "public"."price_liquidity" to "anon";
+
+grant references on table "public"."price_liquidity" to "anon";
+
+grant select on table "public"."price_liquidity" to "anon";
+
+grant trigger on table "public"."price_liquidity" to "anon";
+
+grant truncate on table "public"."price_liquidity" to "anon";
+
+grant update on table "public"."price_liquidity" to "anon";
+
+grant delete on table "public"."price_liquidity" to "authenticated";
+
+grant insert on table "public"."price_liquidity" to "authenticated";
+
+grant references on table "public"."price_liquidity" to "authenticated";
+
+grant select on table "public"."price_liquidity" to "authenticated";
+
+grant trigger on table "public"."price_liquidity" to "authenticated";
+
+grant truncate on table "public"."price_liquidity" to "authenticated";
+
+grant update on table "public"."price_liquidity" to "authenticated";
+
+grant delete on table "public"."price_liquidity" to "service_role";
+
+grant insert on table "public"."price_liquidity" to "service_role";
+
+grant references on table "public"."price_liquidity" to "service_role";
+
+grant select on table "public"."price_liquidity" to "service_role";
+
+grant trigger on table "public"."price_liquidity" to "service_role";
+
+grant truncate on table "public"."price_liquidity" to "service_role";
+
+grant update on table "public"."price_liquidity" to "service_role";
+
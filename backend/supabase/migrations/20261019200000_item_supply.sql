@@ -0,0 +1,64 @@
+-- Diferença entre leilões de snapshots consecutivos: quantidade nova (listed),
+-- que saiu do leilão (removed: vendida ou expirada) e que continuou (remaining)
+  create table "public"."item_supply" (
+    "item_id" integer not null,
+    "timestamp" timestamp without time zone not null,
+    "interval_hours" double precision not null,
+    "listed" bigint not null,
+    "removed" bigint not null,
+    "remaining" bigint not null
+      );
+
+
+alter table "public"."item_supply" enable row level security;
+
+CREATE UNIQUE INDEX item_supply_pkey ON public.item_supply USING btree (item_id, "timestamp");
+
+alter table "public"."item_supply" add constraint "item_supply_pkey" PRIMARY KEY using index "item_supply_pkey";
+
+alter table "public"."item_supply" add constraint "item_supply_item_id_fkey" FOREIGN KEY (item_id) REFERENCES items(id) not valid;
+
+alter table "public"."item_supply" validate constraint "item_supply_item_id_fkey";
+
+grant delete on table "public"."item_supply" to "anon";
+
+grant insert on table "public"."item_supply" to "anon";
+
+grant references on table "public"."item_supply" to "anon";
+
+grant select on table "public"."item_supply" to "anon";
+
+grant trigger on table "public"."item_supply" to "anon";
+
+grant truncate on table "public"."item_supply" to "anon";
+
+grant update on table "public"."item_supply" to "anon";
+
+grant delete on table "public"."item_supply" to "authenticated";
+
+grant insert on table "public"."item_supply" to "authenticated";
+
+grant references on table "public"."item_supply" to "authenticated";
+
+grant select on table "public"."item_supply" to "authenticated";
+
+grant trigger on table "public"."item_supply" to "authenticated";
+
+grant truncate on table "public"."item_supply" to "authenticated";
+
+grant update on table "public"."item_supply" to "authenticated";
+
+grant delete on table "public"."item_supply" to "service_role";
+
+grant insert on table "public"."item_supply" to "service_role";
+
+grant references on table "public"."item_supply" to "service_role";
+
+grant select on table "public"."item_supply" to "service_role";
+
+grant trigger on table "public"."item_supply" to "service_role";
+
+grant truncate on table "public"."item_supply" to "service_role";
+
+grant update on table "public"."item_supply" to "service_role";
+
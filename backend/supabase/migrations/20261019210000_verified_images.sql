@@ -0,0 +1,61 @@
+-- Manifesto da verificação de imagens no início do servidor: itens cuja
+-- imagem já foi confirmada no Storage com o image_path atual
+  create table "public"."verified_images" (
+    "item_id" integer not null,
+    "image_path" text not null,
+    "verified_at" timestamp without time zone not null
+      );
+
+
+alter table "public"."verified_images" enable row level security;
+
+CREATE UNIQUE INDEX verified_images_pkey ON public.verified_images USING btree (item_id);
+
+alter table "public"."verified_images" add constraint "verified_images_pkey" PRIMARY KEY using index "verified_images_pkey";
+
+alter table "public"."verified_images" add constraint "verified_images_item_id_fkey" FOREIGN KEY (item_id) REFERENCES items(id) not valid;
+
+alter table "public"."verified_images" validate constraint "verified_images_item_id_fkey";
+
+grant delete on table "public"."verified_images" to "anon";
+
+grant insert on table "public"."verified_images" to "anon";
+
+grant references on table "public"."verified_images" to "anon";
+
+grant select on table "public"."verified_images" to "anon";
+
+grant trigger on table "public"."verified_images" to "anon";
+
+grant truncate on table "public"."verified_images" to "anon";
+
+grant update on table "public"."verified_images" to "anon";
+
+grant delete on table "public"."verified_images" to "authenticated";
+
+grant insert on table "public"."verified_images" to "authenticated";
+
+grant references on table "public"."verified_images" to "authenticated";
+
+grant select on table "public"."verified_images" to "authenticated";
+
+grant trigger on table "public"."verified_images" to "authenticated";
+
+grant truncate on table "public"."verified_images" to "authenticated";
+
+grant update on table "public"."verified_images" to "authenticated";
+
+grant delete on table "public"."verified_images" to "service_role";
+
+grant insert on table "public"."verified_images" to "service_role";
+
+grant references on table "public"."verified_images" to "service_role";
+
+grant select on table "public"."verified_images" to "service_role";
+
+grant trigger on table "public"."verified_images" to "service_role";
+
+grant truncate on table "public"."verified_images" to "service_role";
+
+grant update on table "public"."verified_images" to "service_role";
+
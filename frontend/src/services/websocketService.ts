@@ -7,6 +7,7 @@ export const state = reactive({
 
 const URL = import.meta.env.VITE_WS_BASE_URL
 let socket: WebSocket | null = null
+const subscribedTopics = new Set<string>()
 
 export const websocketService = {
   connect() {
@@ -18,6 +19,9 @@ export const websocketService = {
 
     socket.onopen = () => {
       state.isConnected = true
+      if (subscribedTopics.size > 0) {
+        this.sendJSONMessage({ action: 'subscribe', topics: [...subscribedTopics] })
+      }
     }
 
     socket.onmessage = (event) => {
@@ -51,6 +55,20 @@ export const websocketService = {
     }
   },
 
+  subscribe(topics: string[]) {
+    topics.forEach((topic) => subscribedTopics.add(topic))
+    if (socket && socket.readyState === WebSocket.OPEN) {
+      this.sendJSONMessage({ action: 'subscribe', topics })
+    }
+  },
+
+  unsubscribe(topics: string[]) {
+    topics.forEach((topic) => subscribedTopics.delete(topic))
+    if (socket && socket.readyState === WebSocket.OPEN) {
+      this.sendJSONMessage({ action: 'unsubscribe', topics })
+    }
+  },
+
   sendJSONMessage(message: object) {
     if (socket && socket.readyState === WebSocket.OPEN) {
       socket.send(JSON.stringify(message))
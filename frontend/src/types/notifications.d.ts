@@ -3,6 +3,8 @@ type NotificationType =
   | 'price_below_alert'
   | 'price_above_best_avg_alert'
   | 'price_below_best_avg_alert'
+  | 'price_above_anomaly_alert'
+  | 'price_below_anomaly_alert'
 
 export type Notification = {
   id: number
@@ -0,0 +1,35 @@
+import type { GoldAndSilver } from '.'
+
+export type HeatmapCell = {
+  weekday: string
+  hour: string
+  value: number
+}
+
+export type PriceUpdate = {
+  item_id: number
+  timestamp: string
+  price: number
+  quantity: number
+  average_price_cell: HeatmapCell
+  average_quantity_cell: HeatmapCell
+}
+
+export type PricesUpdateEntry = {
+  id: number
+  price: GoldAndSilver
+  quantity: number
+  timestamp: string
+}
+
+export type PriceUpdateMessage = {
+  topic: string
+  action: 'price_update'
+  data: PriceUpdate
+}
+
+export type PricesUpdateMessage = {
+  topic: 'items'
+  action: 'prices_update'
+  data: PricesUpdateEntry[]
+}
@@ -1,4 +1,5 @@
-import type { Item } from '@/types/item'
+import type { Item, ItemPlotData } from '@/types/item'
+import type { HeatmapCell, PriceUpdate, PricesUpdateEntry } from '@/types/websocket'
 import { editItem } from './services/api/endpoints/item'
 
 export const customSellColorScale: [number, string][] = [
@@ -565,3 +566,62 @@ export async function toggleNotification(item: Item) {
     console.error('Erro ao atualizar notificação:', error)
   }
 }
+
+// Pontos do gráfico da última semana, o mesmo limite do servidor
+const LAST_WEEK_POINTS = 7 * 24
+
+type Heatmap = ItemPlotData['average_price_data']
+
+function setHeatmapCell(heatmap: Heatmap, cell: HeatmapCell): Heatmap {
+  const column = heatmap.x.indexOf(cell.weekday)
+  const row = heatmap.y.indexOf(cell.hour)
+  // Célula fora da grade (hora sem dados até agora): fica para o próximo carregamento
+  if (column === -1 || row === -1) return heatmap
+
+  return {
+    ...heatmap,
+    z: heatmap.z.map((values, index) =>
+      index === row ? values.map((value, i) => (i === column ? cell.value : value)) : values,
+    ),
+  }
+}
+
+export function applyPriceUpdate(plotData: ItemPlotData, update: PriceUpdate): ItemPlotData {
+  const { price, quantity } = plotData.last_week_data
+  // O histórico vem do ponto mais recente para o mais antigo
+  const isNewPoint = !price.x.includes(update.timestamp)
+
+  return {
+    ...plotData,
+    average_price_data: setHeatmapCell(plotData.average_price_data, update.average_price_cell),
+    average_quantity_data: setHeatmapCell(
+      plotData.average_quantity_data,
+      update.average_quantity_cell,
+    ),
+    last_week_data: isNewPoint
+      ? {
+          price: {
+            x: [update.timestamp, ...price.x].slice(0, LAST_WEEK_POINTS),
+            y: [update.price, ...price.y].slice(0, LAST_WEEK_POINTS),
+          },
+          quantity: {
+            x: [update.timestamp, ...quantity.x].slice(0, LAST_WEEK_POINTS),
+            y: [update.quantity, ...quantity.y].slice(0, LAST_WEEK_POINTS),
+          },
+        }
+      : plotData.last_week_data,
+  }
+}
+
+export function applyPricesUpdate(items: Item[], updates: PricesUpdateEntry[]): Item[] {
+  const prices = new Map(updates.map((update) => [update.id, update.price]))
+  const priceValue = (item: Item) => item.price.gold * 100 + item.price.silver
+
+  // A lista é ordenada por preço, do maior para o menor
+  return items
+    .map((item) => {
+      const price = prices.get(item.id)
+      return price ? { ...item, price } : item
+    })
+    .sort((a, b) => priceValue(b) - priceValue(a))
+}